@@ -0,0 +1,195 @@
+# assets.py
+# -*- coding: utf-8 -*-
+"""
+Images du repo servies en version réduite depuis S3.
+
+Build (à relancer quand une image change):
+    python assets.py build               # dérivés + upload S3 + manifest
+    python assets.py build --dry-run     # dérivés en local seulement (tailles)
+
+Pour chaque image *.png du repo:
+- "thumb": max 256 px  (set_thumbnail: avatars, rencontres)
+- "embed": max 1024 px (set_image: paysages)
+encodées en WebP, uploadées sous assets/<nom>.<variante>.<hash>.webp
+(clé = hash du contenu => immuable, cache navigateur/Discord d'un an).
+
+Le manifest (ASSET_MANIFEST_PATH, défaut assets_manifest.json) associe
+le nom de fichier aux URLs; hunt_data.asset() et hunt_ui._img_for le
+consultent, avec repli sur l'URL d'origine si l'image n'y est pas.
+ASSET_PUBLIC_BASE_URL: base publique (CDN / domaine du bucket) si
+l'endpoint S3 n'est pas lisible publiquement.
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.getenv("ASSET_MANIFEST_PATH", os.path.join(ROOT, "assets_manifest.json"))
+MANIFEST_VERSION = 1
+
+VARIANTS: Dict[str, Dict[str, Any]] = {
+    "thumb": {"max_side": 256, "quality": 82},
+    "embed": {"max_side": 1024, "quality": 80},
+}
+
+# ==========================================================
+# Résolution (runtime)
+# ==========================================================
+_MANIFEST: Optional[Dict[str, Any]] = None
+
+def load_manifest(path: str = "") -> Dict[str, Any]:
+    global _MANIFEST
+    path = path or MANIFEST_PATH
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if int(data.get("version", 0)) != MANIFEST_VERSION:
+            print(f"Assets: manifest {path} version inattendue, ignoré.")
+            data = {}
+    except FileNotFoundError:
+        data = {}
+    except Exception as e:
+        print("Assets: manifest illisible:", e)
+        data = {}
+    _MANIFEST = data.get("assets", {}) if data else {}
+    return _MANIFEST
+
+def _manifest() -> Dict[str, Any]:
+    return _MANIFEST if _MANIFEST is not None else load_manifest()
+
+def _norm_name(name: str) -> str:
+    # "Rat_Mutant.png" (URL) == "Rat mutant.png" (fichier)
+    return re.sub(r"[\s_]+", " ", unquote(name)).strip().lower()
+
+_BY_NORM: Dict[int, Dict[str, str]] = {}
+
+def _lookup(name: str) -> Optional[Dict[str, str]]:
+    m = _manifest()
+    hit = m.get(name)
+    if hit:
+        return hit
+    idx = _BY_NORM.get(id(m))
+    if idx is None:
+        idx = {_norm_name(k): k for k in m}
+        _BY_NORM.clear()
+        _BY_NORM[id(m)] = idx
+    key = idx.get(_norm_name(name))
+    return m.get(key) if key else None
+
+def url_for(name: str, variant: str = "embed") -> Optional[str]:
+    """URL du dérivé `variant` pour un fichier du repo (None si absent du manifest)."""
+    entry = _lookup(os.path.basename(name))
+    if not entry:
+        return None
+    return entry.get(variant) or entry.get("embed") or None
+
+def resolve_url(url: str, variant: str = "embed") -> str:
+    """URL raw GitHub (ou autre) d'une image du repo -> dérivé S3 si connu."""
+    if not url:
+        return url
+    name = os.path.basename(urlparse(url).path)
+    return url_for(name, variant) or url
+
+
+# ==========================================================
+# Build
+# ==========================================================
+def _derive(src: bytes, max_side: int, quality: int) -> bytes:
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(src))
+    img.load()
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+    w, h = img.size
+    scale = min(1.0, max_side / float(max(w, h)))
+    if scale < 1.0:
+        img = img.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, format="WEBP", quality=quality, method=4)
+    return out.getvalue()
+
+def _slug(name: str) -> str:
+    stem = os.path.splitext(name)[0]
+    return re.sub(r"[^A-Za-z0-9]+", "_", stem).strip("_").lower() or "img"
+
+def build(*, dry_run: bool = False, out_dir: str = "", files: Optional[List[str]] = None) -> Dict[str, Any]:
+    sources = files or sorted(glob.glob(os.path.join(ROOT, "*.png")))
+    s3 = None
+    public_base = (os.getenv("ASSET_PUBLIC_BASE_URL") or "").strip().rstrip("/")
+    if not dry_run:
+        from services import S3Service
+        s3 = S3Service()
+        if not s3.enabled():
+            raise SystemExit("S3 non configuré (AWS_ENDPOINT_URL / AWS_S3_BUCKET_NAME). Utilise --dry-run.")
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    assets: Dict[str, Any] = {}
+    total_src = total_out = uploaded = 0
+    t0 = time.perf_counter()
+    for path in sources:
+        name = os.path.basename(path)
+        with open(path, "rb") as f:
+            src = f.read()
+        src_hash = hashlib.sha256(src).hexdigest()
+        entry: Dict[str, Any] = {"src_hash": src_hash[:16], "src_bytes": len(src)}
+        total_src += len(src)
+        for variant, spec in VARIANTS.items():
+            data = _derive(src, spec["max_side"], spec["quality"])
+            h = hashlib.sha256(src_hash.encode() + json.dumps(spec, sort_keys=True).encode()).hexdigest()[:12]
+            key = f"assets/{_slug(name)}.{variant}.{h}.webp"
+            total_out += len(data)
+            entry[f"{variant}_bytes"] = len(data)
+            if out_dir:
+                with open(os.path.join(out_dir, os.path.basename(key)), "wb") as f:
+                    f.write(data)
+            if s3 is not None:
+                # clé immuable: déjà en ligne => rien à faire
+                if not s3.object_exists(key):
+                    s3.upload_bytes(data, key, "image/webp", cache_control="public, max-age=31536000, immutable")
+                    uploaded += 1
+                entry[variant] = f"{public_base}/{key}" if public_base else s3.public_url(key)
+            else:
+                entry[variant] = key
+        assets[name] = entry
+        print(f"  {name:24} {len(src) // 1024:>6} KB -> thumb {entry['thumb_bytes'] // 1024:>4} KB, embed {entry['embed_bytes'] // 1024:>4} KB")
+
+    print(
+        f"Assets: {len(assets)} images, {total_src / 1e6:.1f} MB -> {total_out / 1e6:.1f} MB"
+        f" ({uploaded} upload(s)) en {time.perf_counter() - t0:.1f}s"
+    )
+    manifest = {"version": MANIFEST_VERSION, "built_at": int(time.time()), "variants": VARIANTS, "assets": assets}
+    if not dry_run:
+        tmp = MANIFEST_PATH + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, MANIFEST_PATH)
+        print(f"Manifest: {MANIFEST_PATH}")
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Dérivés réduits des images du repo (S3 + manifest).")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("--dry-run", action="store_true", help="pas d'upload ni de manifest")
+    b.add_argument("--out-dir", default="", help="écrit aussi les dérivés dans ce dossier")
+    args = p.parse_args(argv)
+    if args.cmd == "build":
+        build(dry_run=args.dry_run, out_dir=args.out_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+# benchmarks/__init__.py
+# -*- coding: utf-8 -*-
+"""
+Benchmarks hors-ligne (aucun appel réseau).
+
+    python -m benchmarks.run --sizes 1000,10000,100000
+
+- fake_sheets: SheetsService en mémoire (latence + 429 simulés)
+- datagen: génération de données synthétiques (VIP, LOG, QCM, HUNT_*)
+- run: exécution + rapport (temps et nombre de requêtes)
+"""
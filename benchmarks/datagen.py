@@ -0,0 +1,229 @@
+# benchmarks/datagen.py
+# -*- coding: utf-8 -*-
+"""
+Données synthétiques au format des onglets du Google Sheet.
+
+generate(rows) -> {titre_onglet: [headers, ligne, ligne, ...]}
+- rows: taille de LOG et QCM_LOG
+- vips: nombre de VIP (défaut: rows // 10, min 50), aussi joueurs HUNT
+Déterministe (seed).
+"""
+from __future__ import annotations
+
+import json
+import random
+import string
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+import domain
+import hunt_domain as hd
+import hunt_rpg
+import hunt_services as hs
+from services import normalize_code, now_fr
+
+Table = List[List[Any]]
+
+H_VIP = [
+    "code_vip", "discord_id", "pseudo", "points", "niveau",
+    "created_at", "created_by", "status",
+    "bleeter", "dob", "phone",
+    "card_url", "card_generated_at", "card_generated_by",
+]
+H_LOG = ["timestamp", "staff_id", "code_vip", "action_key", "quantite", "points_unite", "delta_points", "raison"]
+H_ACTIONS = ["action_key", "description", "points_unite", "limite", "regles"]
+H_NIVEAUX = ["niveau", "points_min", "avantages"]
+H_QCM_QUESTIONS = ["qid", "question", "a", "b", "c", "d", "correct", "difficulty"]
+H_QCM_LOG = [
+    "timestamp", "date_key", "week_key", "discord_id", "code_vip", "qid", "q_index",
+    "choice", "is_correct", "points_awarded", "elapsed_sec", "locked", "meta",
+]
+H_BAN = ["pseudo_ref", "aliases", "discord_id", "reason", "added_by", "added_at", "notes"]
+H_DEFIS = ["week_key", "code_vip", "d1", "d2", "d3", "d4", "completed_at", "completed_by", "d_notes", "week_label"]
+# hunt_rpg lit/écrit aussi hp, hp_max et state_json dans HUNT_PLAYERS
+H_HUNT_PLAYERS = hs.H_PLAYERS + ["hp", "hp_max", "state_json"]
+H_HUNT_DAILIES = [
+    "date_key", "discord_id", "run_id", "arc", "result", "money_delta", "xp_delta",
+    "jail_delta_hours", "story", "rewards_json", "created_at",
+]
+
+ACTIONS = [
+    ("ACHAT", "Achat boutique", 1, "Illimité", ""),
+    ("ACHAT_LIMITEE", "Achat édition limitée", 5, "3/semaine", ""),
+    ("RECYCLAGE", "Recyclage", 1, "Illimité", ""),
+    ("EVENT", "Participation event", 10, "1 par event", "event:NomEvent"),
+    ("POCHE", "Poche mystère", 8, "1 par poche", "poche:XXX"),
+    ("DEFI_PHOTO", "Défi photo", 5, "A valider", ""),
+    ("SPECIAL", "Geste spécial", 15, "Selon règles", ""),
+    ("QCM_BONNE_REPONSE", "QCM bonne réponse", 2, "Illimité", ""),
+    ("QCM_BONUS_W1", "QCM top 1", 30, "Illimité", ""),
+    ("QCM_BONUS_W2", "QCM top 2", 20, "Illimité", ""),
+    ("QCM_BONUS_W3", "QCM top 3", 10, "Illimité", ""),
+    ("QCM_PARTICIPANT", "QCM participation", 5, "Illimité", ""),
+    ("TOUS_DEFIS_HEBDO", "4/4 défis", 20, "Illimité", ""),
+]
+LOG_ACTIONS = ["ACHAT"] * 6 + ["ACHAT_LIMITEE", "RECYCLAGE", "EVENT", "QCM_BONNE_REPONSE"]
+VENTE_CATS = ["TSHIRT", "SWEAT", "CASQUETTE", "PANTALON", "CHAUSSURES"]
+
+_SYL = ["ka", "ri", "mo", "lu", "na", "to", "shi", "ve", "za", "ro", "mi", "ko", "da", "le", "su", "bo"]
+
+
+def _pseudo(rnd: random.Random) -> str:
+    first = "".join(rnd.choice(_SYL) for _ in range(rnd.randint(2, 3)))
+    last = "".join(rnd.choice(_SYL) for _ in range(rnd.randint(2, 4)))
+    return f"{first}_{last}"
+
+def _code(rnd: random.Random, used: set) -> str:
+    alphabet = string.ascii_uppercase + string.digits
+    while True:
+        c = normalize_code("SUB-" + "".join(rnd.choice(alphabet) for _ in range(4)) + "-" + "".join(rnd.choice(alphabet) for _ in range(4)))
+        if c not in used:
+            used.add(c)
+            return c
+
+def _discord_id(rnd: random.Random, used: set) -> str:
+    while True:
+        d = str(rnd.randint(10**17, 10**18 - 1))
+        if d not in used:
+            used.add(d)
+            return d
+
+
+def gen_vips(rnd: random.Random, n: int) -> Table:
+    now = now_fr()
+    codes: set = set()
+    dids: set = set()
+    out: Table = [H_VIP]
+    for _ in range(n):
+        pts = int(rnd.expovariate(1 / 300))
+        created = now - timedelta(days=rnd.randint(0, 365))
+        out.append([
+            _code(rnd, codes), _discord_id(rnd, dids), _pseudo(rnd), pts, 1 + min(9, pts // 200),
+            created.isoformat(timespec="seconds"), "100000000000000001",
+            "ACTIVE" if rnd.random() < 0.95 else "DISABLED",
+            "@" + _pseudo(rnd) if rnd.random() < 0.6 else "",
+            f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{rnd.randint(1960, 2004)}",
+            f"555-{rnd.randint(1000, 9999)}",
+            "", "", "",
+        ])
+    return out
+
+def gen_log(rnd: random.Random, vips: Table, m: int, days: int = 60) -> Table:
+    now = now_fr()
+    codes = [r[0] for r in vips[1:]]
+    staff = [str(100000000000000000 + i) for i in range(1, 16)]
+    pu = {a[0]: a[2] for a in ACTIONS}
+    out: Table = [H_LOG]
+    for _ in range(m):
+        ts = now - timedelta(seconds=rnd.randint(0, days * 86400))
+        action = rnd.choice(LOG_ACTIONS)
+        qty = rnd.randint(1, 3) if action == "ACHAT" else 1
+        raison = ""
+        if action in ("ACHAT", "ACHAT_LIMITEE"):
+            raison = f"vente:{rnd.choice(VENTE_CATS)}"
+        elif action == "EVENT":
+            raison = f"event:Soiree{rnd.randint(1, 40)}"
+        out.append([
+            ts.isoformat(timespec="seconds"), rnd.choice(staff), rnd.choice(codes), action,
+            qty, pu[action], pu[action] * qty, raison,
+        ])
+    out[1:] = sorted(out[1:], key=lambda r: r[0])
+    return out
+
+def gen_questions(rnd: random.Random, per_difficulty: int = 30) -> Table:
+    out: Table = [H_QCM_QUESTIONS]
+    out.append([domain.QCM_FIXED_QID, "Combien de membres dans le quartet ?", "2", "3", "4", "5", "C", "EASY"])
+    for diff in ("EASY", "MED", "HARD"):
+        for i in range(per_difficulty):
+            out.append([f"LS_{diff}_{i:04d}", f"Question {diff} #{i} ?", "A1", "B1", "C1", "D1", rnd.choice("ABCD"), diff])
+    return out
+
+def gen_qcm_log(rnd: random.Random, vips: Table, questions: Table, m: int, days: int = 30) -> Table:
+    now = now_fr()
+    players = [(r[1], r[0]) for r in vips[1:]]
+    qids = [r[0] for r in questions[1:]]
+    out: Table = [H_QCM_LOG]
+    for _ in range(m):
+        dt = now - timedelta(seconds=rnd.randint(0, days * 86400))
+        did, code = rnd.choice(players)
+        ok = rnd.random() < 0.6
+        out.append([
+            dt.isoformat(timespec="seconds"), domain.date_key_fr(dt), domain.week_key_fr(dt), did, code,
+            rnd.choice(qids), rnd.randint(1, domain.QCM_DAILY_QUESTIONS), rnd.choice("ABCD"),
+            1 if ok else 0, domain.QCM_POINTS_PER_GOOD if ok else 0, rnd.randint(2, 20), 1, "",
+        ])
+    out[1:] = sorted(out[1:], key=lambda r: r[0])
+    return out
+
+def gen_bans(rnd: random.Random, n: int = 40) -> Table:
+    out: Table = [H_BAN]
+    for _ in range(n):
+        out.append([_pseudo(rnd), ",".join(_pseudo(rnd) for _ in range(rnd.randint(0, 3))),
+                    str(rnd.randint(10**17, 10**18 - 1)) if rnd.random() < 0.5 else "", "Triche", "1", "", ""])
+    return out
+
+def gen_hunt_players(rnd: random.Random, vips: Table) -> Table:
+    now = now_fr().isoformat(timespec="seconds")
+    out: Table = [H_HUNT_PLAYERS]
+    for r in vips[1:]:
+        row = {h: "" for h in H_HUNT_PLAYERS}
+        xp_total = rnd.randint(0, 1500)
+        row.update({
+            "discord_id": r[1], "code_vip": r[0], "pseudo": r[2], "is_employee": 0,
+            "avatar_tag": rnd.choice(hd.DIRECTION_AVATARS)["tag"] if rnd.random() < 0.9 else "",
+            "level": 1 + xp_total // 100, "xp": xp_total % 100, "xp_total": xp_total,
+            "stats_hp": 100, "stats_atk": rnd.randint(1, 10), "stats_def": rnd.randint(1, 10),
+            "stats_per": rnd.randint(1, 10), "stats_cha": rnd.randint(1, 10), "stats_luck": rnd.randint(1, 10),
+            "hunt_dollars": rnd.randint(0, 2000), "heat": rnd.randint(0, 10),
+            "total_runs": rnd.randint(0, 60), "total_wins": rnd.randint(0, 40), "total_deaths": rnd.randint(0, 10),
+            "inventory_json": json.dumps({"medkit": rnd.randint(0, 3)}), "equipped_json": "{}",
+            "created_at": now, "updated_at": now, "hp": 100, "hp_max": 100,
+        })
+        out.append([row[h] for h in H_HUNT_PLAYERS])
+    return out
+
+def gen_hunt_items(rnd: random.Random, n: int = 60) -> Table:
+    types = ["weapon", "armor", "consumable", "key", "misc"]
+    rarities = ["common", "uncommon", "rare", "epic", "legendary"]
+    out: Table = [hs.H_ITEMS]
+    for i in range(n):
+        out.append([f"item_{i:03d}", f"Objet {i}", rnd.choice(types), rnd.choice(rarities), rnd.randint(10, 500),
+                    json.dumps({"atk": rnd.randint(0, 5)}), "", ""])
+    return out
+
+def gen_hunt_log(rnd: random.Random, vips: Table, m: int) -> Table:
+    now = now_fr()
+    players = [(r[1], r[0]) for r in vips[1:]]
+    out: Table = [hs.H_LOG]
+    for _ in range(m):
+        did, code = rnd.choice(players)
+        ts = now - timedelta(seconds=rnd.randint(0, 30 * 86400))
+        out.append([ts.isoformat(timespec="seconds"), did, code, "daily", "run terminé"])
+    return out
+
+
+def generate(rows: int, *, vips: Optional[int] = None, seed: int = 0) -> Dict[str, Table]:
+    rnd = random.Random(seed)
+    n_vips = vips if vips is not None else max(50, rows // 10)
+
+    vip = gen_vips(rnd, n_vips)
+    questions = gen_questions(rnd)
+    return {
+        "VIP": vip,
+        "LOG": gen_log(rnd, vip, rows),
+        "ACTIONS": [H_ACTIONS] + [list(a) for a in ACTIONS],
+        "NIVEAUX": [H_NIVEAUX] + [[lvl, (lvl - 1) * 200, f"Avantage niveau {lvl}"] for lvl in range(1, 11)],
+        "QCM_QUESTIONS": questions,
+        "QCM_LOG": gen_qcm_log(rnd, vip, questions, rows),
+        "VIP_BAN_CREATE": gen_bans(rnd),
+        "DEFIS": [H_DEFIS],
+        hs.T_PLAYERS: gen_hunt_players(rnd, vip),
+        hunt_rpg.T_DAILIES: [H_HUNT_DAILIES],
+        hs.T_ITEMS: gen_hunt_items(rnd),
+        hs.T_DAILY: [hs.H_DAILY],
+        hs.T_KEYS: [hs.H_KEYS],
+        hs.T_WEEKLY: [hs.H_WEEKLY],
+        hs.T_LOG: gen_hunt_log(rnd, vip, rows // 10),
+        hs.T_BOSSES: [hs.H_BOSSES],
+        hs.T_REPUTATION: [hs.H_REPUTATION],
+    }
@@ -0,0 +1,201 @@
+# benchmarks/fake_discord.py
+# -*- coding: utf-8 -*-
+"""
+Faux objets discord.py pour appeler les vrais callbacks (commandes et
+boutons) hors connexion.
+
+- FakeMember passe isinstance(x, discord.Member)
+- FakeInteraction.response / followup / message imitent l'API utilisée
+  par bot.py, ui.py et hunt_ui.py, avec une latence REST simulée
+- chaque interaction garde ses horodatages (ack, fin) dans `rec`
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+
+import discord
+
+_IDS = itertools.count(1_300_000_000_000_000_000)
+
+
+@dataclass
+class InteractionRecord:
+    label: str
+    created: float                 # loop.time() "côté Discord" (arrivée prévue)
+    started: float = 0.0           # callback effectivement lancé
+    acked: Optional[float] = None  # première réponse (defer/send_message/edit_message)
+    done: float = 0.0
+    sheets_calls: int = 0
+    error: str = ""
+    followups: int = 0
+
+    @property
+    def ack_latency(self) -> Optional[float]:
+        return None if self.acked is None else self.acked - self.created
+
+    @property
+    def latency(self) -> float:
+        return self.done - self.created
+
+
+class FakeMember(discord.Member):
+    def __init__(self, user_id: int, name: str, *, role_ids: Optional[List[int]] = None):
+        self._fake_id = int(user_id)
+        self._fake_name = str(name)
+        self._fake_roles = [discord.Object(id=r) for r in (role_ids or [])]
+
+    @property
+    def id(self) -> int:
+        return self._fake_id
+
+    @property
+    def name(self) -> str:
+        return self._fake_name
+
+    @property
+    def display_name(self) -> str:
+        return self._fake_name
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self._fake_id}>"
+
+    @property
+    def roles(self):
+        return self._fake_roles
+
+    @property
+    def bot(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return f"<FakeMember id={self._fake_id} name={self._fake_name!r}>"
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int = 1):
+        self.id = guild_id
+        self.name = "SubUrban (fake)"
+
+    def get_member(self, user_id: int):
+        return None
+
+    def get_role(self, role_id: int):
+        return None
+
+
+class FakeMessage:
+    def __init__(self, client: "FakeDiscord", *, content: Any = None, embed: Any = None, view: Any = None):
+        self.client = client
+        self.id = next(_IDS)
+        self.content = content
+        self.embed = embed
+        self.view = view
+        self.edits = 0
+
+    async def edit(self, *, content: Any = None, embed: Any = None, view: Any = None, **kwargs) -> "FakeMessage":
+        await self.client.rest()
+        self.edits += 1
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embed = embed
+        if view is not None:
+            self.view = view
+        return self
+
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._i = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _ack(self) -> None:
+        if self._done:
+            raise discord.InteractionResponded(self._i)  # type: ignore[arg-type]
+        self._done = True
+        self._i.rec.acked = self._i.client.now()
+        await self._i.client.rest()
+
+    async def defer(self, *, ephemeral: bool = False, thinking: bool = False) -> None:
+        await self._ack()
+
+    async def send_message(self, content: Any = None, *, embed: Any = None, view: Any = None, ephemeral: bool = False, **kwargs) -> None:
+        await self._ack()
+        self._i.sent.append(FakeMessage(self._i.client, content=content, embed=embed, view=view))
+
+    async def edit_message(self, *, content: Any = None, embed: Any = None, view: Any = None, **kwargs) -> None:
+        await self._ack()
+        if self._i.message is not None:
+            await self._i.message.edit(content=content, embed=embed, view=view)
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._i = interaction
+
+    async def send(self, content: Any = None, *, embed: Any = None, view: Any = None, ephemeral: bool = False, wait: bool = False, **kwargs):
+        await self._i.client.rest()
+        self._i.rec.followups += 1
+        msg = FakeMessage(self._i.client, content=content, embed=embed, view=view)
+        self._i.sent.append(msg)
+        # comme discord.py: pas de message renvoyé sans wait=True
+        return msg if wait else None
+
+
+class FakeInteraction:
+    def __init__(
+        self,
+        client: "FakeDiscord",
+        *,
+        user: FakeMember,
+        label: str,
+        created: float,
+        command: Any = None,
+        message: Optional[FakeMessage] = None,
+        custom_id: str = "",
+    ):
+        self.client = client
+        self.id = next(_IDS)
+        self.user = user
+        self.guild = client.guild
+        self.guild_id = client.guild.id
+        self.channel = None
+        self.command = command
+        self.message = message
+        self.type = discord.InteractionType.component if message is not None else discord.InteractionType.application_command
+        self.data = {"custom_id": custom_id} if custom_id else {}
+        self.created_at = datetime.now(timezone.utc)
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.sent: List[FakeMessage] = []
+        self.rec = InteractionRecord(label=label, created=created)
+
+    def last_view(self):
+        for m in reversed(self.sent):
+            if m.view is not None:
+                return m.view
+        return None
+
+
+class FakeDiscord:
+    """Horloge + latence REST simulée (réponses, followups, edits)."""
+    def __init__(self, *, rest_latency: float = 0.05, guild_id: int = 1):
+        self.rest_latency = float(rest_latency)
+        self.guild = FakeGuild(guild_id)
+
+    def now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    async def rest(self) -> None:
+        if self.rest_latency > 0:
+            await asyncio.sleep(self.rest_latency)
+        else:
+            await asyncio.sleep(0)
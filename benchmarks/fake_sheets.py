@@ -0,0 +1,266 @@
+# benchmarks/fake_sheets.py
+# -*- coding: utf-8 -*-
+"""
+SheetsService en mémoire pour les benchmarks.
+
+On hérite du vrai SheetsService: caches ws/headers, _call (metrics) et
+append/update par headers restent le code de prod. Seul l'objet
+"spreadsheet" est remplacé par des onglets en mémoire qui imitent
+gspread (valeurs stockées en texte, get_all_records numérisé).
+
+- latence par requête (+ jitter)
+- injection de 429 (probabilité) -> même APIError que gspread
+- backoff 429 compté, et dormi seulement si backoff_scale > 0
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, numericise_all, to_records
+
+from services import SheetsService, _is_quota_429
+
+READ_OPS = {"worksheet", "row_values", "get_all_values", "get_all_records", "get_values"}
+WRITE_OPS = {"append_row", "append_rows", "update_cell", "batch_update", "delete_rows"}
+
+
+class _QuotaResponse:
+    """Réponse minimale pour construire une APIError 429 comme gspread."""
+    text = ""
+
+    def json(self):
+        return {"error": {
+            "code": 429,
+            "message": "Quota exceeded for quota metric 'Read requests' (simulated)",
+            "status": "RESOURCE_EXHAUSTED",
+        }}
+
+
+def quota_error() -> APIError:
+    return APIError(_QuotaResponse())
+
+
+def _cell(v: Any) -> str:
+    # value_input_option=RAW: Sheets renvoie la valeur formatée (texte)
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    return str(v)
+
+
+class FakeWorksheet:
+    def __init__(self, service: "FakeSheetsService", title: str, values: List[List[Any]]):
+        self.service = service
+        self.title = title
+        self._rows: List[List[str]] = [[_cell(v) for v in row] for row in values]
+
+    # --------- lectures ---------
+    def row_values(self, row: int) -> List[str]:
+        self.service._request("row_values", self.title)
+        with self.service.lock:
+            if row - 1 >= len(self._rows):
+                return []
+            r = list(self._rows[row - 1])
+        while r and r[-1] == "":
+            r.pop()
+        return r
+
+    def get_all_values(self) -> List[List[str]]:
+        self.service._request("get_all_values", self.title)
+        with self.service.lock:
+            return [list(r) for r in self._rows]
+
+    def get_values(self, range_name: Optional[str] = None, **kwargs) -> List[List[str]]:
+        # plages "A5:F" (fin ouverte) utilisées par le tail de tabcache
+        self.service._request("get_values", self.title)
+        with self.service.lock:
+            rows = [list(r) for r in self._rows]
+        if not range_name:
+            return rows
+        grid = a1_range_to_grid_range(range_name.split("!")[-1])
+        r0 = grid.get("startRowIndex", 0)
+        r1 = grid.get("endRowIndex", len(rows))
+        c0 = grid.get("startColumnIndex", 0)
+        c1 = grid.get("endColumnIndex")
+        return [r[c0:c1] for r in rows[r0:r1]]
+
+    def get_all_records(self) -> List[Dict[str, Any]]:
+        self.service._request("get_all_records", self.title)
+        with self.service.lock:
+            rows = [list(r) for r in self._rows]
+        if not rows:
+            return []
+        keys = rows[0]
+        width = len(keys)
+        values = [numericise_all((r + [""] * width)[:width]) for r in rows[1:]]
+        return to_records(keys, values)
+
+    # --------- écritures ---------
+    def append_row(self, values: List[Any], value_input_option: str = "RAW", **kwargs) -> None:
+        self.service._request("append_row", self.title)
+        with self.service.lock:
+            self._rows.append([_cell(v) for v in values])
+
+    def append_rows(self, values: List[List[Any]], value_input_option: str = "RAW", **kwargs) -> None:
+        self.service._request("append_rows", self.title)
+        with self.service.lock:
+            self._rows.extend([_cell(v) for v in row] for row in values)
+
+    def update_cell(self, row: int, col: int, value: Any) -> None:
+        self.service._request("update_cell", self.title)
+        with self.service.lock:
+            self._set(row, col, value)
+
+    def batch_update(self, data: List[Dict[str, Any]], **kwargs) -> None:
+        self.service._request("batch_update", self.title)
+        with self.service.lock:
+            for upd in data:
+                grid = a1_range_to_grid_range(upd["range"])
+                r0 = grid.get("startRowIndex", 0)
+                c0 = grid.get("startColumnIndex", 0)
+                for i, row in enumerate(upd.get("values") or []):
+                    for j, v in enumerate(row):
+                        self._set(r0 + i + 1, c0 + j + 1, v)
+
+    def delete_rows(self, start_index: int, end_index: Optional[int] = None) -> None:
+        self.service._request("delete_rows", self.title)
+        end_index = end_index or start_index
+        with self.service.lock:
+            del self._rows[start_index - 1:end_index]
+
+    def _set(self, row: int, col: int, value: Any) -> None:
+        while len(self._rows) < row:
+            self._rows.append([])
+        r = self._rows[row - 1]
+        if len(r) < col:
+            r.extend([""] * (col - len(r)))
+        r[col - 1] = _cell(value)
+
+    @property
+    def row_count(self) -> int:
+        with self.service.lock:
+            return len(self._rows)
+
+
+class FakeSpreadsheet:
+    def __init__(self, service: "FakeSheetsService", tables: Dict[str, List[List[Any]]]):
+        self.service = service
+        self.title = "FAKE"
+        self._tabs = {title: FakeWorksheet(service, title, values) for title, values in tables.items()}
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.service._request("worksheet", title)
+        ws = self._tabs.get(title)
+        if ws is None:
+            raise WorksheetNotFound(title)
+        return ws
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        return list(self._tabs.values())
+
+    def values_batch_get(self, ranges: List[str], params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        out = []
+        for rng in ranges:
+            title, _, a1 = rng.rpartition("!")
+            ws = self.worksheet(title.strip("'"))
+            out.append({"range": rng, "values": ws.get_values(a1)})
+        return {"valueRanges": out}
+
+
+class FakeSheetsService(SheetsService):
+    """
+    fake = FakeSheetsService(datagen.generate(10_000), latency=0.08, rate_429=0.02)
+    fake.reset_stats(); ...; fake.stats()
+    """
+    def __init__(
+        self,
+        tables: Dict[str, List[List[Any]]],
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_429: float = 0.0,
+        backoff_scale: float = 0.0,
+        seed: int = 0,
+    ):
+        super().__init__("fake-sheet", creds_path="")
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.rate_429 = float(rate_429)
+        self.backoff_scale = float(backoff_scale)
+        self.lock = threading.RLock()
+        self._rnd = random.Random(seed)
+        self._sh = FakeSpreadsheet(self, tables)
+        self.reset_stats()
+
+    # --------- plomberie ---------
+    def client(self):
+        raise RuntimeError("FakeSheetsService: pas de client gspread")
+
+    def sheet(self):
+        return self._sh
+
+    def _request(self, op: str, tab: str) -> None:
+        with self.lock:
+            self.requests[(op, tab)] += 1
+            throttled = self.rate_429 > 0 and self._rnd.random() < self.rate_429
+            wait = self.latency + (self._rnd.random() * self.jitter if self.jitter else 0.0)
+        if wait > 0:
+            time.sleep(wait)
+        if throttled:
+            with self.lock:
+                self.throttled += 1
+            raise quota_error()
+
+    def _retry(self, fn, *args, **kwargs):
+        # même politique que SheetsService._retry (1s, 2s, 4s...), mais le
+        # temps d'attente est comptabilisé et dormi à l'échelle backoff_scale
+        delay = 1.0
+        for _ in range(6):
+            try:
+                return self._call(fn, *args, **kwargs)
+            except Exception as e:
+                if _is_quota_429(e):
+                    with self.lock:
+                        self.backoff_s += delay
+                    if self.backoff_scale > 0:
+                        time.sleep(delay * self.backoff_scale)
+                    delay *= 2
+                    continue
+                raise
+        return self._call(fn, *args, **kwargs)
+
+    # --------- stats ---------
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.requests: Counter = Counter()
+            self.throttled = 0
+            self.backoff_s = 0.0
+
+    def reset_caches(self) -> None:
+        self._ws_cache.clear()
+        self._hdr_cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            reqs = dict(self.requests)
+            throttled = self.throttled
+            backoff_s = self.backoff_s
+        reads = sum(n for (op, _), n in reqs.items() if op in READ_OPS)
+        writes = sum(n for (op, _), n in reqs.items() if op in WRITE_OPS)
+        return {
+            "requests": reads + writes,
+            "reads": reads,
+            "writes": writes,
+            "throttled": throttled,
+            "backoff_s": backoff_s,
+            "by_op": reqs,
+        }
+
+    def table(self, title: str) -> FakeWorksheet:
+        return self._sh._tabs[title]
@@ -0,0 +1,326 @@
+# benchmarks/loadtest.py
+# -*- coding: utf-8 -*-
+"""
+Test de charge des interactions: N VIP lancent /qcm start et/ou
+/hunt daily en même temps, puis cliquent les boutons des Views.
+
+On appelle les VRAIS callbacks (bot.py, ui.py, hunt_ui.py) avec des
+interactions simulées (benchmarks/fake_discord.py), sur la boucle
+asyncio, contre le faux stockage (FakeSheetsService) ou l'émulateur
+HTTP (benchmarks/sheets_emulator.py + gspread).
+
+    python -m benchmarks.loadtest --users 50 --scenario mix
+    python -m benchmarks.loadtest --users 50 --latency-ms 120 --rate-429 0.01
+    python -m benchmarks.loadtest --backend emulator --users 50 --read-quota 300
+
+Rapport par type d'interaction: débit, latence d'ack et de fin
+(p50/p95/p99/max), acks > 3 s (Discord invalide l'interaction),
+appels Sheets par interaction, erreurs; + retard max de la boucle.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import sys
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("DISCORD_TOKEN", "loadtest")
+os.environ.setdefault("SHEET_ID", "loadtest")
+os.environ.setdefault("GUILD_ID", "1")
+
+import discord
+
+import bot
+import hunt_ui
+import services
+import ui
+
+from benchmarks import datagen
+from benchmarks.fake_discord import FakeDiscord, FakeInteraction, FakeMember, FakeMessage, InteractionRecord
+from benchmarks.fake_sheets import FakeSheetsService
+
+ACK_DEADLINE = 3.0
+
+_CURRENT: contextvars.ContextVar[Optional[InteractionRecord]] = contextvars.ContextVar("loadtest_interaction", default=None)
+
+
+def count_sheets_calls(sheets: services.SheetsService) -> None:
+    """Attribue chaque requête Sheets (retries inclus) à l'interaction en cours."""
+    orig = sheets._call
+
+    def _counted(fn, *args, **kwargs):
+        rec = _CURRENT.get()
+        if rec is not None:
+            rec.sheets_calls += 1
+        return orig(fn, *args, **kwargs)
+
+    sheets._call = _counted  # type: ignore[method-assign]
+
+
+class Harness:
+    def __init__(self, client: FakeDiscord, *, think: float, think_jitter: float, seed: int):
+        self.client = client
+        self.think = think
+        self.think_jitter = think_jitter
+        self.rnd = random.Random(seed)
+        self.records: List[InteractionRecord] = []
+
+    async def pause(self) -> float:
+        """Attend le temps de réflexion; renvoie l'instant prévu du clic (même si la boucle se réveille en retard)."""
+        delay = self.think + self.rnd.random() * self.think_jitter
+        at = self.client.now() + delay
+        await asyncio.sleep(delay)
+        return at
+
+    async def run(self, inter: FakeInteraction, fn: Callable[[FakeInteraction], Any]) -> FakeInteraction:
+        rec = inter.rec
+        self.records.append(rec)
+        token = _CURRENT.set(rec)
+        rec.started = self.client.now()
+        try:
+            await fn(inter)
+        except Exception as e:
+            rec.error = f"{type(e).__name__}: {e}"
+        finally:
+            rec.done = self.client.now()
+            _CURRENT.reset(token)
+        return inter
+
+    async def command(self, member: FakeMember, cmd, *, created: Optional[float] = None) -> FakeInteraction:
+        created = self.client.now() if created is None else created
+        inter = FakeInteraction(self.client, user=member, label=f"/{cmd.qualified_name}", created=created, command=cmd)
+        return await self.run(inter, cmd.callback)
+
+    async def click(self, member: FakeMember, message: FakeMessage, view: discord.ui.View, item: discord.ui.Item, *, created: Optional[float] = None) -> FakeInteraction:
+        created = self.client.now() if created is None else created
+        inter = FakeInteraction(
+            self.client, user=member, label=type(item).__name__, created=created,
+            message=message, custom_id=getattr(item, "custom_id", "") or "",
+        )
+
+        async def _dispatch(i: FakeInteraction):
+            # même ordre que discord.ui.View._scheduled_task
+            if await view.interaction_check(i):
+                await item.callback(i)
+
+        return await self.run(inter, _dispatch)
+
+
+# ==========================================================
+# Parcours utilisateur
+# ==========================================================
+async def qcm_flow(h: Harness, member: FakeMember, created: float) -> None:
+    inter = await h.command(member, bot.qcm_start, created=created)
+    view = inter.last_view()
+    if not isinstance(view, ui.QcmDailyView):
+        return
+    msg = FakeMessage(h.client, view=view)
+    for _ in range(len(view.questions) + 1):
+        if view.current_index >= len(view.questions):
+            break
+        buttons = [b for b in view.children if isinstance(b, ui.QcmAnswerButton) and not b.disabled]
+        if not buttons:
+            break
+        at = await h.pause()
+        before = view.current_index
+        await h.click(member, msg, view, h.rnd.choice(buttons), created=at)
+        if view.current_index == before:
+            break
+
+async def hunt_flow(h: Harness, member: FakeMember, created: float) -> None:
+    inter = await h.command(member, bot.hunt_daily, created=created)
+    view = inter.last_view()
+    if not isinstance(view, hunt_ui.HuntDailyView):
+        return
+    msg = FakeMessage(h.client, view=view)
+    for _ in range(int((view.state or {}).get("max_steps", 3) or 3) + 1):
+        buttons = [b for b in view.children if isinstance(b, hunt_ui.HuntDailyChoiceButton) and not b.disabled]
+        if not buttons:
+            break
+        at = await h.pause()
+        await h.click(member, msg, view, h.rnd.choice(buttons), created=at)
+
+async def user_session(h: Harness, member: FakeMember, scenario: str, delay: float, t0: float) -> None:
+    await asyncio.sleep(delay)
+    created = t0 + delay
+    if scenario == "qcm":
+        await qcm_flow(h, member, created)
+    elif scenario == "hunt":
+        await hunt_flow(h, member, created)
+    else:
+        flows = [qcm_flow, hunt_flow]
+        h.rnd.shuffle(flows)
+        await flows[0](h, member, created)
+        await flows[1](h, member, h.client.now())
+
+
+async def lag_sampler(state: Dict[str, float], interval: float = 0.05) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        t = loop.time()
+        await asyncio.sleep(interval)
+        state["max"] = max(state["max"], loop.time() - t - interval)
+
+
+# ==========================================================
+# Rapport
+# ==========================================================
+def _pct(vals: List[float], p: float) -> float:
+    if not vals:
+        return 0.0
+    s = sorted(vals)
+    return s[min(len(s) - 1, max(0, int(round(p * (len(s) - 1)))))]
+
+def summarize(records: List[InteractionRecord], wall: float) -> Dict[str, Any]:
+    by: Dict[str, List[InteractionRecord]] = defaultdict(list)
+    for r in records:
+        by[r.label].append(r)
+    by["TOTAL"] = list(records)
+
+    out: Dict[str, Any] = {}
+    for label, rs in by.items():
+        acks = [r.ack_latency for r in rs if r.ack_latency is not None]
+        lats = [r.latency for r in rs]
+        calls = [r.sheets_calls for r in rs]
+        errors: Dict[str, int] = defaultdict(int)
+        for r in rs:
+            if r.error:
+                errors[r.error.split(":", 1)[0]] += 1
+        out[label] = {
+            "n": len(rs),
+            "per_s": len(rs) / wall if wall > 0 else 0.0,
+            "ack_p50": _pct(acks, 0.50), "ack_p95": _pct(acks, 0.95), "ack_p99": _pct(acks, 0.99), "ack_max": max(acks or [0.0]),
+            "lat_p50": _pct(lats, 0.50), "lat_p95": _pct(lats, 0.95), "lat_p99": _pct(lats, 0.99), "lat_max": max(lats or [0.0]),
+            "ack_late": sum(1 for a in acks if a > ACK_DEADLINE),
+            "no_ack": sum(1 for r in rs if r.acked is None),
+            "sheets_mean": sum(calls) / len(calls) if calls else 0.0,
+            "sheets_max": max(calls or [0]),
+            "errors": dict(errors),
+        }
+    return out
+
+def print_report(summary: Dict[str, Any], wall: float, max_lag: float, sheets_stats: Optional[Dict[str, Any]]) -> None:
+    print(f"\nDurée: {wall:.1f}s | retard max boucle: {max_lag * 1000:.0f} ms")
+    print(f"{'interaction':28} {'n':>5} {'/s':>6} {'ack p50':>8} {'ack p95':>8} {'ack p99':>8} {'ack max':>8} {'>3s':>4} "
+          f"{'fin p50':>8} {'fin p95':>8} {'fin p99':>8} {'sheets/i':>8} {'max':>4} {'err':>4}")
+    for label in sorted(summary, key=lambda k: (k == "TOTAL", k)):
+        s = summary[label]
+        print(
+            f"{label:28} {s['n']:>5} {s['per_s']:>6.1f} {s['ack_p50']:>8.2f} {s['ack_p95']:>8.2f} {s['ack_p99']:>8.2f} {s['ack_max']:>8.2f} "
+            f"{s['ack_late'] + s['no_ack']:>4} {s['lat_p50']:>8.2f} {s['lat_p95']:>8.2f} {s['lat_p99']:>8.2f} "
+            f"{s['sheets_mean']:>8.1f} {s['sheets_max']:>4} {sum(s['errors'].values()):>4}"
+        )
+    errs = summary.get("TOTAL", {}).get("errors") or {}
+    if errs:
+        print("Erreurs:", ", ".join(f"{k} x{v}" for k, v in sorted(errs.items())))
+    if sheets_stats:
+        print(f"Sheets: {sheets_stats['requests']} requêtes ({sheets_stats['reads']} R / {sheets_stats['writes']} W), "
+              f"{sheets_stats['throttled']} x 429, backoff {sheets_stats['backoff_s']:.1f}s")
+
+
+# ==========================================================
+# Main
+# ==========================================================
+def build_backend(args, tables):
+    if args.backend == "emulator":
+        from benchmarks import sheets_emulator
+        server = sheets_emulator.start_in_thread(
+            tables, read_quota=args.read_quota, write_quota=args.write_quota,
+            latency=args.latency_ms / 1000.0,
+        )
+        os.environ["SHEETS_EMULATOR_URL"] = server.url
+        return services.SheetsService("loadtest"), server
+
+    fake = FakeSheetsService(
+        tables,
+        latency=args.latency_ms / 1000.0,
+        jitter=args.jitter_ms / 1000.0,
+        rate_429=args.rate_429,
+        backoff_scale=args.backoff_scale,
+        seed=args.seed,
+    )
+    return fake, None
+
+async def run(args) -> int:
+    n_vips = args.vips or max(args.users, 50, args.rows // 10)
+    tables = datagen.generate(args.rows, vips=n_vips, seed=args.seed)
+    sheets, server = build_backend(args, tables)
+    count_sheets_calls(sheets)
+    bot.sheets = sheets
+    bot._VIP_CACHE.update({"ts": 0.0, "rows": []})
+
+    hdr = tables["VIP"][0]
+    vips = [dict(zip(hdr, r)) for r in tables["VIP"][1:]]
+    vips = [v for v in vips if v["status"] == "ACTIVE"]
+    rnd = random.Random(args.seed)
+    rnd.shuffle(vips)
+    members = [FakeMember(int(v["discord_id"]), services.display_name(v["pseudo"])) for v in vips[: args.users]]
+
+    client = FakeDiscord(rest_latency=args.rest_ms / 1000.0)
+    h = Harness(client, think=args.think_ms / 1000.0, think_jitter=args.think_jitter_ms / 1000.0, seed=args.seed)
+
+    lag = {"max": 0.0}
+    sampler = asyncio.create_task(lag_sampler(lag))
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    tasks = [
+        asyncio.create_task(user_session(h, m, args.scenario, rnd.random() * args.ramp, t0))
+        for m in members
+    ]
+    await asyncio.gather(*tasks)
+    wall = loop.time() - t0
+    sampler.cancel()
+
+    # tâches orphelines lancées par les Views (ex: tick QCM)
+    for t in asyncio.all_tasks():
+        if t is not asyncio.current_task():
+            t.cancel()
+
+    summary = summarize(h.records, wall)
+    stats = sheets.stats() if isinstance(sheets, FakeSheetsService) else None
+    print(f"[loadtest] {len(members)} utilisateurs, scénario={args.scenario}, backend={args.backend}")
+    print_report(summary, wall, lag["max"], stats)
+    if server is not None:
+        print("Émulateur:", server.counts)
+        server.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "wall_s": wall, "max_loop_lag_s": lag["max"], "summary": summary}, f, ensure_ascii=False, indent=2)
+        print(f"Résultats: {args.json}")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Test de charge des interactions (callbacks réels, Discord simulé).")
+    p.add_argument("--users", type=int, default=50, help="VIP simultanés")
+    p.add_argument("--scenario", choices=["qcm", "hunt", "mix"], default="mix")
+    p.add_argument("--ramp", type=float, default=1.0, help="arrivées étalées sur N secondes (0 = toutes en même temps)")
+    p.add_argument("--think-ms", type=float, default=800.0, help="temps de réflexion entre deux clics")
+    p.add_argument("--think-jitter-ms", type=float, default=1200.0)
+    p.add_argument("--rest-ms", type=float, default=60.0, help="latence des appels REST Discord simulés")
+    p.add_argument("--backend", choices=["fake", "emulator"], default="fake")
+    p.add_argument("--rows", type=int, default=10000, help="taille LOG/QCM_LOG")
+    p.add_argument("--vips", type=int, default=None)
+    p.add_argument("--latency-ms", type=float, default=80.0, help="latence par requête Sheets")
+    p.add_argument("--jitter-ms", type=float, default=40.0)
+    p.add_argument("--rate-429", type=float, default=0.0, help="(fake) probabilité de 429 par requête")
+    p.add_argument("--backoff-scale", type=float, default=1.0, help="(fake) fraction du backoff 429 réellement dormie")
+    p.add_argument("--read-quota", type=int, default=300, help="(emulator) lectures/min")
+    p.add_argument("--write-quota", type=int, default=300, help="(emulator) écritures/min")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--json", default="")
+    args = p.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
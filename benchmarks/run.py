@@ -0,0 +1,261 @@
+# benchmarks/run.py
+# -*- coding: utf-8 -*-
+"""
+Lance les benchmarks hors-ligne contre FakeSheetsService.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 1000,10000 --repeat 20 --only sales_summary,vip_autocomplete
+    python -m benchmarks.run --latency-ms 80 --jitter-ms 40 --rate-429 0.02 --json out.json
+
+Pour chaque taille (lignes LOG / QCM_LOG) et chaque benchmark:
+temps par appel (moyenne, p50, p95, max) et requêtes Sheets par appel
+(lectures / écritures / 429). Avec latence à 0 on mesure le coût CPU
+pur (parsing, scans); avec latence on voit l'effet du nombre d'appels.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# bot.py refuse de s'importer sans ces variables (aucune connexion n'est faite)
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+os.environ.setdefault("SHEET_ID", "benchmark")
+os.environ.setdefault("GUILD_ID", "1")
+
+import domain
+import hunt_rpg
+import services
+
+from benchmarks import datagen
+from benchmarks.fake_sheets import FakeSheetsService
+
+DEFAULT_SIZES = "1000,10000,100000"
+
+
+class Context:
+    def __init__(self, svc: FakeSheetsService, tables: Dict[str, List[List[Any]]], seed: int):
+        self.svc = svc
+        self.rnd = random.Random(seed)
+        hdr = tables["VIP"][0]
+        self.vips = [dict(zip(hdr, r)) for r in tables["VIP"][1:]]
+        self.active = [v for v in self.vips if v["status"] == "ACTIVE"]
+        self.loop = asyncio.new_event_loop()
+
+    def pick_vip(self) -> Dict[str, Any]:
+        return self.rnd.choice(self.active)
+
+
+class Bench:
+    """
+    prepare(ctx, i) -> args (non chronométré), op(ctx, args) chronométré.
+    per_size=False: ne dépend pas du volume (mesuré une seule fois).
+    """
+    def __init__(self, name: str, op: Callable, prepare: Optional[Callable] = None, per_size: bool = True):
+        self.name = name
+        self.op = op
+        self.prepare = prepare or (lambda ctx, i: None)
+        self.per_size = per_size
+
+
+# ==========================================================
+# Benchmarks
+# ==========================================================
+def _add_points(ctx: Context, args):
+    code = args["code_vip"]
+    return domain.add_points_by_action(ctx.svc, code, "ACHAT", 1, staff_id=1, reason="vente:TSHIRT", author_is_hg=False)
+
+def _check_limit(ctx: Context, args):
+    # 3/semaine => count_usage() (scan LOG)
+    return domain.check_action_limit(ctx.svc, args["code_vip"], "ACHAT_LIMITEE", 1, "", False)
+
+def _sales_summary(ctx: Context, args):
+    return domain.sales_summary(ctx.svc, period="week")
+
+def _qcm_prepare(ctx: Context, i: int):
+    questions = domain.qcm_get_questions(ctx.svc)
+    return {"vip": ctx.pick_vip(), "q": ctx.rnd.choice(questions), "q_index": ctx.rnd.randint(1, domain.QCM_DAILY_QUESTIONS)}
+
+def _qcm_submit(ctx: Context, args):
+    vip, q = args["vip"], args["q"]
+    return domain.qcm_submit_answer(
+        ctx.svc,
+        discord_id=int(vip["discord_id"]),
+        code_vip=vip["code_vip"],
+        q=q,
+        q_index=args["q_index"],
+        choice=q["correct"],
+        elapsed_sec=5,
+        chrono_limit_sec=domain.QCM_CHRONO_SEC,
+    )
+
+def _autocomplete_prepare(ctx: Context, i: int):
+    pseudo = services.display_name(ctx.pick_vip()["pseudo"]).lower()
+    return pseudo[: ctx.rnd.randint(2, 4)]
+
+def _autocomplete(ctx: Context, current: str):
+    import bot
+    return ctx.loop.run_until_complete(bot.vip_autocomplete(None, current))
+
+def _daily_prepare(ctx: Context, i: int):
+    vip = ctx.pick_vip()
+    did = int(vip["discord_id"])
+    row_i, player, state = hunt_rpg.begin_or_resume_daily(ctx.svc, discord_id=did)
+    return {"row_i": row_i, "player": player, "state": state, "discord_id": did}
+
+def _daily_choice(ctx: Context, args):
+    return hunt_rpg.apply_daily_choice(
+        ctx.svc,
+        player_row_i=args["row_i"],
+        player=args["player"],
+        state=args["state"],
+        discord_id=args["discord_id"],
+        choice=ctx.rnd.choice(["explore", "negotiate", "fight", "steal"]),
+    )
+
+def _card(ctx: Context, vip):
+    return services.generate_vip_card_image(
+        os.path.join(ROOT, "template.png"),
+        os.path.join(ROOT, "PaybAck.ttf"),
+        vip["code_vip"],
+        vip["pseudo"],
+        vip["dob"],
+        vip["phone"],
+        vip["bleeter"],
+    )
+
+BENCHES = [
+    Bench("add_points_by_action", _add_points, lambda ctx, i: ctx.pick_vip()),
+    Bench("check_action_limit", _check_limit, lambda ctx, i: ctx.pick_vip()),
+    Bench("sales_summary", _sales_summary),
+    Bench("qcm_submit_answer", _qcm_submit, _qcm_prepare),
+    Bench("vip_autocomplete", _autocomplete, _autocomplete_prepare),
+    Bench("hunt_rpg.apply_daily_choice", _daily_choice, _daily_prepare),
+    Bench("generate_vip_card_image", _card, lambda ctx, i: ctx.pick_vip(), per_size=False),
+]
+
+# ==========================================================
+# Runner
+# ==========================================================
+def _pct(sorted_vals: List[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, max(0, int(round(p * (len(sorted_vals) - 1)))))
+    return sorted_vals[k]
+
+def run_bench(bench: Bench, ctx: Context, repeat: int) -> Dict[str, Any]:
+    times: List[float] = []
+    reads = writes = throttled = 0
+    backoff = 0.0
+    for i in range(repeat):
+        args = bench.prepare(ctx, i)
+        before = ctx.svc.stats()
+        t0 = time.perf_counter()
+        bench.op(ctx, args)
+        times.append(time.perf_counter() - t0)
+        after = ctx.svc.stats()
+        reads += after["reads"] - before["reads"]
+        writes += after["writes"] - before["writes"]
+        throttled += after["throttled"] - before["throttled"]
+        backoff += after["backoff_s"] - before["backoff_s"]
+
+    s = sorted(times)
+    n = max(1, len(times))
+    return {
+        "bench": bench.name,
+        "n": len(times),
+        "mean_ms": statistics.fmean(times) * 1000 if times else 0.0,
+        "p50_ms": _pct(s, 0.50) * 1000,
+        "p95_ms": _pct(s, 0.95) * 1000,
+        "max_ms": (s[-1] if s else 0.0) * 1000,
+        "reads_per_op": reads / n,
+        "writes_per_op": writes / n,
+        "req_per_op": (reads + writes) / n,
+        "throttled": throttled,
+        "backoff_s": backoff,
+    }
+
+def _print_table(size: int, results: List[Dict[str, Any]]) -> None:
+    print(f"\n=== {size} lignes ===")
+    print(f"{'benchmark':30} {'n':>4} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'req/op':>7} {'R/op':>6} {'W/op':>6} {'429':>4} {'backoff s':>9}")
+    for r in results:
+        print(
+            f"{r['bench']:30} {r['n']:>4} {r['mean_ms']:>9.2f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['max_ms']:>9.2f}"
+            f" {r['req_per_op']:>7.1f} {r['reads_per_op']:>6.1f} {r['writes_per_op']:>6.1f} {r['throttled']:>4} {r['backoff_s']:>9.1f}"
+        )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmarks hors-ligne (FakeSheetsService).")
+    p.add_argument("--sizes", default=DEFAULT_SIZES, help="tailles LOG/QCM_LOG, ex: 1000,10000,100000")
+    p.add_argument("--vips", type=int, default=None, help="nombre de VIP (défaut: taille/10, min 50)")
+    p.add_argument("--repeat", type=int, default=10, help="appels par benchmark et par taille")
+    p.add_argument("--only", default="", help="liste de benchmarks (séparés par des virgules)")
+    p.add_argument("--latency-ms", type=float, default=0.0, help="latence simulée par requête")
+    p.add_argument("--jitter-ms", type=float, default=0.0, help="jitter aléatoire ajouté à la latence")
+    p.add_argument("--rate-429", type=float, default=0.0, help="probabilité de 429 par requête")
+    p.add_argument("--backoff-scale", type=float, default=0.0, help="fraction du backoff 429 réellement dormie (0 = compté seulement)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--json", default="", help="écrit les résultats dans ce fichier")
+    args = p.parse_args(argv)
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    only = {x.strip() for x in args.only.split(",") if x.strip()}
+    benches = [b for b in BENCHES if not only or b.name in only]
+    if only and not benches:
+        print("Aucun benchmark ne correspond. Disponibles:", ", ".join(b.name for b in BENCHES))
+        return 2
+
+    import bot  # vip_autocomplete lit bot.sheets via le cache VIP du module
+
+    report: Dict[str, Any] = {"config": vars(args), "sizes": {}}
+    done_once = set()
+    for size in sizes:
+        t0 = time.perf_counter()
+        tables = datagen.generate(size, vips=args.vips, seed=args.seed)
+        print(f"\n[datagen] {size} lignes, {len(tables['VIP']) - 1} VIP en {time.perf_counter() - t0:.1f}s")
+
+        results = []
+        for bench in benches:
+            if not bench.per_size and bench.name in done_once:
+                continue
+            # données fraîches par benchmark (les écritures d'un bench ne polluent pas le suivant)
+            svc = FakeSheetsService(
+                {k: [list(r) for r in v] for k, v in tables.items()},
+                latency=args.latency_ms / 1000.0,
+                jitter=args.jitter_ms / 1000.0,
+                rate_429=args.rate_429,
+                backoff_scale=args.backoff_scale,
+                seed=args.seed,
+            )
+            bot.sheets = svc
+            bot._VIP_CACHE.update({"ts": 0.0, "rows": []})
+
+            ctx = Context(svc, tables, args.seed)
+            try:
+                results.append(run_bench(bench, ctx, args.repeat))
+            finally:
+                ctx.loop.close()
+            done_once.add(bench.name)
+
+        _print_table(size, results)
+        report["sizes"][str(size)] = results
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nRésultats: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,453 @@
+# benchmarks/sheets_emulator.py
+# -*- coding: utf-8 -*-
+"""
+Émulateur local (HTTP) du sous-ensemble de l'API Google Sheets v4 utilisé
+par le bot via gspread. Aucune authentification, un seul classeur (l'ID
+demandé est ignoré).
+
+    python -m benchmarks.sheets_emulator --port 8787 --rows 10000
+    SHEETS_EMULATOR_URL=http://127.0.0.1:8787 python main.py
+
+Endpoints:
+- GET  /v4/spreadsheets/{id}                      métadonnées (onglets, gridProperties)
+- POST /v4/spreadsheets/{id}:batchUpdate          deleteDimension, addSheet
+- GET  /v4/spreadsheets/{id}/values/{range}       values.get
+- GET  /v4/spreadsheets/{id}/values:batchGet      values.batchGet
+- POST /v4/spreadsheets/{id}/values/{range}:append
+- PUT  /v4/spreadsheets/{id}/values/{range}       values.update
+- POST /v4/spreadsheets/{id}/values:batchUpdate
+
+Quotas: fenêtre glissante par minute (lectures / écritures séparées,
+comme Google: 300/min par défaut), 429 RESOURCE_EXHAUSTED au-delà.
+Les valeurs sont renvoyées en FORMATTED_VALUE (texte).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+DEFAULT_ROWS = 1000
+DEFAULT_COLS = 26
+
+
+def _cell(v: Any) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+class ApiError(Exception):
+    def __init__(self, code: int, status: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.message = message
+
+    def body(self) -> Dict[str, Any]:
+        return {"error": {"code": self.code, "message": self.message, "status": self.status}}
+
+
+class Quota:
+    """Fenêtre glissante: `limit` requêtes par `window` secondes (0 = illimité)."""
+    def __init__(self, name: str, limit: int, window: float = 60.0):
+        self.name = name
+        self.limit = int(limit)
+        self.window = float(window)
+        self._hits: Deque[float] = deque()
+
+    def take(self, now: float) -> bool:
+        if self.limit <= 0:
+            return True
+        while self._hits and now - self._hits[0] >= self.window:
+            self._hits.popleft()
+        if len(self._hits) >= self.limit:
+            return False
+        self._hits.append(now)
+        return True
+
+
+class Tab:
+    def __init__(self, sheet_id: int, title: str, rows: List[List[Any]]):
+        self.sheet_id = sheet_id
+        self.title = title
+        self.rows: List[List[str]] = [[_cell(v) for v in r] for r in rows]
+
+    def grid(self) -> Dict[str, int]:
+        width = max([len(r) for r in self.rows] + [DEFAULT_COLS])
+        return {"rowCount": max(len(self.rows), DEFAULT_ROWS), "columnCount": width}
+
+    def last_row(self) -> int:
+        for i in range(len(self.rows) - 1, -1, -1):
+            if any(c != "" for c in self.rows[i]):
+                return i + 1
+        return 0
+
+    def read(self, grid: Dict[str, int]) -> List[List[str]]:
+        r0 = grid.get("startRowIndex", 0)
+        r1 = grid.get("endRowIndex", len(self.rows))
+        c0 = grid.get("startColumnIndex", 0)
+        c1 = grid.get("endColumnIndex")
+        out = []
+        for r in self.rows[r0:r1]:
+            row = list(r[c0:c1] if c1 is not None else r[c0:])
+            while row and row[-1] == "":
+                row.pop()
+            out.append(row)
+        while out and not out[-1]:
+            out.pop()
+        return out
+
+    def write(self, r0: int, c0: int, values: List[List[Any]]) -> Tuple[int, int]:
+        width = 0
+        for i, row in enumerate(values):
+            ri = r0 + i
+            while len(self.rows) <= ri:
+                self.rows.append([])
+            target = self.rows[ri]
+            need = c0 + len(row)
+            if len(target) < need:
+                target.extend([""] * (need - len(target)))
+            for j, v in enumerate(row):
+                target[c0 + j] = _cell(v)
+            width = max(width, len(row))
+        return len(values), width
+
+    def delete_rows(self, start: int, end: int) -> None:
+        del self.rows[start:end]
+
+
+class Workbook:
+    def __init__(self, tables: Dict[str, List[List[Any]]], *, title: str = "Mikasa (emulator)"):
+        self.title = title
+        self.lock = threading.RLock()
+        self.tabs: Dict[str, Tab] = {}
+        for i, (name, rows) in enumerate(tables.items()):
+            self.tabs[name] = Tab(i + 1, name, rows)
+
+    def metadata(self, spreadsheet_id: str) -> Dict[str, Any]:
+        with self.lock:
+            sheets = [{
+                "properties": {
+                    "sheetId": t.sheet_id,
+                    "title": t.title,
+                    "index": i,
+                    "sheetType": "GRID",
+                    "gridProperties": t.grid(),
+                },
+            } for i, t in enumerate(self.tabs.values())]
+        return {
+            "spreadsheetId": spreadsheet_id,
+            "properties": {"title": self.title, "locale": "fr_FR", "timeZone": "Europe/Paris"},
+            "sheets": sheets,
+            "spreadsheetUrl": f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}",
+        }
+
+    def resolve(self, a1: str) -> Tuple[Tab, Dict[str, int], str]:
+        """"'LOG'!A1:B2" -> (onglet, grid range, partie A1)"""
+        a1 = a1.strip()
+        if "!" in a1:
+            name, cells = a1.rsplit("!", 1)
+        else:
+            name, cells = a1, ""
+        if name.startswith("'") and name.endswith("'"):
+            name = name[1:-1].replace("''", "'")
+        tab = self.tabs.get(name)
+        if tab is None:
+            raise ApiError(400, "INVALID_ARGUMENT", f"Unable to parse range: {a1}")
+        try:
+            grid = a1_range_to_grid_range(cells) if cells else {}
+        except Exception:
+            raise ApiError(400, "INVALID_ARGUMENT", f"Unable to parse range: {a1}")
+        return tab, grid, cells
+
+    @staticmethod
+    def label(tab: Tab, r0: int, c0: int, rows: int, cols: int) -> str:
+        start = rowcol_to_a1(r0 + 1, c0 + 1)
+        end = rowcol_to_a1(r0 + max(1, rows), c0 + max(1, cols))
+        name = "'" + tab.title.replace("'", "''") + "'"
+        return f"{name}!{start}:{end}"
+
+    # --------- values ---------
+    def values_get(self, a1: str) -> Dict[str, Any]:
+        with self.lock:
+            tab, grid, _ = self.resolve(a1)
+            values = tab.read(grid)
+            r0 = grid.get("startRowIndex", 0)
+            c0 = grid.get("startColumnIndex", 0)
+            width = max([len(r) for r in values] + [1])
+            out = {"range": self.label(tab, r0, c0, len(values), width), "majorDimension": "ROWS"}
+        if values:
+            out["values"] = values
+        return out
+
+    def values_update(self, spreadsheet_id: str, a1: str, values: List[List[Any]]) -> Dict[str, Any]:
+        with self.lock:
+            tab, grid, _ = self.resolve(a1)
+            r0 = grid.get("startRowIndex", 0)
+            c0 = grid.get("startColumnIndex", 0)
+            n_rows, n_cols = tab.write(r0, c0, values or [])
+            return {
+                "spreadsheetId": spreadsheet_id,
+                "updatedRange": self.label(tab, r0, c0, n_rows, n_cols),
+                "updatedRows": n_rows,
+                "updatedColumns": n_cols,
+                "updatedCells": sum(len(r) for r in values or []),
+            }
+
+    def values_append(self, spreadsheet_id: str, a1: str, values: List[List[Any]]) -> Dict[str, Any]:
+        with self.lock:
+            tab, grid, _ = self.resolve(a1)
+            c0 = grid.get("startColumnIndex", 0)
+            last = tab.last_row()
+            n_rows, n_cols = tab.write(last, c0, values or [])
+            return {
+                "spreadsheetId": spreadsheet_id,
+                "tableRange": self.label(tab, 0, c0, last, max(1, n_cols)),
+                "updates": {
+                    "spreadsheetId": spreadsheet_id,
+                    "updatedRange": self.label(tab, last, c0, n_rows, n_cols),
+                    "updatedRows": n_rows,
+                    "updatedColumns": n_cols,
+                    "updatedCells": sum(len(r) for r in values or []),
+                },
+            }
+
+    # --------- spreadsheet batchUpdate ---------
+    def batch_update(self, spreadsheet_id: str, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        replies = []
+        with self.lock:
+            for req in requests:
+                if "deleteDimension" in req:
+                    rng = req["deleteDimension"]["range"]
+                    tab = next((t for t in self.tabs.values() if t.sheet_id == rng.get("sheetId")), None)
+                    if tab is None:
+                        raise ApiError(400, "INVALID_ARGUMENT", f"No grid with id: {rng.get('sheetId')}")
+                    start, end = int(rng.get("startIndex", 0)), int(rng.get("endIndex", 0))
+                    if rng.get("dimension") == "COLUMNS":
+                        for r in tab.rows:
+                            del r[start:end]
+                    else:
+                        tab.delete_rows(start, end)
+                    replies.append({})
+                elif "addSheet" in req:
+                    props = req["addSheet"].get("properties", {})
+                    title = props.get("title") or f"Feuille {len(self.tabs) + 1}"
+                    if title in self.tabs:
+                        raise ApiError(400, "INVALID_ARGUMENT", f'A sheet with the name "{title}" already exists.')
+                    tab = Tab(max([t.sheet_id for t in self.tabs.values()] + [0]) + 1, title, [])
+                    self.tabs[title] = tab
+                    replies.append({"addSheet": {"properties": {"sheetId": tab.sheet_id, "title": title, "gridProperties": tab.grid()}}})
+                else:
+                    raise ApiError(400, "INVALID_ARGUMENT", f"Requête non émulée: {list(req)}")
+        return {"spreadsheetId": spreadsheet_id, "replies": replies}
+
+    def dump(self) -> Dict[str, List[List[str]]]:
+        with self.lock:
+            return {name: [list(r) for r in t.rows] for name, t in self.tabs.items()}
+
+
+class EmulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        addr: Tuple[str, int],
+        workbook: Workbook,
+        *,
+        read_quota: int = 300,
+        write_quota: int = 300,
+        window: float = 60.0,
+        latency: float = 0.0,
+        verbose: bool = False,
+    ):
+        super().__init__(addr, _Handler)
+        self.workbook = workbook
+        self.read_quota = Quota("Read requests", read_quota, window)
+        self.write_quota = Quota("Write requests", write_quota, window)
+        self.quota_lock = threading.Lock()
+        self.latency = float(latency)
+        self.verbose = verbose
+        self.counts: Dict[str, int] = {"read": 0, "write": 0, "429": 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def charge(self, kind: str) -> None:
+        quota = self.read_quota if kind == "read" else self.write_quota
+        with self.quota_lock:
+            ok = quota.take(time.monotonic())
+            self.counts[kind if ok else "429"] += 1
+        if not ok:
+            raise ApiError(
+                429, "RESOURCE_EXHAUSTED",
+                f"Quota exceeded for quota metric '{quota.name}' and limit '{quota.name} per minute per user' "
+                f"of service 'sheets.googleapis.com' (emulator: {quota.limit}/{int(quota.window)}s).",
+            )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: EmulatorServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            sys.stderr.write("[emulator] " + (fmt % args) + "\n")
+
+    def _send(self, code: int, body: Dict[str, Any]) -> None:
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _body(self) -> Dict[str, Any]:
+        n = int(self.headers.get("Content-Length") or 0)
+        if n <= 0:
+            return {}
+        return json.loads(self.rfile.read(n).decode("utf-8") or "{}")
+
+    def _dispatch(self, method: str) -> None:
+        try:
+            body = self._body() if method in ("POST", "PUT") else {}
+            parts = urlsplit(self.path)
+            query = parse_qs(parts.query)
+            # on garde le chemin encodé: un range peut contenir '/' ou ':'
+            path = parts.path
+            prefix = "/v4/spreadsheets/"
+            if not path.startswith(prefix):
+                raise ApiError(404, "NOT_FOUND", "Requested entity was not found.")
+            rest = path[len(prefix):]
+            if self.server.latency > 0:
+                time.sleep(self.server.latency)
+            self._send(200, self._route(method, rest, query, body))
+        except ApiError as e:
+            self._send(e.code, e.body())
+        except Exception as e:
+            self._send(500, ApiError(500, "INTERNAL", repr(e)).body())
+
+    def _route(self, method: str, rest: str, query: Dict[str, List[str]], body: Dict[str, Any]) -> Dict[str, Any]:
+        wb = self.server.workbook
+        if "/values" not in rest:
+            sid = rest
+            if method == "GET" and "/" not in sid and ":" not in sid:
+                self.server.charge("read")
+                return wb.metadata(unquote(sid))
+            if method == "POST" and sid.endswith(":batchUpdate"):
+                self.server.charge("write")
+                return wb.batch_update(unquote(sid[: -len(":batchUpdate")]), body.get("requests") or [])
+            raise ApiError(404, "NOT_FOUND", "Requested entity was not found.")
+
+        sid, tail = rest.split("/values", 1)
+        sid = unquote(sid)
+        if tail == ":batchGet" and method == "GET":
+            self.server.charge("read")
+            return {"spreadsheetId": sid, "valueRanges": [wb.values_get(r) for r in query.get("ranges", [])]}
+        if tail == ":batchUpdate" and method == "POST":
+            self.server.charge("write")
+            data = body.get("data") or []
+            responses = [wb.values_update(sid, d["range"], d.get("values") or []) for d in data]
+            return {
+                "spreadsheetId": sid,
+                "totalUpdatedRows": sum(r["updatedRows"] for r in responses),
+                "totalUpdatedColumns": sum(r["updatedColumns"] for r in responses),
+                "totalUpdatedCells": sum(r["updatedCells"] for r in responses),
+                "totalUpdatedSheets": len({r["updatedRange"].rsplit("!", 1)[0] for r in responses}),
+                "responses": responses,
+            }
+        if not tail.startswith("/"):
+            raise ApiError(404, "NOT_FOUND", "Requested entity was not found.")
+
+        rng = tail[1:]
+        if method == "POST" and rng.endswith(":append"):
+            self.server.charge("write")
+            return wb.values_append(sid, unquote(rng[: -len(":append")]), body.get("values") or [])
+        if method == "PUT":
+            self.server.charge("write")
+            return wb.values_update(sid, unquote(rng), body.get("values") or [])
+        if method == "GET":
+            self.server.charge("read")
+            return wb.values_get(unquote(rng))
+        raise ApiError(404, "NOT_FOUND", "Requested entity was not found.")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+
+def start_in_thread(tables: Dict[str, List[List[Any]]], *, host: str = "127.0.0.1", port: int = 0, **kwargs) -> EmulatorServer:
+    """Démarre l'émulateur dans un thread (port=0 => port libre). server.shutdown() pour arrêter."""
+    server = EmulatorServer((host, port), Workbook(tables), **kwargs)
+    threading.Thread(target=server.serve_forever, name="sheets-emulator", daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Émulateur local de l'API Google Sheets v4.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8787)
+    p.add_argument("--rows", type=int, default=1000, help="taille LOG/QCM_LOG générée (benchmarks.datagen)")
+    p.add_argument("--vips", type=int, default=None)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--load", default="", help="JSON {onglet: [[...], ...]} à la place des données générées")
+    p.add_argument("--save", default="", help="écrit l'état du classeur (JSON) à l'arrêt")
+    p.add_argument("--read-quota", type=int, default=300, help="lectures par fenêtre (0 = illimité)")
+    p.add_argument("--write-quota", type=int, default=300, help="écritures par fenêtre (0 = illimité)")
+    p.add_argument("--window", type=float, default=60.0, help="fenêtre de quota en secondes")
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--verbose", action="store_true")
+    args = p.parse_args(argv)
+
+    if args.load:
+        with open(args.load, "r", encoding="utf-8") as f:
+            tables = json.load(f)
+    else:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if root not in sys.path:
+            sys.path.insert(0, root)
+        from benchmarks import datagen
+        tables = datagen.generate(args.rows, vips=args.vips, seed=args.seed)
+
+    server = EmulatorServer(
+        (args.host, args.port), Workbook(tables),
+        read_quota=args.read_quota, write_quota=args.write_quota, window=args.window,
+        latency=args.latency_ms / 1000.0, verbose=args.verbose,
+    )
+    print(f"Sheets emulator: {server.url} ({len(tables)} onglets) | SHEETS_EMULATOR_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Requêtes:", server.counts)
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(server.workbook.dump(), f, ensure_ascii=False)
+            print("État écrit:", args.save)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,15 @@
 # bot.py
 # -*- coding: utf-8 -*-
-import json, random
+if __name__ == "__main__":
+    # python bot.py => relancé via main.py (sinon chaque worker card_pool, en
+    # spawn, réimporterait et réexécuterait tout ce module)
+    import os, sys
+    os.execv(sys.executable, [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py"), *sys.argv[1:]])
+
+import startup  # en premier: T0 du rapport de démarrage
+import json
 import os
+import time
 import io
 import traceback
 import asyncio
@@ -10,13 +18,25 @@ from typing import Optional, Any, Awaitable, Callable
 import discord
 from discord import app_commands
 from discord.ext import commands
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
+startup.mark("import:discord")
 
 from services import SheetsService, S3Service, catify, display_name, normalize_code, gen_code, now_iso, fmt_fr
 import services
 import domain
 import ui
+import metrics
+import loop_watchdog
+import card_pool
+import cave
+import command_sync
+import jobs
+import qcm_session
+import qcm_daily
+import tabcache
+import warmup
+import assets
+import vip_cards
+import vip_search
 
 import hunt_services as hs
 import hunt_domain as hd
@@ -25,6 +45,7 @@ import hunt_rpg as rpg
 
 import hunt_data as hda
 import functools
+startup.mark("import:modules")
 
 from datetime import datetime
 from services import now_fr, now_iso, normalize_code, display_name
@@ -112,12 +133,38 @@ if _raw:
 # Bot init (slash only = stable)
 # ----------------------------
 intents = discord.Intents.default()
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+class MikasaBot(commands.Bot):
+    # True une fois le warm-up terminé sans erreur (sinon: caches froids, remplis au premier usage)
+    mikasa_warm = False
+
+    async def setup_hook(self):
+        # une fois par process, avant la connexion au gateway (pas à chaque reconnexion):
+        # aucune interaction n'arrive avant la fin du warm-up
+        startup.mark("setup_hook")
+        # hors warm-up: ni WARMUP=0 ni WARMUP_TIMEOUT_S ne doivent sauter / couper le sync
+        try:
+            await command_sync.sync_if_changed(self, self.tree, GUILD_ID)
+        except Exception as e:
+            print("Sync slash failed:", e)
+        startup.mark("commands_synced")
+        self.mikasa_warm = await warmup.run(build_warmup(self))
+        if sheets.tabs:
+            self.loop.create_task(tabs_background())
+        self.loop.create_task(qcm_sessions.writer.run())
+
+bot = MikasaBot(command_prefix="!", intents=intents)
 
 sheets = SheetsService(SHEET_ID, creds_path="credentials.json")
 s3 = S3Service()
 
-scheduler = AsyncIOScheduler(timezone=services.PARIS_TZ)
+# jobs planifiés: AsyncIOScheduler créé au premier on_ready (import d'apscheduler
+# différé), travail Sheets dans le pool des jobs, historique dans JOB_STATE_PATH
+job_runner = jobs.JobRunner()
+
+# QCM: sessions en mémoire, réponses écrites par lots (qcm_session.QcmWriter);
+# `sheets` relu à chaque appel (remplaçable après import: benchmarks/loadtest.py)
+qcm_sessions = qcm_session.QcmSessions(lambda: sheets)
 
 # ----------------------------
 # Groups (slash)
@@ -165,17 +212,40 @@ vip_log_group = app_commands.Group(
 # ----------------------------
 # VIP autocomplete cache
 # ----------------------------
-_VIP_CACHE = {"ts": 0.0, "rows": []}
+_VIP_CACHE = {"ts": 0.0, "rows": [], "index": None}
+
+def _vip_cache_fresh(now: float) -> bool:
+    # refresh toutes les 60s
+    return bool(_VIP_CACHE["rows"]) and (now - _VIP_CACHE["ts"]) <= 60
 
 def _vip_cache_get():
     import time
     now = time.time()
-    # refresh toutes les 60s
-    if not _VIP_CACHE["rows"] or (now - _VIP_CACHE["ts"]) > 60:
-        _VIP_CACHE["rows"] = sheets.get_all_records("VIP")
+    if not _vip_cache_fresh(now):
+        metrics.cache_miss("tab:VIP")
+        _VIP_CACHE["rows"] = sheets.read_records("VIP")
+        startup.mark("first_cache_warm")
         _VIP_CACHE["ts"] = now
+    else:
+        metrics.cache_hit("tab:VIP")
     return _VIP_CACHE["rows"]
 
+def _vip_index() -> vip_search.VipSearchIndex:
+    """Index de recherche du snapshot VIP courant (reconstruit seulement si le snapshot change)."""
+    rows = _vip_cache_get()
+    idx = vip_search.index_for(rows)
+    _VIP_CACHE["index"] = idx
+    return idx
+
+async def _vip_index_async() -> vip_search.VipSearchIndex:
+    """Comme _vip_index, mais relecture du snapshot et (re)construction de l'index hors de la boucle."""
+    if _vip_cache_fresh(time.time()):
+        idx = vip_search.cached_index(_VIP_CACHE["rows"])
+        if idx is not None:
+            metrics.cache_hit("tab:VIP")
+            return idx
+    return await asyncio.to_thread(_vip_index)
+
 def _vip_label(r: dict) -> str:
     code = normalize_code(str(r.get("code_vip", "")))
     pseudo = display_name(r.get("pseudo", code))
@@ -238,8 +308,25 @@ async def reply_ephemeral(interaction: discord.Interaction, content: str = "", *
 # ----------------------------
 # Error handler (unique)
 # ----------------------------
+def _observe_interaction(interaction: discord.Interaction, status: str):
+    cmd = interaction.command
+    name = cmd.qualified_name if cmd else "?"
+    elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    metrics.INTERACTION_LATENCY.observe(max(0.0, elapsed), command=name, status=status)
+
+@bot.event
+async def on_interaction(interaction: discord.Interaction):
+    # délai de réception: grimpe quand la boucle est bloquée
+    elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    metrics.INTERACTION_DISPATCH.observe(max(0.0, elapsed), type=interaction.type.name)
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    _observe_interaction(interaction, "ok")
+
 @bot.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    _observe_interaction(interaction, "error")
     original = getattr(error, "original", error)
     print("=== SLASH ERROR ===")
     traceback.print_exception(type(original), original, original.__traceback__)
@@ -366,6 +453,12 @@ async def post_weekly_challenges_announcement():
 
     await ch.send("**" + title + "**\n" + "\n".join(lines))
 
+def _qcm_weekly_results():
+    """(semaine, classement, déjà distribué) — lectures Sheets, hors boucle."""
+    wk, ordered = domain.qcm_weekly_leaderboard(sheets)
+    already = bool(ordered) and domain.qcm_week_already_awarded(sheets, wk)
+    return wk, ordered, already
+
 async def post_qcm_weekly_announcement_and_awards():
     if not ANNOUNCE_CHANNEL_ID:
         return
@@ -373,7 +466,8 @@ async def post_qcm_weekly_announcement_and_awards():
     if not ch:
         return
 
-    wk, ordered = domain.qcm_weekly_leaderboard(sheets)
+    # Anti double-award (lu avec le classement)
+    wk, ordered, already = await job_runner.offload(_qcm_weekly_results)
 
     # Pas de participants
     if not ordered:
@@ -384,12 +478,6 @@ async def post_qcm_weekly_announcement_and_awards():
         )
         return await ch.send(embed=e)
 
-    # Anti double-award
-    if domain.qcm_week_already_awarded(sheets, wk):
-        already = True
-    else:
-        already = False
-
     # Compose TOP
     podium = ordered[:3]
     lines = []
@@ -417,51 +505,12 @@ async def post_qcm_weekly_announcement_and_awards():
         await ch.send(embed=e)
         return
 
-    # -------- Awards (system) --------
-    # 1) Podium
-    podium_bonus = [("QCM_BONUS_W1", 1), ("QCM_BONUS_W2", 1), ("QCM_BONUS_W3", 1)]
-    for idx, (did, st) in enumerate(podium):
-        # did = discord_id -> retrouver VIP
-        try:
-            did_int = int(did)
-        except Exception:
-            continue
-
-        row_i, vip = domain.find_vip_row_by_discord_id(sheets, did_int)
-        if not row_i or not vip:
-            continue
-
-        code = domain.normalize_code(str(vip.get("code_vip", "")))
-        action_key = podium_bonus[idx][0]
-        # Force HG (system)
-        domain.add_points_by_action(
-            sheets, code, action_key, 1, 0,
-            reason=f"QCM weekly podium | week:{wk}",
-            author_is_hg=True
-        )
-
-    # 2) Participant bonus (>= 5 réponses dans la semaine)
-    for did, st in ordered:
-        if st["total"] < 5:
-            continue
-        try:
-            did_int = int(did)
-        except Exception:
-            continue
-
-        row_i, vip = domain.find_vip_row_by_discord_id(sheets, did_int)
-        if not row_i or not vip:
-            continue
-
-        code = domain.normalize_code(str(vip.get("code_vip", "")))
-        domain.add_points_by_action(
-            sheets, code, "QCM_BONUS_PARTICIPANT", 1, 0,
-            reason=f"QCM weekly participation | week:{wk} | total:{st['total']}",
-            author_is_hg=True
-        )
-
-    # 3) Marqueur anti double-award
-    domain.qcm_mark_week_awarded(sheets, wk, staff_id=0)
+    # -------- Awards (system): un index, un append LOG, un batch VIP --------
+    _, _, already = await job_runner.offload(domain.qcm_award_weekly_bonuses, sheets, wk=wk, ordered=ordered)
+    if already:
+        e.set_footer(text="⚠️ Bonus déjà distribués (anti double-award). 🐾")
+        await ch.send(embed=e)
+        return
 
     e.set_footer(text="✅ Bonus distribués. Mikasa tamponne le classement. *clac* 🐾")
     await ch.send(embed=e)
@@ -470,34 +519,12 @@ async def post_qcm_weekly_announcement_and_awards():
 # VIP AUTOCOMPLETE
 
 async def vip_autocomplete(interaction: discord.Interaction, current: str):
-    current = (current or "").strip().lower()
-    rows = _vip_cache_get()
-
-    scored = []
-    for r in rows:
-        code = normalize_code(str(r.get("code_vip", "")))
-        pseudo = display_name(r.get("pseudo", code))
-        hay = f"{code} {pseudo}".lower()
-
-        if not current:
-            score = 1
-        elif hay.startswith(current):
-            score = 100
-        elif current in hay:
-            score = 50
-        else:
-            continue
-
-        scored.append((score, pseudo, code, r))
-
-    # tri: meilleur score puis alpha
-    scored.sort(key=lambda x: (-x[0], x[1].lower(), x[2]))
-
-    # Discord: max 25 suggestions
-    out = []
-    for score, pseudo, code, r in scored[:25]:
-        out.append(app_commands.Choice(name=f"{pseudo} ({code})", value=code))
-    return out
+    idx = await _vip_index_async()
+    # préfixe (code ou pseudo) puis "contient", tri alpha — Discord: max 25 suggestions
+    return [
+        app_commands.Choice(name=f"{e.pseudo} ({e.code})", value=e.code)
+        for _, e in idx.search(current, limit=25)
+    ]
 
 # ----------------------------
 # /vip actions
@@ -745,7 +772,6 @@ async def vip_card_generate(interaction: discord.Interaction, code_vip: str):
     full_name = str(vip.get("pseudo", "")).strip()
     dob = str(vip.get("dob", "")).strip()
     phone = str(vip.get("phone", "")).strip()
-    bleeter = str(vip.get("bleeter", "")).strip()
 
     if not dob or not phone:
         return await interaction.followup.send("😾 Impossible: il manque **dob** ou **phone**.", ephemeral=True)
@@ -755,18 +781,21 @@ async def vip_card_generate(interaction: discord.Interaction, code_vip: str):
 
     await interaction.followup.send("🖨️ Mikasa imprime… *prrrt prrrt* 🐾", ephemeral=False)
 
-    png = services.generate_vip_card_image(
-        VIP_TEMPLATE_PATH, VIP_FONT_PATH,
-        normalize_code(code_vip), full_name, dob, phone, bleeter
-    )
-    object_key = f"vip_cards/{normalize_code(code_vip)}.png"
-    url = s3.upload_png(png, object_key)
+    # rendu dans le pool de processus (la boucle reste libre),
+    # sauté si la clé de rendu n'a pas changé (cache disque / objet S3 existant)
+    card = await vip_cards.ensure_card(s3, VIP_TEMPLATE_PATH, VIP_FONT_PATH, vip)
 
-    sheets.update_cell_by_header("VIP", row_i, "card_url", url)
-    sheets.update_cell_by_header("VIP", row_i, "card_generated_at", now_iso())
-    sheets.update_cell_by_header("VIP", row_i, "card_generated_by", str(interaction.user.id))
+    if card.source == "render" or str(vip.get("card_url", "")).strip() != card.url:
+        sheets.batch_update_by_header("VIP", {row_i: {
+            "card_url": card.url,
+            "card_generated_at": now_iso(),
+            "card_generated_by": str(interaction.user.id),
+        }})
 
-    file = discord.File(io.BytesIO(png), filename=f"VIP_{normalize_code(code_vip)}.png")
+    filename = f"VIP_{normalize_code(code_vip)}.{card.ext}"
+    file = None
+    if card.data is not None:
+        file = discord.File(io.BytesIO(card.data), filename=filename)
 
     # 🔥 message PUBLIC
     public_embed = discord.Embed(
@@ -774,11 +803,18 @@ async def vip_card_generate(interaction: discord.Interaction, code_vip: str):
         description=f"✅ Carte VIP générée pour **{display_name(full_name)}**\n🎴 Code: `{normalize_code(code_vip)}`\n👤 Imprimée par: {interaction.user.mention}",
         color=discord.Color.green()
     )
-    public_embed.set_image(url=f"attachment://VIP_{normalize_code(code_vip)}.png")
+    if file is not None:
+        public_embed.set_image(url=f"attachment://{filename}")
+    else:
+        # carte inchangée, pas de copie locale: on affiche l'objet S3 existant
+        public_embed.set_image(url=(await s3.asigned_url(card.object_key, expires_seconds=3600)) or card.url)
     public_embed.set_footer(text="Mikasa crache le papier… prrr 🐾")
 
     # envoi dans le salon
-    await interaction.channel.send(embed=public_embed, file=file)
+    if file is not None:
+        await interaction.channel.send(embed=public_embed, file=file)
+    else:
+        await interaction.channel.send(embed=public_embed)
 
     # et tu confirmes en privé (pour éviter spam)
     await interaction.followup.send(f"✅ Impression envoyée dans {interaction.channel.mention}", ephemeral=True)
@@ -802,7 +838,25 @@ async def vip_card_show(interaction: discord.Interaction, query: str):
     status = str(vip.get("status", "ACTIVE")).strip().upper()
     badge = "🟢" if status == "ACTIVE" else "🔴"
 
-    signed = s3.signed_url(f"vip_cards/{code_vip}.png", expires_seconds=3600) if s3.enabled() else None
+    # 1) cache disque local: pièce jointe directe, S3 pas sollicité
+    cached = await asyncio.to_thread(vip_cards.cached_card_file, VIP_TEMPLATE_PATH, VIP_FONT_PATH, vip)
+    if cached:
+        filename, data = cached
+        embed = discord.Embed(
+            title=f"{badge} Carte VIP de {pseudo}",
+            description=f"🎴 Code: `{code_vip}`",
+        )
+        embed.set_image(url=f"attachment://{filename}")
+        embed.set_footer(text="Mikasa entrouvre la cachette… prrr 🐾")
+        return await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(data), filename=filename), ephemeral=True)
+
+    # 2) S3: aperçu réduit si configuré, sinon carte au format courant, sinon ancienne carte PNG
+    signed = None
+    if s3.enabled():
+        for key in vip_cards.card_show_keys(code_vip):
+            signed = await s3.asigned_url(key, expires_seconds=3600)
+            if signed:
+                break
     if not signed:
         return await interaction.followup.send("😾 Carte introuvable. Génère-la avec `/vip card_generate`.", ephemeral=True)
 
@@ -815,6 +869,66 @@ async def vip_card_show(interaction: discord.Interaction, query: str):
     await interaction.followup.send(embed=embed, ephemeral=True)
 attach_safe_error_handler(vip_actions)
 # ----------------------------
+# /vip card_regen (HG) + job planifié
+# ----------------------------
+VIP_CARD_REGEN_CRON = (os.getenv("VIP_CARD_REGEN_CRON") or "").strip()  # ex: "30 4 * * mon" (vide => désactivé)
+VIP_CARD_UPLOAD_CONCURRENCY = int(os.getenv("VIP_CARD_UPLOAD_CONCURRENCY", "8"))
+
+async def run_card_regen(targets, *, by: str, force: bool = False, progress=None) -> vip_cards.RegenReport:
+    return await vip_cards.regenerate_cards(
+        sheets, s3, VIP_TEMPLATE_PATH, VIP_FONT_PATH, targets,
+        by=by,
+        upload_concurrency=VIP_CARD_UPLOAD_CONCURRENCY,
+        force=force,
+        progress=progress,
+    )
+
+async def scheduled_card_regen():
+    """Job planifié: régénère toutes les cartes déjà imprimées des VIP actifs."""
+    if not s3.enabled():
+        print("Card regen: S3 non configuré, job ignoré.")
+        return
+    rows = await job_runner.offload(sheets.get_all_records, "VIP")
+    targets = vip_cards.select_vips(rows, status="ACTIVE", only_existing=True)
+    await run_card_regen(targets, by="scheduler")
+
+@vip_group.command(name="card_regen", description="Régénérer les cartes VIP en masse (HG).")
+@hg_check()
+@app_commands.describe(
+    status="ACTIVE | ALL",
+    codes="Optionnel: codes séparés par des virgules",
+    only_existing="Seulement les VIP qui ont déjà une carte",
+    force="Re-rendre même les cartes inchangées",
+)
+async def vip_card_regen(interaction: discord.Interaction, status: str = "ACTIVE", codes: str = "", only_existing: bool = True, force: bool = False):
+    await defer_ephemeral(interaction)
+    if not s3.enabled():
+        return await interaction.followup.send("❌ S3 non configuré (AWS_ENDPOINT_URL / BUCKET).", ephemeral=True)
+
+    rows = await asyncio.to_thread(sheets.get_all_records, "VIP")
+    targets = vip_cards.select_vips(
+        rows,
+        codes=[c for c in codes.split(",") if c.strip()],
+        status=status,
+        only_existing=only_existing,
+    )
+    if not targets:
+        return await interaction.followup.send("🐾 Aucune carte à régénérer avec ces filtres.", ephemeral=True)
+
+    msg = await interaction.followup.send(f"🖨️ Régénération de **{len(targets)}** cartes… *prrrt*", ephemeral=True, wait=True)
+
+    async def progress(rep: vip_cards.RegenReport):
+        await msg.edit(content=f"🖨️ {rep.line()}")
+
+    rep = await run_card_regen(targets, by=str(interaction.user.id), force=force, progress=progress)
+
+    lines = [f"✅ Cartes régénérées: {rep.line()}", f"📝 {rep.cells} cellules VIP mises à jour (1 batch)."]
+    if rep.errors:
+        lines.append("⚠️ Erreurs:")
+        lines += [f"• {e}" for e in rep.errors[:10]]
+    await msg.edit(content="\n".join(lines))
+attach_safe_error_handler(vip_card_regen)
+# ----------------------------
 # /vip sales_sum 
 # ----------------------------
 @vip_group.command(name="sales_summary", description="Résumé des ventes (staff).")
@@ -935,18 +1049,16 @@ async def defi_week_announce(interaction: discord.Interaction):
 @hg_check()
 async def cave_list(interaction: discord.Interaction):
     await defer_ephemeral(interaction)
-    rows = sheets.get_all_records("VIP_BAN_CREATE")
-    if not rows:
+    idx = cave.get_index(sheets)
+    if not len(idx):
         return await interaction.followup.send("🐱 La cave est vide…", ephemeral=True)
 
     lines = []
-    for r in rows:
-        pseudo_ref_raw = str(r.get("pseudo_ref", "")).strip()
-        if not pseudo_ref_raw:
+    for b in idx.records:
+        if not b.pseudo_ref_raw:
             continue
-        aliases_norm = domain.split_aliases(r.get("aliases", ""))
-        aliases_display = ", ".join(display_name(a) for a in aliases_norm) if aliases_norm else ""
-        lines.append(f"🔒 **{display_name(pseudo_ref_raw)}**" + (f" _(alias: {aliases_display})_" if aliases_display else ""))
+        aliases_display = ", ".join(display_name(a) for a in b.aliases) if b.aliases else ""
+        lines.append(f"🔒 **{display_name(b.pseudo_ref_raw)}**" + (f" _(alias: {aliases_display})_" if aliases_display else ""))
 
     await interaction.followup.send("🕯️ **La cave de Mikasa**\n" + "\n".join(lines[:50]), ephemeral=True)
 
@@ -960,15 +1072,12 @@ async def cave_add(interaction: discord.Interaction, pseudo: str, aliases: str =
     if not pseudo_ref_raw:
         return await interaction.followup.send("❌ Il me faut au moins un pseudo.", ephemeral=True)
 
-    pseudo_norm = domain.normalize_name(pseudo_ref_raw)
     aliases_list_norm = domain.split_aliases(aliases)
 
-    rows = sheets.get_all_records("VIP_BAN_CREATE")
-    for r in rows:
-        existing_pseudo = domain.normalize_name(r.get("pseudo_ref", ""))
-        existing_aliases = domain.split_aliases(r.get("aliases", ""))
-        if pseudo_norm == existing_pseudo or pseudo_norm in existing_aliases:
-            return await interaction.followup.send(catify("😾 Ce nom est déjà dans la cave."), ephemeral=True)
+    # relu avant écriture: une édition à la main de l'onglet compte aussi
+    idx = cave.get_index(sheets, refresh=True)
+    if idx.find(pseudo_ref_raw):
+        return await interaction.followup.send(catify("😾 Ce nom est déjà dans la cave."), ephemeral=True)
 
     sheets.append_by_headers("VIP_BAN_CREATE", {
         "pseudo_ref": pseudo_ref_raw,
@@ -979,6 +1088,7 @@ async def cave_add(interaction: discord.Interaction, pseudo: str, aliases: str =
         "added_at": now_iso(),
         "notes": "",
     })
+    cave.get_index(sheets, refresh=True)
 
     await interaction.followup.send(catify(f"🔒 **{display_name(pseudo_ref_raw)}** est enfermé dans la cave."), ephemeral=True)
 
@@ -988,33 +1098,18 @@ async def cave_add(interaction: discord.Interaction, pseudo: str, aliases: str =
 async def cave_remove(interaction: discord.Interaction, term: str):
     await defer_ephemeral(interaction)
 
-    term_norm = domain.normalize_name(term)
-    values = sheets.get_all_values("VIP_BAN_CREATE")
-    if not values or len(values) < 2:
+    # index relu: le numéro de ligne doit être exact avant de supprimer
+    idx = cave.get_index(sheets, refresh=True)
+    if not len(idx):
         return await interaction.followup.send(catify("🐾 Rien à libérer… la cave est vide."), ephemeral=True)
 
-    header = [h.strip() for h in values[0]]
-    data = values[1:]
-
-    if "pseudo_ref" not in header:
-        return await interaction.followup.send("❌ Colonne `pseudo_ref` introuvable.", ephemeral=True)
-
-    col_pseudo = header.index("pseudo_ref")
-    col_aliases = header.index("aliases") if "aliases" in header else None
-
-    for idx, row in enumerate(data, start=2):
-        pseudo_ref_raw = row[col_pseudo] if col_pseudo < len(row) else ""
-        pseudo_ref_norm = domain.normalize_name(pseudo_ref_raw)
+    b = idx.find(term)
+    if b is None:
+        return await interaction.followup.send(catify("😾 Aucun nom correspondant dans la cave."), ephemeral=True)
 
-        aliases_norm = []
-        if col_aliases is not None and col_aliases < len(row):
-            aliases_norm = domain.split_aliases(row[col_aliases])
-
-        if term_norm == pseudo_ref_norm or (aliases_norm and term_norm in aliases_norm):
-            sheets.delete_row("VIP_BAN_CREATE", idx)
-            return await interaction.followup.send(catify(f"🔓 **{display_name(pseudo_ref_raw)}** est retiré de la cave."), ephemeral=True)
-
-    await interaction.followup.send(catify("😾 Aucun nom correspondant dans la cave."), ephemeral=True)
+    sheets.delete_row("VIP_BAN_CREATE", b.row_i)
+    cave.get_index(sheets, refresh=True)
+    await interaction.followup.send(catify(f"🔓 **{display_name(b.pseudo_ref_raw)}** est retiré de la cave."), ephemeral=True)
 
 @cave_group.command(name="info", description="Afficher un dossier cave (HG).")
 @hg_check()
@@ -1022,28 +1117,48 @@ async def cave_remove(interaction: discord.Interaction, term: str):
 async def cave_info(interaction: discord.Interaction, term: str):
     await defer_ephemeral(interaction)
 
-    term_norm = domain.normalize_name(term)
-    rows = sheets.get_all_records("VIP_BAN_CREATE")
+    b = cave.get_index(sheets).find(term)
+    if b is None:
+        return await interaction.followup.send(catify("😾 Aucun dossier trouvé."), ephemeral=True)
 
-    for r in rows:
-        pseudo_ref_raw = str(r.get("pseudo_ref", "")).strip()
-        pseudo_ref_norm = domain.normalize_name(pseudo_ref_raw)
-        aliases_norm = domain.split_aliases(r.get("aliases", ""))
-
-        if term_norm == pseudo_ref_norm or (aliases_norm and term_norm in aliases_norm):
-            msg = (
-                f"🕯️ **Dossier cave Mikasa**\n"
-                f"🔒 Nom: **{display_name(pseudo_ref_raw)}**\n"
-                f"🏷️ Alias: {', '.join(display_name(a) for a in aliases_norm) if aliases_norm else '—'}\n"
-                f"📌 Reason: `{str(r.get('reason','—') or '—')}`\n"
-                f"👤 Ajouté par: <@{r.get('added_by','—')}> \n"
-                f"📅 Ajouté le: `{str(r.get('added_at','—') or '—')}`\n"
-                f"🪪 discord_id: `{str(r.get('discord_id','—') or '—')}`\n"
-                f"📝 Notes: {str(r.get('notes','—') or '—')}"
-            )
-            return await interaction.followup.send(catify(msg, chance=0.25), ephemeral=True)
+    r = b.row
+    msg = (
+        f"🕯️ **Dossier cave Mikasa**\n"
+        f"🔒 Nom: **{display_name(b.pseudo_ref_raw)}**\n"
+        f"🏷️ Alias: {', '.join(display_name(a) for a in b.aliases) if b.aliases else '—'}\n"
+        f"📌 Reason: `{str(r.get('reason','—') or '—')}`\n"
+        f"👤 Ajouté par: <@{r.get('added_by','—')}> \n"
+        f"📅 Ajouté le: `{str(r.get('added_at','—') or '—')}`\n"
+        f"🪪 discord_id: `{str(r.get('discord_id','—') or '—')}`\n"
+        f"📝 Notes: {str(r.get('notes','—') or '—')}"
+    )
+    await interaction.followup.send(catify(msg, chance=0.25), ephemeral=True)
 
-    await interaction.followup.send(catify("😾 Aucun dossier trouvé."), ephemeral=True)
+@cave_group.command(name="scan", description="Chercher des VIP existants qui sont dans la cave (HG).")
+@hg_check()
+@app_commands.describe(proches="Inclure les pseudos à une faute d'un nom en cave")
+async def cave_scan(interaction: discord.Interaction, proches: bool = True):
+    await defer_ephemeral(interaction)
+
+    idx = cave.get_index(sheets, refresh=True)
+    if not len(idx):
+        return await interaction.followup.send("🐱 La cave est vide…", ephemeral=True)
+
+    hits = idx.scan_vips(sheets.read_records("VIP"), fuzzy=proches)
+    if not hits:
+        return await interaction.followup.send(catify("🐾 Aucun VIP ne sort de la cave."), ephemeral=True)
+
+    lines = []
+    for h in hits:
+        why = h["match"]
+        if why.startswith("proche:"):
+            why = f"proche de {display_name(why.split(':', 1)[1])}"
+        badge = "🟢" if h["status"] == "ACTIVE" else "🔴"
+        lines.append(
+            f"{badge} **{h['pseudo']}** (`{h['code_vip']}`) ↔ 🔒 **{display_name(h['ban'].pseudo_ref_raw)}** — {why}"
+        )
+    more = f"\n… et {len(lines) - 15} autre(s)." if len(lines) > 15 else ""
+    await interaction.followup.send(f"🕯️ **VIP trouvés dans la cave** ({len(hits)})\n" + "\n".join(lines[:15]) + more, ephemeral=True)
 
 #VIP HELP
 
@@ -1194,16 +1309,8 @@ async def vip_edit(interaction: discord.Interaction, vip: str = "", recherche: s
         return await interaction.followup.send(embed=view.build_embed(), view=view, ephemeral=True)
 
     # 2) sinon: recherche "floue" dans cache et propose une sélection interactive
-    q = term.lower()
-    rows = _vip_cache_get()
-
-    matches = []
-    for r in rows:
-        code = normalize_code(str(r.get("code_vip", "")))
-        pseudo = display_name(r.get("pseudo", code))
-        hay = f"{code} {pseudo}".lower()
-        if q in hay:
-            matches.append((pseudo, code, r))
+    idx = await _vip_index_async()
+    matches = [(e.pseudo, e.code, e.row) for e in idx.lookup(term)]
 
     # pas trouvé
     if not matches:
@@ -1220,7 +1327,8 @@ async def vip_edit(interaction: discord.Interaction, vip: str = "", recherche: s
     pick_view = ui.VipPickView(
         author_id=interaction.user.id,
         services=sheets,
-        matches=[(p, c) for (p, c, _) in matches]
+        matches=[(p, c) for (p, c, _) in matches],
+        query=term,
     )
     await interaction.followup.send(
         content="🔎 Plusieurs VIP trouvés. Choisis le bon dans la liste :",
@@ -1336,33 +1444,12 @@ async def vipsearch(interaction: discord.Interaction, term: str):
     if not t:
         return await interaction.followup.send("❌ Donne un terme de recherche.", ephemeral=True)
 
-    rows = sheets.get_all_records("VIP")
+    # index partagé avec l'autocomplete (snapshot VIP 60s)
     out = []
-
-    # si num -> discord id
-    is_num = t.isdigit()
-
-    for r in rows:
-        code = normalize_code(str(r.get("code_vip", "")))
-        pseudo = display_name(r.get("pseudo", code))
-        did = str(r.get("discord_id", "")).strip()
-        status = str(r.get("status", "ACTIVE")).strip().upper()
-        try:
-            pts = int(r.get("points", 0) or 0)
-        except Exception:
-            pts = 0
-
-        hit = False
-        if is_num and did and did == t:
-            hit = True
-        if t.lower() in pseudo.lower():
-            hit = True
-        if t.upper() in code.upper():
-            hit = True
-
-        if hit:
-            badge = "🟢" if status == "ACTIVE" else "🔴"
-            out.append((status == "ACTIVE", pts, f"{badge} **{pseudo}** (`{code}`) — ⭐ {pts} pts" + (f" • <@{did}>" if did else "")))
+    for e in (await _vip_index_async()).lookup(t):
+        pts = e.points()
+        badge = "🟢" if e.active else "🔴"
+        out.append((e.active, pts, f"{badge} **{e.pseudo}** (`{e.code}`) — ⭐ {pts} pts" + (f" • <@{e.discord_id}>" if e.discord_id else "")))
 
     if not out:
         return await interaction.followup.send("😾 Aucun VIP trouvé.", ephemeral=True)
@@ -1525,83 +1612,19 @@ async def vipstats(interaction: discord.Interaction):
 
   #  await interaction.followup.send(embed=view.build_embed(), view=view, ephemeral=True)
 
-import random
+# tirage du jour + variantes mélangées: qcm_daily (job de minuit, cache mémoire/disque)
 
-LETTERS = ["A", "B", "C", "D"]
-
-def build_shuffled_question_from_sheet(row: dict):
-    """
-    row = ligne lue depuis QCM_QUESTIONS (via Sheets)
-    """
-
-    # réponses originales
-    base_choices = {
-        "A": str(row.get("a", "")).strip(),
-        "B": str(row.get("b", "")).strip(),
-        "C": str(row.get("c", "")).strip(),
-        "D": str(row.get("d", "")).strip(),
-    }
-
-    correct_letter = str(row.get("correct", "A")).strip().upper()
-    correct_text = base_choices.get(correct_letter)
-
-    # on mélange
-    shuffled = list(base_choices.values())
-    random.shuffle(shuffled)
-
-    # on retrouve où est passée la bonne réponse
-    new_correct_index = shuffled.index(correct_text)
-    new_correct_letter = LETTERS[new_correct_index]
-
-    return {
-        "qid": row.get("qid"),
-        "difficulty": row.get("difficulty"),
-        "tags": row.get("tags"),
-        "question": row.get("question"),
-        "choices": shuffled,                  # liste mélangée
-        "correct_letter": new_correct_letter, # A/B/C/D recalculé
-        "correct_text": correct_text,
-    }
-
-def build_shuffled_question(q: dict, *, rng: random.Random | None = None):
-    rng = rng or random.Random()
-
-    choices = list(q["choices"])
-    rng.shuffle(choices)
-
-    correct_text = q["correct"]
-    if correct_text not in choices:
-        raise ValueError(f"Correct answer not found in choices for {q.get('id')}")
-
-    correct_index = choices.index(correct_text)
-    correct_letter = LETTERS[correct_index]
-
-    return {
-        "id": q.get("id"),
-        "difficulty": q.get("difficulty"),
-        "question": q["question"],
-        "choices": choices,              # mélangées
-        "correct_letter": correct_letter, # A/B/C/D calculé
-        "correct_text": correct_text,
-    }
-
-def shuffle_with_balance(q, counts, max_same=2, tries=6):
-    for _ in range(tries):
-        built = build_shuffled_question(q)
-        idx = LETTERS.index(built["correct_letter"])
-        if counts[idx] < max_same:
-            counts[idx] += 1
-            return built
-    # si on n'a pas réussi, on prend quand même (sinon boucle infinie)
-    built = build_shuffled_question(q)
-    counts[LETTERS.index(built["correct_letter"])] += 1
-    return built
+async def scheduled_qcm_daily():
+    """Job de minuit: tirage du jour + variantes, servis ensuite depuis le cache."""
+    print("QCM du jour:", await job_runner.offload(qcm_daily.precompute, sheets))
 
 @qcm_group.command(name="award", description="Distribuer les bonus QCM de la semaine (HG).")
 @hg_check()
 async def qcm_award(interaction: discord.Interaction):
     await defer_ephemeral(interaction)
-    wk, awarded = domain.qcm_award_weekly_bonuses(sheets)
+    wk, awarded, already = await asyncio.to_thread(domain.qcm_award_weekly_bonuses, sheets, staff_id=interaction.user.id)
+    if already:
+        return await interaction.followup.send(f"⚠️ Bonus QCM {wk} déjà distribués (anti double-award). 🐾", ephemeral=True)
     if not awarded:
         return await interaction.followup.send(f"🐾 Aucun bonus attribué pour {wk}.", ephemeral=True)
 
@@ -1625,10 +1648,11 @@ async def qcm_start(interaction: discord.Interaction):
     code = domain.normalize_code(str(vip.get("code_vip", "")))
     pseudo = domain.display_name(vip.get("pseudo", code))
 
+    # progression jour/semaine chargée une fois, puis tenue en mémoire
+    session = await asyncio.to_thread(qcm_sessions.open, interaction.user.id, code)
     view = ui.QcmDailyView(
-        services=sheets,
-        discord_id=interaction.user.id,
-        code_vip=code,
+        sessions=qcm_sessions,
+        session=session,
         vip_pseudo=pseudo,
         chrono_limit_sec=16,
     )
@@ -1772,7 +1796,7 @@ async def hunt_daily(interaction: discord.Interaction):
     # 6) Ouvrir la View Daily multi-encounters
     #    -> begin_or_resume_daily va créer/mettre à jour state_json
     # --------------------------------------------------
-    view = ui.HuntDailyView(
+    view = hunt_ui.HuntDailyView(
         sheets=sheets,
         discord_id=interaction.user.id,
         code_vip=vip_code,
@@ -1870,34 +1894,163 @@ async def hunt_start_cmd(interaction: discord.Interaction):
 # n’oublie pas d’ajouter le group à ton tree
 # tree.add_command(hunt_group)
 # ----------------------------
-# Ready + sync + scheduler
+# Warm-up (MikasaBot.setup_hook)
+# ----------------------------
+# onglets lus dès les premières commandes
+WARM_TABS = ["VIP", "LOG", "ACTIONS", "NIVEAUX", "QCM_QUESTIONS", "QCM_LOG", "VIP_BAN_CREATE", hs.T_ITEMS]
+
+def _tail_tab(title: str) -> str:
+    tab = sheets.tabs.refresh(title)
+    return f"{len(tab.values) - 1} lignes"
+
+async def tabs_background():
+    """Après le warm-up: relit les onglets repris du snapshot, puis sauvegarde périodique."""
+    for title in sheets.tabs.stale():
+        try:
+            await asyncio.to_thread(sheets.tabs.refresh, title)
+        except Exception as e:
+            print(f"Tab cache: relecture {title} échouée:", e)
+    # l'autocomplete repartira de la copie fraîche
+    _VIP_CACHE["ts"] = 0.0
+    while True:
+        try:
+            if sheets.tabs.dirty():
+                size = await asyncio.to_thread(sheets.tabs.save)
+                print(f"Tab cache: snapshot écrit ({size // 1024} KB).")
+        except Exception as e:
+            print("Tab cache: snapshot non écrit:", e)
+        await asyncio.sleep(tabcache.SNAPSHOT_EVERY)
+
+def build_warmup(client: commands.Bot) -> warmup.Warmup:
+    w = warmup.Warmup()
+
+    def auth():
+        sheets.client()
+
+    def open_sheet():
+        return sheets.sheet().title
+
+    def metadata():
+        titles = sheets.prefetch_worksheets()
+        sheets.prefetch_headers([t for t in WARM_TABS if t in titles])
+        return f"{len(titles)} onglets"
+
+    def tab_snapshot():
+        if not sheets.tabs:
+            return "désactivé"
+        loaded = sheets.tabs.load()
+        return f"{len(loaded)} onglet(s) repris" if loaded else "aucun snapshot"
+
+    def vip():
+        if sheets.tabs and sheets.tabs.has("VIP"):
+            # snapshot: l'autocomplete part tout de suite, relecture complète en arrière-plan
+            _VIP_CACHE["rows"] = sheets.tabs.records("VIP", allow_stale=True)
+            _VIP_CACHE["ts"] = time.time()
+            startup.mark("first_cache_warm")
+        else:
+            _vip_cache_get()
+        return f"{len(_vip_index())} VIP indexés"
+
+    def levels():
+        return f"{len(domain.get_levels(sheets))} niveaux"
+
+    def actions():
+        return f"{len(domain.get_actions_map(sheets))} actions"
+
+    def qcm_questions():
+        return f"{len(domain.qcm_get_questions(sheets))} questions"
+
+    def qcm_today():
+        daily = qcm_daily.get(sheets)
+        return f"{daily.date_key}, {len(daily.variants)} variantes"
+
+    def hunt_items():
+        hs.items_refresh_cache(sheets)
+        return f"{len(hs._ITEMS_CACHE)} items"
+
+    def ban_index():
+        return f"{len(cave.get_index(sheets))} dossiers"
+
+    def s3_client():
+        if not s3.enabled():
+            return "S3 non configuré"
+        s3.client()
+
+    async def card_render():
+        # workers de rendu des cartes VIP (CARD_RENDER_WORKERS, 0 => thread): template + polices chargés
+        pool = await card_pool.start_from_env(VIP_TEMPLATE_PATH, VIP_FONT_PATH)
+        return f"{pool.workers} worker(s)" if pool.workers else "thread"
+
+    w.add("auth", auth)
+    w.add("open", open_sheet, after=["auth"])
+    w.add("metadata", metadata, after=["open"])
+    w.add("tab_snapshot", tab_snapshot)
+    if sheets.tabs:
+        # journaux (LOG, QCM_LOG): snapshot + lignes ajoutées depuis
+        for title in sorted(tabcache.APPEND_ONLY & sheets.tabs.tracked):
+            w.add(f"tail:{title}", functools.partial(_tail_tab, title), after=["metadata", "tab_snapshot"])
+    w.add("vip", vip, after=["metadata", "tab_snapshot"])
+    for name, fn in (("levels", levels), ("actions", actions),
+                     ("qcm_questions", qcm_questions), ("hunt_items", hunt_items), ("cave", ban_index)):
+        w.add(name, fn, after=["metadata", "tab_snapshot"])
+    w.add("qcm_daily", qcm_today, after=["qcm_questions"])
+    w.add("s3", s3_client)
+    w.add("card_render", card_render)
+    w.add("assets", lambda: f"{len(assets.load_manifest())} images")
+    return w
+
+# ----------------------------
+# Ready + scheduler
 # ----------------------------
 @bot.event
 async def on_ready():
+    startup.mark("gateway_ready")
     print(f"Mikasa V2 connectée en tant que {bot.user}")
-    try:
-        guild = discord.Object(id=GUILD_ID)
-        bot.tree.copy_global_to(guild=guild)
-        await bot.tree.sync(guild=guild)
-        print(f"Slash commands sync sur GUILD_ID={GUILD_ID}")
-    except Exception as e:
-        print("Sync slash failed:", e)
 
     if not getattr(bot, "_mikasa_scheduler_started", False):
         bot._mikasa_scheduler_started = True
+        from apscheduler.triggers.cron import CronTrigger
         trigger = CronTrigger(day_of_week="fri", hour=17, minute=0, timezone=services.PARIS_TZ)
-        scheduler.add_job(lambda: bot.loop.create_task(post_weekly_challenges_announcement()), trigger)
+        job_runner.add("weekly_challenges", post_weekly_challenges_announcement, trigger)
         # scheduler vendredi 17:05 (résultats QCM + bonus)
         trigger_qcm = CronTrigger(day_of_week="fri", hour=17, minute=5, timezone=services.PARIS_TZ)
-        scheduler.add_job(lambda: bot.loop.create_task(post_qcm_weekly_announcement_and_awards()), trigger_qcm)
-        scheduler.start()
-        print("Scheduler: annonces hebdo activées (vendredi 17:00).")
+        job_runner.add("qcm_weekly_awards", post_qcm_weekly_announcement_and_awards, trigger_qcm)
+        # QCM du jour précalculé à minuit
+        trigger_daily = CronTrigger(hour=0, minute=0, timezone=services.PARIS_TZ)
+        job_runner.add("qcm_daily", scheduled_qcm_daily, trigger_daily)
+        if VIP_CARD_REGEN_CRON:
+            trigger_cards = CronTrigger.from_crontab(VIP_CARD_REGEN_CRON, timezone=services.PARIS_TZ)
+            job_runner.add("vip_card_regen", scheduled_card_regen, trigger_cards)
+            print(f"Scheduler: régénération des cartes VIP ({VIP_CARD_REGEN_CRON}).")
+        job_runner.start(services.PARIS_TZ)
+        print(f"Scheduler: annonces hebdo activées (vendredi 17:00), ratés rattrapés sous {job_runner.grace_s}s.")
+        startup.mark("scheduler_started")
+    startup.print_report_once("gateway_ready")
 # ----------------------------
 # Run
 # ----------------------------
+startup.mark("import:bot")
+
 async def main():
     async with bot:
-        await bot.start(DISCORD_TOKEN)
-
-if __name__ == "__main__":
-    asyncio.run(main())
+        # optionnel: METRICS_PORT=9108 => http://127.0.0.1:9108/metrics
+        await metrics.start_from_env()
+        # lag de boucle + watchdog optionnel (LOOP_WATCHDOG_MS=500)
+        bot.loop_watchdog = loop_watchdog.start_from_env()
+        try:
+            await bot.start(DISCORD_TOKEN)
+        finally:
+            bot.loop_watchdog.stop()
+            job_runner.shutdown()
+            card_pool.shutdown()
+            try:
+                qcm_sessions.writer.flush()
+            except Exception as e:
+                print("QCM writer: réponses non écrites à l'arrêt:", e)
+            if sheets.tabs and sheets.tabs.dirty():
+                try:
+                    sheets.tabs.save()
+                except Exception as e:
+                    print("Tab cache: snapshot non écrit:", e)
+
+# lancement: python main.py
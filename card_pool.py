@@ -0,0 +1,171 @@
+# card_pool.py
+# -*- coding: utf-8 -*-
+"""
+Rendu des cartes VIP hors de la boucle asyncio.
+
+- pool de processus (Pillow tient le GIL pendant le dessin / l'encodage)
+- chaque worker charge template + polices au démarrage (CardRenderer)
+- les workers sont lancés et préchauffés au démarrage du bot
+
+Config:
+- CARD_RENDER_WORKERS=2  (défaut: min(2, nb CPU); 0 => thread, pas de processus)
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import metrics
+import services
+
+
+# ==========================================================
+# Côté worker
+# ==========================================================
+_WORKER_PATHS: Optional[tuple] = None
+
+def _worker_init(template_path: str, font_path: str) -> None:
+    global _WORKER_PATHS
+    _WORKER_PATHS = (template_path, font_path)
+    try:
+        services.get_card_renderer(template_path, font_path)
+    except Exception as e:
+        # le rendu réessaiera (et remontera l'erreur) au premier appel
+        print("Card worker: préchargement échoué:", e)
+
+def _worker_ping() -> int:
+    return os.getpid()
+
+def _worker_render(template_path: str, font_path: str, code_vip: str, full_name: str, dob: str, phone: str, bleeter: str) -> bytes:
+    return services.generate_vip_card_image(template_path, font_path, code_vip, full_name, dob, phone, bleeter)
+
+def _worker_render_encoded(template_path: str, font_path: str, enc, code_vip: str, full_name: str, dob: str, phone: str, bleeter: str):
+    r = services.get_card_renderer(template_path, font_path)
+    return r.render_encoded(enc, code_vip, full_name, dob, phone, bleeter)
+
+
+# ==========================================================
+# Côté bot
+# ==========================================================
+def _env_workers() -> int:
+    raw = (os.getenv("CARD_RENDER_WORKERS") or "").strip()
+    if raw.isdigit():
+        return int(raw)
+    return max(1, min(2, os.cpu_count() or 1))
+
+
+class CardRenderPool:
+    def __init__(self, template_path: str, font_path: str, *, workers: int = 2):
+        self.template_path = template_path
+        self.font_path = font_path
+        self.workers = max(0, int(workers))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._rebuild_lock = asyncio.Lock()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn: pas de fork d'un process qui a déjà des threads (watchdog, scheduler, discord)
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+            initargs=(self.template_path, self.font_path),
+        )
+
+    async def start(self) -> None:
+        if self.workers <= 0:
+            # mode thread: on précharge quand même les assets
+            await asyncio.to_thread(services.get_card_renderer, self.template_path, self.font_path)
+            print("Card render: mode thread (CARD_RENDER_WORKERS=0).")
+            return
+        t0 = time.perf_counter()
+        self._executor = self._new_executor()
+        loop = asyncio.get_running_loop()
+        # un ping par worker => tous les processus sont lancés et ont chargé les assets
+        pids = await asyncio.gather(*[loop.run_in_executor(self._executor, _worker_ping) for _ in range(self.workers)])
+        print(f"Card render: {len(set(pids))}/{self.workers} worker(s) prêts en {time.perf_counter() - t0:.1f}s.")
+
+    async def run(self, fn, *args):
+        mode = "process" if self._executor is not None else "thread"
+        with metrics.CARD_RENDER.time(mode=mode):
+            if self._executor is None:
+                return await asyncio.to_thread(fn, *args)
+            loop = asyncio.get_running_loop()
+            executor = self._executor
+            try:
+                return await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                # worker tué (OOM...): on recrée le pool une fois
+                executor = await self._rebuild(executor)
+                return await loop.run_in_executor(executor, fn, *args)
+
+    async def _rebuild(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Remplace le pool cassé, une seule fois même si plusieurs rendus échouent ensemble."""
+        async with self._rebuild_lock:
+            if self._executor is broken:
+                print("Card render: pool cassé, redémarrage.")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._new_executor()
+            return self._executor
+
+    async def render(self, code_vip: str, full_name: str, dob: str, phone: str, bleeter: str) -> bytes:
+        return await self.run(_worker_render, self.template_path, self.font_path, code_vip, full_name, dob, phone, bleeter)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_POOL: Optional[CardRenderPool] = None
+
+async def start_from_env(template_path: str, font_path: str) -> CardRenderPool:
+    """À appeler depuis la boucle (main/setup_hook)."""
+    global _POOL
+    pool = CardRenderPool(template_path, font_path, workers=_env_workers())
+    try:
+        await pool.start()
+    except Exception as e:
+        print("Card render pool failed, fallback thread:", e)
+        pool.shutdown()
+        pool.workers = 0
+    _POOL = pool
+    return pool
+
+async def render_card(template_path: str, font_path: str, code_vip: str, full_name: str, dob: str, phone: str, bleeter: str) -> bytes:
+    """
+    Rendu PNG d'une carte sans bloquer la boucle.
+    Sans pool démarré (ou pour d'autres assets): thread.
+    """
+    pool = _POOL
+    if pool is not None and (pool.template_path, pool.font_path) == (template_path, font_path):
+        return await pool.render(code_vip, full_name, dob, phone, bleeter)
+    with metrics.CARD_RENDER.time(mode="thread"):
+        return await asyncio.to_thread(_worker_render, template_path, font_path, code_vip, full_name, dob, phone, bleeter)
+
+async def render_card_encoded(
+    template_path: str, font_path: str, enc: "services.CardEncoding",
+    code_vip: str, full_name: str, dob: str, phone: str, bleeter: str,
+):
+    """(carte, aperçu ou None) encodés selon `enc`, hors boucle."""
+    args = (template_path, font_path, enc, code_vip, full_name, dob, phone, bleeter)
+    pool = _POOL
+    if pool is not None and (pool.template_path, pool.font_path) == (template_path, font_path):
+        return await pool.run(_worker_render_encoded, *args)
+    with metrics.CARD_RENDER.time(mode="thread"):
+        return await asyncio.to_thread(_worker_render_encoded, *args)
+
+def capacity() -> int:
+    """Nombre de rendus utiles en parallèle (workers du pool, 1 en mode thread)."""
+    pool = _POOL
+    return max(1, pool.workers) if pool is not None else 1
+
+def shutdown() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown()
+        _POOL = None
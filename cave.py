@@ -0,0 +1,178 @@
+# cave.py
+# -*- coding: utf-8 -*-
+"""
+Index compilé de la cave (onglet VIP_BAN_CREATE).
+
+- discord_id -> dossier (set / dict, O(1))
+- pseudo_ref + alias normalisés (normalize_name) -> dossier
+- option "proche": variantes à une suppression près des noms repliés
+  (vip_search.fold: accents / ponctuation ignorés), pour attraper
+  "Jhon Doe" quand "John Doe" est en cave (distance <= 1)
+
+Un seul index en mémoire, reconstruit quand:
+- cave add / cave remove écrivent dans l'onglet (refresh immédiat)
+- il a plus de CAVE_INDEX_TTL secondes (défaut 300: éditions à la main)
+
+Config:
+- CAVE_INDEX_TTL=300
+- CAVE_FUZZY=0   (1: un nom proche d'un nom en cave bloque aussi /vip create)
+"""
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import vip_search
+from services import SheetsService, normalize_name, normalize_code, display_name
+
+TAB = "VIP_BAN_CREATE"
+INDEX_TTL = float(os.getenv("CAVE_INDEX_TTL", "300"))
+FUZZY_DEFAULT = (os.getenv("CAVE_FUZZY", "0").strip().lower() in ("1", "true", "yes", "on"))
+
+# noms trop courts: une faute = un autre nom
+FUZZY_MIN_LEN = 5
+
+
+def split_aliases(raw: str) -> List[str]:
+    if not raw:
+        return []
+    raw = str(raw)
+    for sep in [";", "|"]:
+        raw = raw.replace(sep, ",")
+    items = [normalize_name(x) for x in raw.split(",")]
+    return [x for x in items if x]
+
+
+@dataclass
+class BanRecord:
+    row_i: int
+    row: Dict[str, Any]
+    pseudo_ref_raw: str
+    pseudo_ref: str
+    aliases: List[str] = field(default_factory=list)
+    discord_id: str = ""
+    reason: str = ""
+
+    @property
+    def names(self) -> List[str]:
+        return ([self.pseudo_ref] if self.pseudo_ref else []) + self.aliases
+
+    def as_dict(self) -> Dict[str, Any]:
+        # forme historique de domain.load_ban_create_list()
+        return {
+            "pseudo_ref": self.pseudo_ref,
+            "aliases": list(self.aliases),
+            "discord_id": self.discord_id,
+            "reason": self.reason,
+        }
+
+
+def _deletes(s: str) -> Set[str]:
+    """s et ses variantes à une lettre supprimée."""
+    return {s} | {s[:i] + s[i + 1:] for i in range(len(s))}
+
+
+class BanIndex:
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.built_at = time.time()
+        self.records: List[BanRecord] = []
+        self.by_discord_id: Dict[str, BanRecord] = {}
+        self.by_name: Dict[str, BanRecord] = {}
+        # variante (1 suppression) -> [(nom replié, dossier)]
+        self._near: Dict[str, List[Tuple[str, BanRecord]]] = {}
+
+        for row_i, r in enumerate(rows, start=2):
+            raw = str(r.get("pseudo_ref", "")).strip()
+            b = BanRecord(
+                row_i=row_i,
+                row=r,
+                pseudo_ref_raw=raw,
+                pseudo_ref=normalize_name(raw),
+                aliases=split_aliases(r.get("aliases", "")),
+                discord_id=str(r.get("discord_id", "")).strip(),
+                reason=str(r.get("reason", "")).strip(),
+            )
+            self.records.append(b)
+            if b.discord_id:
+                self.by_discord_id.setdefault(b.discord_id, b)
+            for name in b.names:
+                self.by_name.setdefault(name, b)
+                folded = vip_search.fold(name)
+                if len(folded) >= FUZZY_MIN_LEN:
+                    for v in _deletes(folded):
+                        self._near.setdefault(v, []).append((folded, b))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def find(self, term: str) -> Optional[BanRecord]:
+        """Dossier dont le pseudo_ref ou un alias vaut `term` (normalisé)."""
+        return self.by_name.get(normalize_name(term))
+
+    def near(self, pseudo: str) -> Optional[Tuple[BanRecord, str]]:
+        """(dossier, nom en cave) à une faute près de `pseudo`, sinon None."""
+        q = vip_search.fold(pseudo)
+        if len(q) < FUZZY_MIN_LEN:
+            return None
+        for v in _deletes(q):
+            for name, b in self._near.get(v, ()):
+                if vip_search.bounded_distance(q, name, 1) <= 1:
+                    return b, name
+        return None
+
+    def check(self, pseudo: str = "", discord_id: str = "", *, fuzzy: bool = False) -> Tuple[Optional[BanRecord], str]:
+        """
+        (dossier, motif) si le couple pseudo / discord_id est en cave.
+        motif: "discord_id", "pseudo" ou "proche:<nom>".
+        """
+        did = str(discord_id or "").strip()
+        if did and did in self.by_discord_id:
+            return self.by_discord_id[did], "discord_id"
+        p = normalize_name(pseudo)
+        if p and p in self.by_name:
+            return self.by_name[p], "pseudo"
+        if fuzzy and p:
+            hit = self.near(p)
+            if hit:
+                return hit[0], f"proche:{hit[1]}"
+        return None, ""
+
+    def scan_vips(self, vip_rows: List[Dict[str, Any]], *, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        """VIP existants qui matchent la cave (discord_id, pseudo, ou proche)."""
+        out = []
+        for row_i, r in enumerate(vip_rows, start=2):
+            b, why = self.check(r.get("pseudo", ""), r.get("discord_id", ""), fuzzy=fuzzy)
+            if b is None:
+                continue
+            code = normalize_code(str(r.get("code_vip", "")))
+            out.append({
+                "row_i": row_i,
+                "code_vip": code,
+                "pseudo": display_name(r.get("pseudo", code)),
+                "discord_id": str(r.get("discord_id", "")).strip(),
+                "status": str(r.get("status", "ACTIVE")).strip().upper(),
+                "ban": b,
+                "match": why,
+            })
+        return out
+
+
+# ==========================================================
+# Index partagé
+# ==========================================================
+_INDEX: Optional[BanIndex] = None
+
+def get_index(s: SheetsService, *, refresh: bool = False) -> BanIndex:
+    """Index courant (relit l'onglet si refresh, absent ou plus vieux que CAVE_INDEX_TTL)."""
+    global _INDEX
+    idx = _INDEX
+    if refresh or idx is None or (time.time() - idx.built_at) > INDEX_TTL:
+        idx = BanIndex(s.get_all_records(TAB))
+        _INDEX = idx
+    return idx
+
+def invalidate() -> None:
+    global _INDEX
+    _INDEX = None
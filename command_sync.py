@@ -0,0 +1,87 @@
+# command_sync.py
+# -*- coding: utf-8 -*-
+"""
+Sync des slash commands seulement quand l'arbre change.
+
+Le payload envoyé à Discord (noms, descriptions, options, permissions...)
+est haché; le dernier hash synchronisé est gardé sur disque par
+(application, guild). Au démarrage: hash identique => pas d'appel à
+Discord (sync lent et fortement rate-limité).
+
+Config:
+- COMMAND_SYNC_STATE=.cache/command_sync.json
+- COMMAND_SYNC_FORCE=1   (sync quoi qu'il arrive, ex: commandes effacées à la main)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+import discord
+from discord import app_commands
+
+STATE_PATH = os.getenv("COMMAND_SYNC_STATE", os.path.join(".cache", "command_sync.json")).strip()
+
+
+def tree_payload(tree: app_commands.CommandTree, guild: discord.abc.Snowflake) -> List[Dict[str, Any]]:
+    """Payload exact que tree.sync(guild=...) enverrait, trié."""
+    cmds = [c.to_dict(tree) for c in tree.get_commands(guild=guild)]
+    cmds.sort(key=lambda d: (int(d.get("type", 1)), str(d.get("name", ""))))
+    return cmds
+
+def tree_hash(tree: app_commands.CommandTree, guild: discord.abc.Snowflake) -> str:
+    raw = json.dumps(tree_payload(tree, guild), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _load_state() -> Dict[str, Any]:
+    try:
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print("Command sync: état illisible, resync:", e)
+        return {}
+
+def _save_state(state: Dict[str, Any]) -> None:
+    d = os.path.dirname(STATE_PATH)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = STATE_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, STATE_PATH)
+
+
+async def sync_if_changed(bot: discord.Client, tree: app_commands.CommandTree, guild_id: int) -> bool:
+    """
+    Copie les commandes globales sur la guild et synchronise si le hash a
+    changé depuis le dernier sync réussi. True si un sync a eu lieu.
+    """
+    guild = discord.Object(id=guild_id)
+    tree.copy_global_to(guild=guild)
+    digest = tree_hash(tree, guild)
+    key = f"{bot.application_id or 0}:{guild_id}"
+    state = _load_state()
+    force = (os.getenv("COMMAND_SYNC_FORCE", "0").strip().lower() in ("1", "true", "yes", "on"))
+
+    prev = state.get(key) or {}
+    if not force and prev.get("hash") == digest:
+        print(f"Slash commands inchangées (hash {digest[:12]}), pas de sync.")
+        return False
+
+    t0 = time.perf_counter()
+    synced = await tree.sync(guild=guild)
+    state[key] = {"hash": digest, "count": len(synced), "synced_at": int(time.time())}
+    try:
+        _save_state(state)
+    except Exception as e:
+        # le sync a réussi: on resynchronisera juste au prochain démarrage
+        print("Command sync: état non sauvegardé:", e)
+    print(f"Slash commands sync sur GUILD_ID={guild_id}: {len(synced)} commande(s) en {time.perf_counter() - t0:.1f}s (hash {digest[:12]}).")
+    return True
@@ -2,10 +2,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+import cave
+import metrics
+import vip_search
 from services import (
     SheetsService,
     normalize_code, normalize_name, display_name, now_iso, now_fr, fmt_fr,
@@ -58,6 +63,12 @@ QCM_CHRONO_SEC = 16
 QCM_DAILY_QUOTA = {"EASY": 2, "MED": 1, "HARD": 1}
 QCM_FIXED_QID = "LS_QUARTET_0001"
 
+# bonus hebdo (podium puis participation), marqueur anti double-award dans LOG
+QCM_PODIUM_BONUSES = ["QCM_BONUS_W1", "QCM_BONUS_W2", "QCM_BONUS_W3"]
+QCM_PARTICIPANT_ACTIONS = ("QCM_BONUS_PARTICIPANT", "QCM_PARTICIPANT")
+QCM_PARTICIPANT_MIN = 5
+QCM_WEEK_MARKER = "QCM_WEEK_AWARDED"
+
 # ==========================================================
 # VIP QUERIES
 # ==========================================================
@@ -90,12 +101,29 @@ def find_vip_row_by_pseudo(s: SheetsService, pseudo: str) -> Tuple[Optional[int]
     return None, None
 
 def find_vip_row_by_code_or_pseudo(s: SheetsService, term: str) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+    """
+    Résolution stricte (commandes qui écrivent: bleeter, vente, points...):
+    code, ou pseudo exact; accents / casse / "_" ignorés seulement si un
+    seul VIP correspond. Pas de "plus proche": une faute => introuvable
+    (les recherches floues passent par l'autocomplete / /vipsearch).
+    """
     if not term:
         return None, None
     t = term.strip()
     if t.upper().startswith("SUB-"):
         return find_vip_row_by_code(s, t)
-    return find_vip_row_by_pseudo(s, t)
+    target = normalize_name(t)
+    folded = vip_search.fold(t)
+    hits = []
+    for idx, r in enumerate(s.read_records("VIP"), start=2):
+        p = str(r.get("pseudo", ""))
+        if normalize_name(p) == target:
+            return idx, dict(r)
+        if folded and vip_search.fold_cached(p) == folded:
+            hits.append((idx, r))
+    if len(hits) == 1:
+        return hits[0][0], dict(hits[0][1])
+    return None, None
 
 def get_rank_among_active(s: SheetsService, code_vip: str) -> Tuple[int, int]:
     code = normalize_code(code_vip)
@@ -121,13 +149,19 @@ def get_rank_among_active(s: SheetsService, code_vip: str) -> Tuple[int, int]:
             break
     return rank, total
 
+# clés de normalisation des index (SheetsService.records_where): fonctions
+# de module => même index réutilisé d'un appel à l'autre
+def _code_key(v: Any) -> str:
+    return normalize_code(str(v))
+
+def _str_key(v: Any) -> str:
+    return str(v).strip()
+
+def _upper_key(v: Any) -> str:
+    return str(v).strip().upper()
+
 def log_rows_for_vip(s: SheetsService, code_vip: str) -> List[Dict[str, Any]]:
-    code = normalize_code(code_vip)
-    out = []
-    for r in s.get_all_records("LOG"):
-        if normalize_code(str(r.get("code_vip", ""))) == code:
-            out.append(r)
-    return out
+    return s.records_where("LOG", "code_vip", normalize_code(code_vip), key=_code_key)
 
 def get_last_actions(s: SheetsService, code_vip: str, n: int = 3):
     items = []
@@ -149,11 +183,39 @@ def get_last_actions(s: SheetsService, code_vip: str, n: int = 3):
     items.sort(key=lambda x: x[0], reverse=True)
     return items[:n]
 
+# ==========================================================
+# Tables de config (NIVEAUX / ACTIONS / QCM_QUESTIONS)
+# ==========================================================
+# onglets édités à la main et relus à chaque commande: la version compilée
+# est gardée CONFIG_TAB_TTL secondes (préchargée au démarrage)
+CONFIG_TAB_TTL = float(os.getenv("CONFIG_TAB_TTL", "300"))
+_TABLES: Dict[str, Tuple[SheetsService, float, Any]] = {}
+
+def _table(s: SheetsService, title: str, build: Callable[[SheetsService], Any]) -> Any:
+    now = time.time()
+    hit = _TABLES.get(title)
+    if hit is not None and hit[0] is s and (now - hit[1]) < CONFIG_TAB_TTL:
+        metrics.cache_hit(f"tab:{title}")
+        return hit[2]
+    metrics.cache_miss(f"tab:{title}")
+    value = build(s)
+    _TABLES[title] = (s, now, value)
+    return value
+
+def invalidate_tables(title: str = "") -> None:
+    if title:
+        _TABLES.pop(title, None)
+    else:
+        _TABLES.clear()
+
 # ==========================================================
 # NIVEAUX
 # ==========================================================
 
 def get_levels(s: SheetsService) -> List[Tuple[int, int, str]]:
+    return _table(s, "NIVEAUX", _build_levels)
+
+def _build_levels(s: SheetsService) -> List[Tuple[int, int, str]]:
     rows = s.get_all_records("NIVEAUX")
     levels: List[Tuple[int, int, str]] = []
     for r in rows:
@@ -223,6 +285,9 @@ def get_all_unlocked_advantages(s: SheetsService, current_level: int) -> str:
 # ==========================================================
 
 def get_actions_map(s: SheetsService) -> Dict[str, Dict[str, Any]]:
+    return _table(s, "ACTIONS", _build_actions_map)
+
+def _build_actions_map(s: SheetsService) -> Dict[str, Dict[str, Any]]:
     rows = s.get_all_records("ACTIONS")
     m: Dict[str, Dict[str, Any]] = {}
     for r in rows:
@@ -447,43 +512,24 @@ def add_points_by_action(
 # CAVE (VIP_BAN_CREATE)
 # ==========================================================
 
-def split_aliases(raw: str) -> List[str]:
-    if not raw:
-        return []
-    raw = str(raw)
-    for sep in [";", "|"]:
-        raw = raw.replace(sep, ",")
-    items = [normalize_name(x) for x in raw.split(",")]
-    return [x for x in items if x]
+# index compilé (cave.py): lookups O(1), relu après cave add/remove
+split_aliases = cave.split_aliases
 
 def load_ban_create_list(s: SheetsService):
-    rows = s.get_all_records("VIP_BAN_CREATE")
-    bans = []
-    for r in rows:
-        pseudo_ref = normalize_name(r.get("pseudo_ref", ""))
-        aliases = split_aliases(r.get("aliases", ""))
-        discord_id = str(r.get("discord_id", "")).strip()
-        reason = str(r.get("reason", "")).strip()
-        bans.append({
-            "pseudo_ref": pseudo_ref,
-            "aliases": aliases,
-            "discord_id": discord_id,
-            "reason": reason,
-        })
-    return bans
+    return [b.as_dict() for b in cave.get_index(s).records]
 
-def check_banned_for_create(s: SheetsService, pseudo: str = "", discord_id: str = ""):
-    p = normalize_name(pseudo)
-    did = str(discord_id or "").strip()
-
-    for b in load_ban_create_list(s):
-        if did and b["discord_id"] and did == b["discord_id"]:
-            return True, b["reason"] or "Raison interne"
-        if p and b["pseudo_ref"] and p == b["pseudo_ref"]:
-            return True, b["reason"] or "Raison interne"
-        if p and b["aliases"] and p in b["aliases"]:
-            return True, b["reason"] or "Raison interne"
-    return False, ""
+def check_banned_for_create(s: SheetsService, pseudo: str = "", discord_id: str = "", fuzzy: Optional[bool] = None):
+    """
+    (True, raison) si pseudo / alias / discord_id est en cave.
+    fuzzy (défaut CAVE_FUZZY): bloque aussi un pseudo à une faute d'un nom en cave.
+    """
+    b, why = cave.get_index(s).check(pseudo, discord_id, fuzzy=cave.FUZZY_DEFAULT if fuzzy is None else fuzzy)
+    if b is None:
+        return False, ""
+    reason = b.reason or "Raison interne"
+    if why.startswith("proche:"):
+        reason += f" (proche de '{display_name(why.split(':', 1)[1])}')"
+    return True, reason
 
 def log_create_blocked(s: SheetsService, staff_id: int, pseudo_attempted: str, discord_id: str = "", reason: str = ""):
     details = f"Tentative création VIP bloquée | pseudo='{pseudo_attempted}'"
@@ -608,7 +654,7 @@ def sales_summary(
         start = _start_of_day_fr(now)
     end = now
 
-    rows = s.get_all_records("LOG")
+    rows = s.read_records("LOG")
     stats: Dict[str, Dict[str, int]] = {}
     total = {"achat_qty": 0, "lim_qty": 0, "delta": 0, "ops": 0}
 
@@ -671,6 +717,9 @@ def week_key_fr(dt=None) -> str:
     return f"{iso.year}-W{iso.week:02d}"
 
 def qcm_get_questions(s: SheetsService) -> List[Dict[str, Any]]:
+    return _table(s, "QCM_QUESTIONS", _build_qcm_questions)
+
+def _build_qcm_questions(s: SheetsService) -> List[Dict[str, Any]]:
     rows = s.get_all_records("QCM_QUESTIONS")
     out = []
     for r in rows:
@@ -727,11 +776,9 @@ def qcm_today_progress(s: SheetsService, code_vip: str, discord_id: int, dt=None
     dk = date_key_fr(dt)
     code = normalize_code(code_vip)
 
-    rows = s.get_all_records("QCM_LOG")
+    rows = s.records_where("QCM_LOG", "date_key", dk, key=_str_key)
     answers = []
     for r in rows:
-        if str(r.get("date_key", "")).strip() != dk:
-            continue
         if normalize_code(str(r.get("code_vip", ""))) != code:
             continue
         if str(r.get("discord_id", "")).strip() != str(discord_id):
@@ -750,9 +797,7 @@ def qcm_week_points_awarded(s: SheetsService, code_vip: str, dt=None) -> int:
     wk = week_key_fr(dt)
     code = normalize_code(code_vip)
     total = 0
-    for r in s.get_all_records("QCM_LOG"):
-        if str(r.get("week_key", "")).strip() != wk:
-            continue
+    for r in s.records_where("QCM_LOG", "week_key", wk, key=_str_key):
         if normalize_code(str(r.get("code_vip", ""))) != code:
             continue
         try:
@@ -761,8 +806,7 @@ def qcm_week_points_awarded(s: SheetsService, code_vip: str, dt=None) -> int:
             pass
     return total
 
-def qcm_log_answer(
-    s: SheetsService,
+def qcm_answer_row(
     *,
     discord_id: int,
     code_vip: str,
@@ -773,9 +817,11 @@ def qcm_log_answer(
     points_awarded: int,
     elapsed_sec: int,
     meta: str = "",
-):
-    dt = now_fr()
-    s.append_by_headers("QCM_LOG", {
+    dt=None,
+) -> Dict[str, Any]:
+    """Ligne QCM_LOG (par header) d'une réponse."""
+    dt = dt or now_fr()
+    return {
         "timestamp": dt.isoformat(timespec="seconds"),
         "date_key": date_key_fr(dt),
         "week_key": week_key_fr(dt),
@@ -789,7 +835,33 @@ def qcm_log_answer(
         "elapsed_sec": int(elapsed_sec),
         "locked": 1,
         "meta": (meta or "").strip(),
-    })
+    }
+
+def qcm_log_answer(s: SheetsService, **kwargs):
+    s.append_by_headers("QCM_LOG", qcm_answer_row(**kwargs))
+
+def qcm_score_answer(q: dict, choice: str, elapsed_sec: int, chrono_limit_sec: int, week_pts: int) -> Tuple[bool, int, str]:
+    """(correct, points, meta) — chrono et cap hebdo appliqués, sans I/O."""
+    correct = (choice.upper() == str(q.get("correct", "")).upper())
+    cap_left = max(0, QCM_WEEKLY_CAP - week_pts)
+
+    if elapsed_sec > int(chrono_limit_sec):
+        return correct, 0, f"late>{chrono_limit_sec}s"
+    if correct and cap_left >= QCM_POINTS_PER_GOOD:
+        return correct, QCM_POINTS_PER_GOOD, ""
+    if correct:
+        return correct, 0, "weekly_cap"
+    return correct, 0, ""
+
+def qcm_answer_grant(code_vip: str, discord_id: int, q: dict, q_index: int, dk: str) -> Dict[str, Any]:
+    """Crédit VIP d'une bonne réponse (format add_points_bulk)."""
+    return {
+        "code_vip": normalize_code(code_vip),
+        "action_key": "QCM_BONNE_REPONSE",
+        "qty": 1,
+        "staff_id": discord_id,  # OK: log staff_id = le VIP
+        "reason": f"QCM {dk} q{q_index} {q['qid']}",
+    }
 
 def qcm_submit_answer(
     s: SheetsService,
@@ -803,6 +875,7 @@ def qcm_submit_answer(
     chrono_limit_sec: int,
 ):
     """
+    Version sans session (relit QCM_LOG). Les vues passent par qcm_session.
     Retourne: (ok, msg, points_awarded, is_correct)
     """
     dk, answers = qcm_today_progress(s, code_vip, discord_id)
@@ -810,25 +883,7 @@ def qcm_submit_answer(
     if q_index in already:
         return False, "Déjà répondu à cette question.", 0, False
 
-    correct = (choice.upper() == str(q.get("correct", "")).upper())
-    week_pts = qcm_week_points_awarded(s, code_vip)
-    cap_left = max(0, QCM_WEEKLY_CAP - week_pts)
-
-    late = elapsed_sec > int(chrono_limit_sec)
-
-    pts = 0
-    meta = ""
-    if late:
-        pts = 0
-        meta = f"late>{chrono_limit_sec}s"
-    else:
-        if correct and cap_left >= QCM_POINTS_PER_GOOD:
-            pts = QCM_POINTS_PER_GOOD
-        elif correct and cap_left < QCM_POINTS_PER_GOOD:
-            pts = 0
-            meta = "weekly_cap"
-        else:
-            pts = 0
+    correct, pts, meta = qcm_score_answer(q, choice, elapsed_sec, chrono_limit_sec, qcm_week_points_awarded(s, code_vip))
 
     qcm_log_answer(
         s,
@@ -845,15 +900,7 @@ def qcm_submit_answer(
 
     # crédite points VIP via ACTIONS (si pts > 0)
     if pts > 0:
-        add_points_by_action(
-            s,
-            code_vip,
-            "QCM_BONNE_REPONSE",
-            1,
-            staff_id=discord_id,  # OK: log staff_id = le VIP
-            reason=f"QCM {date_key_fr()} q{q_index} {q['qid']}",
-            author_is_hg=True
-        )
+        add_points_bulk(s, [qcm_answer_grant(code_vip, discord_id, q, q_index, date_key_fr())])
 
     return True, ("✅" if correct else "❌"), pts, correct
 
@@ -866,12 +913,10 @@ def qcm_weekly_leaderboard(s: SheetsService, dt=None):
     """
     dt = dt or now_fr()
     wk = week_key_fr(dt)
-    rows = s.get_all_records("QCM_LOG")
+    rows = s.records_where("QCM_LOG", "week_key", wk, key=_str_key)
 
     m: Dict[str, Dict[str, int]] = {}
     for r in rows:
-        if str(r.get("week_key", "")).strip() != wk:
-            continue
         did = str(r.get("discord_id", "")).strip()
         if not did:
             continue
@@ -899,80 +944,188 @@ def qcm_weekly_leaderboard(s: SheetsService, dt=None):
     return wk, ordered
 
 def qcm_week_already_awarded(s: SheetsService, week_id: str) -> bool:
-    for r in s.get_all_records("LOG"):
-        ak = str(r.get("action_key", "")).strip().upper()
-        if ak == "QCM_WEEK_AWARDED":
-            reason = str(r.get("raison", "") or "")
-            if f"week:{week_id}" in reason:
-                return True
+    for r in s.records_where("LOG", "action_key", QCM_WEEK_MARKER, key=_upper_key):
+        reason = str(r.get("raison", "") or "")
+        if f"week:{week_id}" in reason:
+            return True
     return False
 
-def qcm_mark_week_awarded(s: SheetsService, week_id: str, staff_id: int = 0):
-    s.append_by_headers("LOG", {
+def _qcm_week_marker_row(week_id: str, staff_id: int = 0) -> Dict[str, Any]:
+    return {
         "timestamp": now_iso(),
         "staff_id": str(staff_id),
         "code_vip": "",
-        "action_key": "QCM_WEEK_AWARDED",
+        "action_key": QCM_WEEK_MARKER,
         "quantite": 1,
         "points_unite": 0,
         "delta_points": 0,
         "raison": f"week:{week_id} | QCM weekly awards locked",
-    })
+    }
 
-def qcm_award_weekly_bonuses(s: SheetsService):
+def qcm_mark_week_awarded(s: SheetsService, week_id: str, staff_id: int = 0):
+    s.append_by_headers("LOG", _qcm_week_marker_row(week_id, staff_id))
+
+def plan_points_bulk(
+    s: SheetsService,
+    grants: List[Dict[str, Any]],
+    staff_id: int = 0,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[int, Dict[str, Any]]]:
     """
-    Distribue les bonus (actions) selon le leaderboard.
-    Retour: (wk, awarded) où awarded = [(discord_id, points_delta, good)]
-    NOTE: points_delta vient de ACTIONS.points_unite * qty
+    Calcul de add_points_bulk, sans écriture: (grants appliqués, lignes LOG,
+    mises à jour VIP par ligne). Les deux écritures (LOG puis VIP) restent à
+    faire par l'appelant: voir add_points_bulk, ou QcmWriter qui distingue un
+    échec avant le LOG (rien d'écrit, à rejouer) d'un échec après.
     """
-    wk, ordered = qcm_weekly_leaderboard(s)
-    awarded = []
+    actions = get_actions_map(s)
+    rows = s.get_all_records("VIP")
+    by_code: Dict[str, int] = {}
+    for row_i, r in enumerate(rows, start=2):
+        by_code.setdefault(normalize_code(str(r.get("code_vip", ""))), row_i)
+
+    ts = now_iso()
+    state: Dict[int, Dict[str, int]] = {}   # row_i -> points / niveau courants
+    applied: List[Dict[str, Any]] = []
+    log_rows: List[Dict[str, Any]] = []
+    for g in grants:
+        code = normalize_code(str(g.get("code_vip", "")))
+        action_key = str(g.get("action_key", "")).strip().upper()
+        qty = int(g.get("qty", 1) or 1)
+        row_i = by_code.get(code)
+        if not row_i or action_key not in actions or qty <= 0:
+            continue
+        vip = rows[row_i - 2]
+        if str(vip.get("status", "ACTIVE")).strip().upper() != "ACTIVE":
+            continue
 
-    bonuses = ["QCM_BONUS_W1", "QCM_BONUS_W2", "QCM_BONUS_W3"]
+        cur = state.get(row_i)
+        if cur is None:
+            try:
+                pts = int(vip.get("points", 0) or 0)
+            except Exception:
+                pts = 0
+            try:
+                lvl = int(vip.get("niveau", 1) or 1)
+            except Exception:
+                lvl = 1
+            cur = state[row_i] = {"points": pts, "niveau": lvl}
 
-    for i, (did, st) in enumerate(ordered[:3]):
         try:
-            did_int = int(did)
+            pu = int(actions[action_key]["points_unite"] or 0)
         except Exception:
-            continue
+            pu = 0
+        delta = pu * qty
+        old_points, old_level = cur["points"], cur["niveau"]
+        cur["points"] = old_points + delta
+        cur["niveau"] = calc_level(s, cur["points"])
+
+        log_rows.append({
+            "timestamp": ts,
+            "staff_id": str(g.get("staff_id", staff_id)),
+            "code_vip": code,
+            "action_key": action_key,
+            "quantite": qty,
+            "points_unite": pu,
+            "delta_points": delta,
+            "raison": g.get("reason", "") or "",
+        })
+        applied.append({
+            **g,
+            "code_vip": code,
+            "action_key": action_key,
+            "row_i": row_i,
+            "delta": delta,
+            "old_points": old_points,
+            "new_points": cur["points"],
+            "old_level": old_level,
+            "new_level": cur["niveau"],
+        })
 
-        row_i, vip = find_vip_row_by_discord_id(s, did_int)
-        if not vip:
-            continue
-        code = normalize_code(str(vip.get("code_vip", "")))
+    return applied, log_rows, {row_i: dict(v) for row_i, v in state.items()}
 
-        action_key = bonuses[i]
-        pu = _action_points_unite(s, action_key)
+def add_points_bulk(
+    s: SheetsService,
+    grants: List[Dict[str, Any]],
+    staff_id: int = 0,
+    extra_log: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Attribution groupée (système / HG: pas de limites ACTIONS).
+    grants = [{"code_vip", "action_key", "qty", "reason"[, "staff_id"]}, ...]
 
-        ok, res = add_points_by_action(
-            s, code, action_key, 1,
-            staff_id=0,
-            reason=f"Bonus QCM {wk}",
-            author_is_hg=True
-        )
-        if ok:
-            # delta réel = points_unite*1
-            awarded.append((did, int(pu), int(st.get("good", 0) or 0)))
+    Une lecture VIP (cache), deltas et niveaux calculés en mémoire (plusieurs
+    grants pour un même VIP se cumulent), puis un seul append LOG (+ extra_log)
+    et un seul batch_update VIP. Le LOG part en premier: s'il passe et que le
+    VIP échoue, le registre garde la trace des points à reporter (l'inverse
+    doublerait les points au prochain essai).
 
-    # participation: >= 15 bonnes réponses dans la semaine
-    for did, st in ordered:
-        if int(st.get("good", 0) or 0) < 15:
-            continue
-        try:
-            did_int = int(did)
-        except Exception:
-            continue
+    Retour: grants appliqués, complétés de row_i, delta, old/new points et niveaux.
+    Ignorés: VIP introuvable / désactivé, action inconnue.
+    """
+    applied, log_rows, vip_updates = plan_points_bulk(s, grants, staff_id)
+    s.append_rows_by_headers("LOG", log_rows + list(extra_log or []))
+    if vip_updates:
+        s.batch_update_by_header("VIP", vip_updates)
+    return applied
 
-        row_i, vip = find_vip_row_by_discord_id(s, did_int)
+def qcm_weekly_award_grants(s: SheetsService, wk: str, ordered) -> List[Dict[str, Any]]:
+    """
+    Bonus de la semaine à partir du classement (un seul index discord_id -> VIP):
+    podium QCM_BONUS_W1..W3, participation si >= QCM_PARTICIPANT_MIN réponses.
+    """
+    by_did: Dict[str, Dict[str, Any]] = {}
+    for r in s.get_all_records("VIP"):
+        did = str(r.get("discord_id", "")).strip()
+        if did:
+            by_did.setdefault(did, r)
+
+    actions = get_actions_map(s)
+    participant = next((k for k in QCM_PARTICIPANT_ACTIONS if k in actions), QCM_PARTICIPANT_ACTIONS[0])
+
+    grants: List[Dict[str, Any]] = []
+    for i, (did, st) in enumerate(ordered):
+        vip = by_did.get(str(did).strip())
         if not vip:
             continue
         code = normalize_code(str(vip.get("code_vip", "")))
-
-        add_points_by_action(
-            s, code, "QCM_PARTICIPANT", 1,
-            staff_id=0,
-            reason=f"Participation QCM {wk}",
-            author_is_hg=True
-        )
-
-    return wk, awarded
+        good = int(st.get("good", 0) or 0)
+        total = int(st.get("total", 0) or 0)
+        if i < len(QCM_PODIUM_BONUSES):
+            grants.append({
+                "discord_id": did, "good": good, "code_vip": code,
+                "action_key": QCM_PODIUM_BONUSES[i], "qty": 1,
+                "reason": f"QCM weekly podium | week:{wk}",
+            })
+        if total >= QCM_PARTICIPANT_MIN:
+            grants.append({
+                "discord_id": did, "good": good, "code_vip": code,
+                "action_key": participant, "qty": 1,
+                "reason": f"QCM weekly participation | week:{wk} | total:{total}",
+            })
+    return grants
+
+def qcm_award_weekly_bonuses(s: SheetsService, dt=None, staff_id: int = 0, wk: Optional[str] = None, ordered=None):
+    """
+    Distribue les bonus de la semaine en une passe (add_points_bulk), une
+    seule fois par semaine: le marqueur QCM_WEEK_AWARDED part dans le même
+    append LOG que les bonus.
+
+    wk / ordered: classement déjà calculé (qcm_weekly_leaderboard), sinon relu.
+    Retour: (wk, awarded, already)
+      awarded = [(discord_id, points_delta, good)] (cumul podium + participation)
+      already = True si la semaine était déjà distribuée (rien n'est écrit)
+    """
+    if ordered is None:
+        wk, ordered = qcm_weekly_leaderboard(s, dt)
+    wk = wk or week_key_fr(dt)
+    if qcm_week_already_awarded(s, wk):
+        return wk, [], True
+
+    grants = qcm_weekly_award_grants(s, wk, ordered)
+    applied = add_points_bulk(s, grants, staff_id=staff_id, extra_log=[_qcm_week_marker_row(wk, staff_id)])
+
+    per: Dict[str, List[int]] = {}
+    for g in applied:
+        acc = per.setdefault(str(g["discord_id"]), [0, int(g.get("good", 0) or 0)])
+        acc[0] += int(g["delta"])
+    awarded = [(did, pts, good) for did, (pts, good) in per.items()]
+    return wk, awarded, False
@@ -7,6 +7,8 @@ from typing import Dict, List, Optional, Tuple
 import random
 import os
 
+import assets
+
 # ==========================================================
 # CONFIG
 # ==========================================================
@@ -26,7 +28,15 @@ ASSET_BASE_URL = os.getenv(
     "https://raw.githubusercontent.com/immaimashiro/mikasa2-bot/main/"
 ).strip()
 
-def asset(path: str) -> str:
+def asset(path: str, variant: str = "embed") -> str:
+    """
+    Dérivé réduit (S3, via assets_manifest.json) si l'image a été buildée
+    (python assets.py build), sinon l'original sur ASSET_BASE_URL.
+    variant: "thumb" (vignettes) | "embed" (grandes images)
+    """
+    url = assets.url_for(path, variant)
+    if url:
+        return url
     if not ASSET_BASE_URL:
         return ""
     return ASSET_BASE_URL.rstrip("/") + "/" + path.lstrip("/")
@@ -44,11 +54,11 @@ class AvatarDef:
     short: str
 
 AVATARS: List[AvatarDef] = [
-    AvatarDef(tag="MAI",   name="Mai Mashiro",  image=asset("Mai.png"),   short="Froide, efficace. Bonus ATK."),
-    AvatarDef(tag="ROXY",  name="Roxy",         image=asset("Roxy.png"),  short="Agressive. Gros dégâts, +heat possible."),
-    AvatarDef(tag="DRACO", name="Draco",        image=asset("Draco.png"), short="Tank. Prend les coups à ta place."),
-    AvatarDef(tag="LYA",   name="Lya",          image=asset("Lya.png"),   short="Support. Heal, bonus loot/perception."),
-    AvatarDef(tag="ZACKO", name="Zacko",        image=asset("Zacko.png"), short="Assassin. Critiques, bonus vol."),
+    AvatarDef(tag="MAI",   name="Mai Mashiro",  image=asset("Mai.png", "thumb"),   short="Froide, efficace. Bonus ATK."),
+    AvatarDef(tag="ROXY",  name="Roxy",         image=asset("Roxy.png", "thumb"),  short="Agressive. Gros dégâts, +heat possible."),
+    AvatarDef(tag="DRACO", name="Draco",        image=asset("Draco.png", "thumb"), short="Tank. Prend les coups à ta place."),
+    AvatarDef(tag="LYA",   name="Lya",          image=asset("Lya.png", "thumb"),   short="Support. Heal, bonus loot/perception."),
+    AvatarDef(tag="ZACKO", name="Zacko",        image=asset("Zacko.png", "thumb"), short="Assassin. Critiques, bonus vol."),
 ]
 
 AVATAR_BY_TAG: Dict[str, AvatarDef] = {a.tag: a for a in AVATARS}
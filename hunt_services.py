@@ -8,6 +8,7 @@ import random
 from typing import Any, Dict, List, Optional, Tuple, Iterator
 from datetime import datetime, timedelta
 
+import metrics
 from services import (
     SheetsService,
     PARIS_TZ,
@@ -337,10 +338,9 @@ def ally_change_week_key_set(sheets: SheetsService, row_i: int, row: Dict[str, A
 # Rows with row index (robuste)
 # ==========================================================
 def _records_with_row_index(sheets: SheetsService, tab_name: str) -> List[Tuple[int, Dict[str, Any]]]:
-    ws_fn = getattr(sheets, "ws", None)
-    if callable(ws_fn):
-        ws = ws_fn(tab_name)
-        values = ws.get_all_values()
+    if callable(getattr(sheets, "get_all_values", None)):
+        # via le service: onglet suivi => copie en mémoire (tabcache)
+        values = sheets.get_all_values(tab_name)
         if not values or len(values) < 2:
             return []
         headers = [h.strip() for h in values[0]]
@@ -510,7 +510,10 @@ def item_get(sheets: SheetsService, item_id: str) -> Optional[Dict[str, Any]]:
     if not iid:
         return None
     if iid not in _ITEMS_CACHE:
+        metrics.cache_miss("hunt_items")
         items_refresh_cache(sheets)
+    else:
+        metrics.cache_hit("hunt_items")
     return _ITEMS_CACHE.get(iid)
 
 # compat: ton UI appelle parfois item_by_id
@@ -7,6 +7,7 @@ import discord
 from discord import ui
 
 import hunt_rpg as rpg
+import assets
 from services import catify, now_fr
 
 
@@ -67,7 +68,9 @@ def _img_for(encounter: str = "", boss_hint: str = "") -> str:
         return ""
     e = (encounter or "").strip()
     b = (boss_hint or "").strip()
-    return (m.get(e) or m.get(e.lower()) or m.get(e.title()) or m.get(b) or "")
+    url = (m.get(e) or m.get(e.lower()) or m.get(e.title()) or m.get(b) or "")
+    # vignette réduite sur S3 si l'image est dans le manifest d'assets
+    return assets.resolve_url(url, "thumb")
 
 
 # ==========================================================
@@ -0,0 +1,192 @@
+# jobs.py
+# -*- coding: utf-8 -*-
+"""
+Jobs planifiés (APScheduler) hors de la boucle asyncio.
+
+- chaque job est une coroutine; son travail Sheets passe par
+  JobRunner.offload() => pool de threads dédié (la boucle Discord reste libre,
+  et les jobs ne prennent pas les threads des interactions)
+- registre persistant (JSON): dernier déclenchement traité, statut, durée,
+  appels Sheets par run
+- ratés: au démarrage, un déclenchement manqué depuis moins de
+  JOB_MISFIRE_GRACE_S est rattrapé une fois (coalesce: plusieurs ratés => un run)
+
+Le jobstore SQLAlchemy d'APScheduler demanderait des callables picklables (nos
+jobs utilisent le bot): les définitions restent dans le code, seul l'historique
+des runs est persistant.
+
+Config:
+- JOB_STATE_PATH=.cache/jobs.json
+- JOB_MISFIRE_GRACE_S=3600
+- JOB_WORKERS=2
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+STATE_PATH = os.getenv("JOB_STATE_PATH", os.path.join(".cache", "jobs.json")).strip()
+MISFIRE_GRACE_S = int(os.getenv("JOB_MISFIRE_GRACE_S", "3600"))
+WORKERS = max(1, int(os.getenv("JOB_WORKERS", "2")))
+
+# recherche du dernier déclenchement (jobs hebdo => 8 jours suffisent)
+LOOKBACK = timedelta(days=8)
+
+
+@dataclass
+class JobSpec:
+    id: str
+    fn: Callable[[], Awaitable[Any]]
+    trigger: Any
+    label: str = ""
+
+
+def previous_fire(trigger, now: datetime) -> Optional[datetime]:
+    """Dernier déclenchement <= now (None si aucun dans LOOKBACK)."""
+    t = trigger.get_next_fire_time(None, now - LOOKBACK)
+    prev = None
+    while t is not None and t <= now:
+        prev = t
+        t = trigger.get_next_fire_time(t, t + timedelta(microseconds=1))
+    return prev
+
+
+def _parse_dt(v: Any) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(str(v)) if v else None
+    except ValueError:
+        return None
+
+
+class JobRunner:
+    def __init__(self, path: str = STATE_PATH, *, grace_s: int = MISFIRE_GRACE_S, workers: int = WORKERS):
+        self.path = path
+        self.grace_s = grace_s
+        self.workers = workers
+        self.specs: Dict[str, JobSpec] = {}
+        self.scheduler = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.state: Dict[str, Dict[str, Any]] = self._load()
+
+    # ---------- registre ----------
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print("Jobs: registre illisible, repart de zéro:", e)
+            return {}
+
+    def _save(self) -> None:
+        try:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=2, sort_keys=True, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print("Jobs: registre non sauvegardé:", e)
+
+    # ---------- exécution ----------
+    def add(self, job_id: str, fn: Callable[[], Awaitable[Any]], trigger, *, label: str = "") -> None:
+        self.specs[job_id] = JobSpec(id=job_id, fn=fn, trigger=trigger, label=label or job_id)
+
+    async def offload(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Exécute un appel bloquant (Sheets...) dans le pool des jobs."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mikasa-job")
+        ctx = contextvars.copy_context()  # coût Sheets imputé au job courant
+        call = functools.partial(ctx.run, fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    async def run(self, job_id: str, *, fire: Optional[datetime] = None, catchup: bool = False) -> None:
+        spec = self.specs[job_id]
+        if fire is None:
+            fire = previous_fire(spec.trigger, datetime.now(spec.trigger.timezone))
+        cost: Dict[str, int] = {}
+        t0 = time.perf_counter()
+        status, error = "ok", ""
+        try:
+            await metrics.timed_job(job_id, spec.fn, cost=cost)
+        except Exception as e:
+            status, error = "error", repr(e)
+        seconds = time.perf_counter() - t0
+
+        rec = self.state.setdefault(job_id, {})
+        rec.update({
+            "last_fire": fire.isoformat() if fire else rec.get("last_fire", ""),
+            "last_run_at": int(time.time()),
+            "status": status,
+            "error": error,
+            "seconds": round(seconds, 3),
+            "sheets_calls": sum(cost.values()),
+            "sheets_ops": dict(sorted(cost.items())),
+            "catchup": catchup,
+            "runs": int(rec.get("runs", 0)) + 1,
+        })
+        self._save()
+        tag = " (rattrapage)" if catchup else ""
+        print(f"Job {job_id}{tag}: {status} en {seconds:.1f}s, {sum(cost.values())} appel(s) Sheets" + (f" — {error}" if error else ""))
+
+    # ---------- ratés ----------
+    def missed(self, now: Optional[datetime] = None) -> List[Tuple[str, datetime]]:
+        """
+        Déclenchements manqués à rattraper: (job_id, déclenchement).
+        Premier démarrage d'un job: on pose la référence sans rattraper
+        (impossible de savoir si l'ancien process l'avait exécuté).
+        """
+        out = []
+        for job_id, spec in self.specs.items():
+            t_now = now or datetime.now(spec.trigger.timezone)
+            prev = previous_fire(spec.trigger, t_now)
+            if prev is None:
+                continue
+            rec = self.state.get(job_id)
+            if not rec or not rec.get("last_fire"):
+                self.state.setdefault(job_id, {})["last_fire"] = prev.isoformat()
+                continue
+            last = _parse_dt(rec.get("last_fire"))
+            if last is not None and last >= prev:
+                continue
+            late = (t_now - prev).total_seconds()
+            if late > self.grace_s:
+                print(f"Job {job_id}: déclenchement du {prev:%d/%m %H:%M} manqué ({late / 60:.0f} min), hors délai de grâce.")
+                rec.update({"last_fire": prev.isoformat(), "status": "missed"})
+                continue
+            out.append((job_id, prev))
+        self._save()
+        return out
+
+    def start(self, timezone) -> None:
+        """Crée l'AsyncIOScheduler, enregistre les jobs et rattrape les ratés."""
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        self.scheduler = AsyncIOScheduler(
+            timezone=timezone,
+            job_defaults={"coalesce": True, "misfire_grace_time": self.grace_s, "max_instances": 1},
+        )
+        for spec in self.specs.values():
+            self.scheduler.add_job(self.run, spec.trigger, args=[spec.id], id=spec.id, name=spec.label, replace_existing=True)
+        self.scheduler.start()
+        for job_id, fire in self.missed():
+            asyncio.get_running_loop().create_task(self.run(job_id, fire=fire, catchup=True))
+
+    def shutdown(self) -> None:
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
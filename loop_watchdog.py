@@ -0,0 +1,160 @@
+# loop_watchdog.py
+# -*- coding: utf-8 -*-
+"""
+Surveillance de la boucle asyncio.
+
+- sampler: tâche asyncio qui mesure le retard de réveil (-> metrics)
+- watchdog (optionnel): thread qui, si la boucle ne bat plus depuis
+  `threshold` secondes, capture la pile du thread de la boucle et la
+  log avec la commande / le bouton en cours.
+
+Activation: LOOP_WATCHDOG_MS=500 (vide/0 => sampler seul).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, List, Optional, Tuple
+
+import metrics
+
+
+def _describe_interaction(interaction: Any, owner: Any = None) -> Tuple[str, str]:
+    """(label stable pour la métrique, détail pour le log)."""
+    cmd = getattr(interaction, "command", None)
+    if cmd is not None:
+        name = "/" + str(getattr(cmd, "qualified_name", "") or getattr(cmd, "name", "?"))
+        return name, name
+    data = getattr(interaction, "data", None) or {}
+    # custom_id souvent aléatoire (boutons sans custom_id explicite): log seulement
+    custom_id = str(data.get("custom_id", "") or "") if isinstance(data, dict) else ""
+    where = type(owner).__name__ if owner is not None else "component"
+    return where, (f"{where}[{custom_id}]" if custom_id else where)
+
+
+def describe_frames(frame) -> Tuple[str, str]:
+    """
+    Remonte la pile bloquée et cherche une variable locale `interaction`
+    (callbacks de commandes, de View et de boutons).
+    Retour: (commande ou classe View/Button, même chose + custom_id), ("", "") sinon.
+    """
+    f = frame
+    while f is not None:
+        try:
+            loc = f.f_locals
+            inter = loc.get("interaction")
+            if inter is not None and hasattr(inter, "created_at"):
+                return _describe_interaction(inter, loc.get("self"))
+        except Exception:
+            pass
+        f = f.f_back
+    return "", ""
+
+
+class LoopWatchdog:
+    def __init__(self, *, threshold: float = 0.0, interval: float = 0.25):
+        self.threshold = float(threshold)
+        # le battement doit être nettement plus court que le seuil
+        self.interval = min(float(interval), self.threshold / 4) if self.threshold > 0 else float(interval)
+        self.last_beat = time.monotonic()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --------- côté boucle ---------
+    async def sampler(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - t0 - self.interval)
+            self.last_beat = time.monotonic()
+            metrics.LOOP_LAG.observe(lag)
+            metrics.LOOP_LAG_LAST.set(lag)
+
+    def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        # référence gardée: sinon la tâche peut être ramassée par le GC
+        self._task = self.loop.create_task(self.sampler(), name="loop-sampler")
+        self._task.add_done_callback(self._sampler_done)
+
+        if self.threshold > 0:
+            self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._thread.start()
+            print(f"Loop watchdog: seuil {int(self.threshold * 1000)} ms")
+
+    def _sampler_done(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        e = task.exception()
+        if e is not None:
+            print("Loop watchdog: sampler arrêté:", repr(e))
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # --------- côté thread ---------
+    def _current_task_label(self) -> str:
+        try:
+            task = asyncio.current_task(self.loop)
+        except Exception:
+            task = None
+        if task is None:
+            return ""
+        coro = task.get_coro()
+        return f"{task.get_name()} ({getattr(coro, '__qualname__', '?')})"
+
+    def _report(self, blocked_for: float) -> None:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return
+        label, where = describe_frames(frame)
+        label, where = label or "?", where or "?"
+        task = self._current_task_label()
+        stack: List[str] = traceback.format_stack(frame)
+
+        metrics.LOOP_BLOCKS.inc(where=label)
+        print(
+            f"⚠️ LOOP BLOQUÉE depuis {blocked_for:.2f}s | commande: {where}"
+            + (f" | task: {task}" if task else "")
+            + "\n" + "".join(stack[-25:])
+        )
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self.last_beat
+            blocked_for = time.monotonic() - beat
+            if blocked_for < self.threshold:
+                if reported_beat is not None and beat != reported_beat:
+                    print("✅ Loop débloquée (battement repris).")
+                    reported_beat = None
+                continue
+            # une seule trace par blocage
+            if reported_beat == beat:
+                continue
+            reported_beat = beat
+            try:
+                self._report(blocked_for)
+            except Exception as e:
+                print("Loop watchdog report failed:", e)
+
+
+def start_from_env() -> LoopWatchdog:
+    """À appeler depuis la boucle (main/setup_hook)."""
+    raw = (os.getenv("LOOP_WATCHDOG_MS") or "").strip()
+    threshold = int(raw) / 1000.0 if raw.isdigit() else 0.0
+    wd = LoopWatchdog(threshold=threshold)
+    wd.start()
+    return wd
@@ -0,0 +1,17 @@
+# main.py
+# -*- coding: utf-8 -*-
+"""
+Point d'entrée du bot: python main.py
+
+Rien au niveau module: les workers de rendu des cartes (card_pool, contexte
+spawn) réimportent le module principal du parent sous le nom __mp_main__.
+Avec bot.py lancé en script, chaque worker rejouait tout bot.py (discord,
+SheetsService, S3, jobs, sessions QCM, credentials.json, commandes); ici
+ils n'importent que card_pool / services.
+"""
+
+if __name__ == "__main__":
+    import asyncio
+
+    import bot
+    asyncio.run(bot.main())
@@ -0,0 +1,376 @@
+# metrics.py
+# -*- coding: utf-8 -*-
+"""
+Métriques internes au format texte Prometheus.
+
+- stdlib uniquement (importable depuis services.py sans dépendance lourde)
+- thread-safe (les appels Sheets/S3 peuvent tourner dans un executor)
+- serveur HTTP optionnel, lié à localhost: GET /metrics
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_LOCK = threading.Lock()
+
+LabelKey = Tuple[str, ...]
+
+# ==========================================================
+# Types de métriques
+# ==========================================================
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        k = self._key(labels)
+        with _LOCK:
+            self._values[k] = self._values.get(k, 0.0) + float(amount)
+
+    def get(self, **labels: str) -> float:
+        with _LOCK:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with _LOCK:
+            items = sorted(self._values.items())
+        out = self.header()
+        for k, v in items:
+            out.append(f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}")
+        return out
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with _LOCK:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        k = self._key(labels)
+        with _LOCK:
+            self._values[k] = self._values.get(k, 0.0) + float(amount)
+
+    def get(self, **labels: str) -> float:
+        with _LOCK:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with _LOCK:
+            items = sorted(self._values.items())
+        out = self.header()
+        for k, v in items:
+            out.append(f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}")
+        return out
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets)) + (float("inf"),)
+        # k -> [counts par bucket..., sum, count]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        k = self._key(labels)
+        v = float(value)
+        with _LOCK:
+            row = self._values.get(k)
+            if row is None:
+                row = [0.0] * (len(self.buckets) + 2)
+                self._values[k] = row
+            for i, b in enumerate(self.buckets):
+                if v <= b:
+                    row[i] += 1
+            row[-2] += v
+            row[-1] += 1
+
+    def count(self, **labels: str) -> float:
+        with _LOCK:
+            row = self._values.get(self._key(labels))
+            return row[-1] if row else 0.0
+
+    def time(self, **labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with _LOCK:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        out = self.header()
+        for k, row in items:
+            for i, b in enumerate(self.buckets):
+                le = f'le="{_fmt_value(b)}"'
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, k, le)} {_fmt_value(row[i])}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labelnames, k)} {_fmt_value(row[-2])}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labelnames, k)} {_fmt_value(row[-1])}")
+        return out
+
+
+class _Timer:
+    """with HIST.time(op="x"): ...  (status=error si exception)"""
+    def __init__(self, hist: Histogram, labels: Dict[str, str]):
+        self.hist = hist
+        self.labels = dict(labels)
+        self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = dict(self.labels)
+        if "status" in self.hist.labelnames and "status" not in labels:
+            labels["status"] = "error" if exc_type else "ok"
+        self.hist.observe(time.perf_counter() - self.t0, **labels)
+        return False
+
+
+REGISTRY: List[_Metric] = []
+
+# ==========================================================
+# Métriques du bot
+# ==========================================================
+SHEETS_REQUESTS = Counter(
+    "mikasa_sheets_requests_total",
+    "Appels Google Sheets (chaque tentative compte, retries 429 inclus).",
+    ("op", "tab", "status"),
+)
+SHEETS_LATENCY = Histogram(
+    "mikasa_sheets_request_seconds",
+    "Durée des appels Google Sheets.",
+    ("op",),
+)
+CACHE_REQUESTS = Counter(
+    "mikasa_cache_requests_total",
+    "Lectures de cache (hit/miss).",
+    ("cache", "result"),
+)
+INTERACTION_LATENCY = Histogram(
+    "mikasa_interaction_latency_seconds",
+    "Temps entre la création de l'interaction (Discord) et la fin de la commande.",
+    ("command", "status"),
+)
+INTERACTION_DISPATCH = Histogram(
+    "mikasa_interaction_dispatch_seconds",
+    "Délai entre la création de l'interaction et sa réception par la boucle.",
+    ("type",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0),
+)
+LOOP_LAG = Histogram(
+    "mikasa_event_loop_lag_seconds",
+    "Retard de réveil de la boucle asyncio (échantillonné).",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+LOOP_LAG_LAST = Gauge(
+    "mikasa_event_loop_lag_last_seconds",
+    "Dernier retard de boucle mesuré.",
+)
+LOOP_BLOCKS = Counter(
+    "mikasa_event_loop_blocked_total",
+    "Blocages de la boucle détectés par le watchdog.",
+    ("where",),
+)
+JOB_DURATION = Histogram(
+    "mikasa_scheduler_job_seconds",
+    "Durée des jobs planifiés.",
+    ("job", "status"),
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+S3_LATENCY = Histogram(
+    "mikasa_s3_request_seconds",
+    "Durée des appels S3.",
+    ("op", "status"),
+)
+CARD_RENDER = Histogram(
+    "mikasa_card_render_seconds",
+    "Durée de rendu d'une carte VIP (attente du pool incluse).",
+    ("mode", "status"),
+)
+JOB_SHEETS = Counter(
+    "mikasa_scheduler_job_sheets_requests_total",
+    "Appels Google Sheets faits pendant les jobs planifiés.",
+    ("job",),
+)
+JOB_LAST_RUN = Gauge(
+    "mikasa_scheduler_job_last_run_timestamp",
+    "Fin du dernier run de chaque job (epoch).",
+    ("job", "status"),
+)
+STARTUP_PHASE = Gauge(
+    "mikasa_startup_seconds",
+    "Démarrage: secondes écoulées à chaque étape (imports, READY, caches chauds).",
+    ("phase",),
+)
+
+def cache_hit(cache: str) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit")
+
+def cache_miss(cache: str) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="miss")
+
+def _render_cache_ratios() -> List[str]:
+    with _LOCK:
+        items = list(CACHE_REQUESTS._values.items())
+    per: Dict[str, List[float]] = {}
+    for (cache, result), v in items:
+        hm = per.setdefault(cache, [0.0, 0.0])
+        hm[0 if result == "hit" else 1] += v
+    out = [
+        "# HELP mikasa_cache_hit_ratio Ratio hit/(hit+miss) depuis le démarrage.",
+        "# TYPE mikasa_cache_hit_ratio gauge",
+    ]
+    for cache in sorted(per):
+        hit, miss = per[cache]
+        ratio = hit / (hit + miss) if (hit + miss) else 0.0
+        out.append(f'mikasa_cache_hit_ratio{{cache="{_escape(cache)}"}} {_fmt_value(ratio)}')
+    return out
+
+def render() -> str:
+    lines: List[str] = []
+    for m in REGISTRY:
+        lines.extend(m.render())
+    lines.extend(_render_cache_ratios())
+    return "\n".join(lines) + "\n"
+
+# ==========================================================
+# Helpers asyncio
+# ==========================================================
+# coût Sheets du job en cours: {op: appels}. Les threads lancés par
+# asyncio.to_thread / run_in_executor(ctx.run) héritent du contexte.
+_JOB_COST: "contextvars.ContextVar[Optional[Dict[str, int]]]" = contextvars.ContextVar("mikasa_job_cost", default=None)
+
+def count_sheets_call(op: str) -> None:
+    """Impute un appel Sheets au job planifié courant (si on est dans un job)."""
+    cost = _JOB_COST.get()
+    if cost is not None:
+        with _LOCK:
+            cost[op] = cost.get(op, 0) + 1
+
+async def timed_job(name: str, coro_fn, cost: Optional[Dict[str, int]] = None):
+    """
+    Exécute un job planifié (coroutine) en mesurant sa durée et ses appels
+    Sheets (`cost` est rempli par op si fourni).
+    """
+    cost = cost if cost is not None else {}
+    token = _JOB_COST.set(cost)
+    t0 = time.perf_counter()
+    status = "ok"
+    try:
+        return await coro_fn()
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        _JOB_COST.reset(token)
+        JOB_DURATION.observe(time.perf_counter() - t0, job=name, status=status)
+        JOB_SHEETS.inc(sum(cost.values()), job=name)
+        JOB_LAST_RUN.set(time.time(), job=name, status=status)
+
+# ==========================================================
+# Serveur HTTP (localhost)
+# ==========================================================
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # on consomme les headers
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=5)
+            if not line or line in (b"\r\n", b"\n"):
+                break
+
+        parts = request_line.decode("latin-1").split()
+        path = parts[1] if len(parts) >= 2 else ""
+        if len(parts) >= 2 and parts[0] == "GET" and path.split("?", 1)[0] in ("/metrics", "/"):
+            body = render().encode("utf-8")
+            status = "200 OK"
+            ctype = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = b"not found\n"
+            status = "404 Not Found"
+            ctype = "text/plain; charset=utf-8"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+            + body
+        )
+        await writer.drain()
+    except Exception:
+        pass
+    finally:
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+async def start_server(port: int, host: str = "127.0.0.1") -> asyncio.AbstractServer:
+    server = await asyncio.start_server(_handle, host=host, port=int(port))
+    print(f"Metrics: http://{host}:{port}/metrics")
+    return server
+
+async def start_from_env() -> Optional[asyncio.AbstractServer]:
+    """
+    METRICS_PORT vide/0 => désactivé.
+    METRICS_HOST (défaut 127.0.0.1).
+    """
+    raw = (os.getenv("METRICS_PORT") or "").strip()
+    if not raw.isdigit() or int(raw) == 0:
+        return None
+    host = (os.getenv("METRICS_HOST") or "127.0.0.1").strip()
+    try:
+        return await start_server(int(raw), host=host)
+    except Exception as e:
+        print("Metrics server failed:", e)
+        return None
@@ -0,0 +1,155 @@
+# qcm_daily.py
+# -*- coding: utf-8 -*-
+"""
+QCM du jour précalculé.
+
+Une fois par jour (job à minuit Paris, ou au premier /qcm start):
+- tirage du jour (domain.qcm_pick_daily_set, graine = date => identique
+  pour tout le monde)
+- QCM_VARIANTS variantes aux réponses mélangées (graine "date:n"), bonnes
+  réponses réparties sur A/B/C/D (au plus QCM_MAX_SAME_LETTER fois la même
+  lettre par variante)
+
+Gardé en mémoire et sur disque (QCM_DAILY_PATH): un redémarrage dans la
+journée ressert exactement les mêmes questions, sans relire QCM_QUESTIONS.
+Chaque joueur a toujours la même variante (crc32 date + discord_id).
+
+Config:
+- QCM_DAILY_PATH=.cache/qcm_daily.json
+- QCM_VARIANTS=8
+- QCM_MAX_SAME_LETTER=2
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import domain
+from services import SheetsService, now_fr
+
+CACHE_PATH = os.getenv("QCM_DAILY_PATH", os.path.join(".cache", "qcm_daily.json")).strip()
+VARIANTS = max(1, int(os.getenv("QCM_VARIANTS", "8")))
+MAX_SAME_LETTER = max(1, int(os.getenv("QCM_MAX_SAME_LETTER", "2")))
+
+LETTERS = ["A", "B", "C", "D"]
+CACHE_VERSION = 1
+
+
+def shuffle_question(q: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """Copie de la question avec A/B/C/D mélangées et `correct` recalculée."""
+    choices = [(letter, q.get(letter, "")) for letter in LETTERS]
+    rng.shuffle(choices)
+    out = dict(q)
+    for new_letter, (old_letter, text) in zip(LETTERS, choices):
+        out[new_letter] = text
+        if old_letter == str(q.get("correct", "")).upper():
+            out["correct"] = new_letter
+    return out
+
+def shuffle_with_balance(questions: List[Dict[str, Any]], rng: random.Random, max_same: int = MAX_SAME_LETTER, tries: int = 6) -> List[Dict[str, Any]]:
+    """Mélange chaque question en évitant qu'une même lettre soit trop souvent la bonne."""
+    counts = {letter: 0 for letter in LETTERS}
+    out = []
+    for q in questions:
+        built = shuffle_question(q, rng)
+        for _ in range(tries):
+            if counts.get(built["correct"], 0) < max_same:
+                break
+            built = shuffle_question(q, rng)
+        # si on n'a pas réussi, on prend quand même (sinon boucle infinie)
+        counts[built["correct"]] = counts.get(built["correct"], 0) + 1
+        out.append(built)
+    return out
+
+
+@dataclass
+class DailySet:
+    date_key: str
+    questions: List[Dict[str, Any]]
+    variants: List[List[Dict[str, Any]]] = field(default_factory=list)
+
+    def for_player(self, discord_id: int) -> List[Dict[str, Any]]:
+        """Variante (stable) du joueur."""
+        if not self.variants:
+            return self.questions
+        i = zlib.crc32(f"{self.date_key}:{int(discord_id)}".encode("utf-8")) % len(self.variants)
+        return self.variants[i]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"version": CACHE_VERSION, "date_key": self.date_key, "questions": self.questions, "variants": self.variants}
+
+
+def build(s: SheetsService, dt=None, variants: int = VARIANTS) -> DailySet:
+    dt = dt or now_fr()
+    dk = domain.date_key_fr(dt)
+    questions = domain.qcm_pick_daily_set(s, dt)
+    return DailySet(
+        date_key=dk,
+        questions=questions,
+        variants=[shuffle_with_balance(questions, random.Random(f"{dk}:{n}")) for n in range(variants)],
+    )
+
+
+# ==========================================================
+# Cache (mémoire + disque)
+# ==========================================================
+_CURRENT: Optional[DailySet] = None
+_LOCK = threading.Lock()
+
+def _load(path: str, dk: str) -> Optional[DailySet]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print("QCM du jour: cache disque illisible, recalcul:", e)
+        return None
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION or data.get("date_key") != dk:
+        return None
+    return DailySet(date_key=dk, questions=data.get("questions") or [], variants=data.get("variants") or [])
+
+def _save(path: str, daily: DailySet) -> None:
+    try:
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(daily.as_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception as e:
+        print("QCM du jour: cache disque non écrit:", e)
+
+def get(s: SheetsService, dt=None, *, refresh: bool = False) -> DailySet:
+    """QCM du jour (mémoire, sinon disque, sinon calculé et sauvegardé). Bloquant au calcul."""
+    global _CURRENT
+    dt = dt or now_fr()
+    dk = domain.date_key_fr(dt)
+    cur = _CURRENT
+    if not refresh and cur is not None and cur.date_key == dk:
+        return cur
+    with _LOCK:
+        cur = _CURRENT
+        if not refresh and cur is not None and cur.date_key == dk:
+            return cur
+        daily = None if refresh else _load(CACHE_PATH, dk)
+        if daily is None:
+            daily = build(s, dt)
+            _save(CACHE_PATH, daily)
+        _CURRENT = daily
+        return daily
+
+def precompute(s: SheetsService, dt=None) -> str:
+    """Job de minuit: recalcule le QCM du jour (relit QCM_QUESTIONS)."""
+    domain.invalidate_tables("QCM_QUESTIONS")
+    daily = get(s, dt, refresh=True)
+    return f"{daily.date_key}: {len(daily.questions)} questions, {len(daily.variants)} variantes"
+
+def questions_for(s: SheetsService, discord_id: int, dt=None) -> List[Dict[str, Any]]:
+    return get(s, dt).for_player(discord_id)
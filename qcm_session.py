@@ -0,0 +1,251 @@
+# qcm_session.py
+# -*- coding: utf-8 -*-
+"""
+Sessions QCM en mémoire + écriture groupée.
+
+- une session par (discord_id, jour): progression du jour et points QCM de
+  la semaine chargés une fois (QCM_LOG + ce qui attend encore d'être écrit),
+  puis tenus à jour en mémoire => plus de relecture de QCM_LOG par réponse
+- deux /qcm start le même jour partagent la même session (pas de doublon)
+- répondre ne fait aucun appel Sheets: la ligne QCM_LOG et le crédit VIP
+  partent dans le QcmWriter, vidé en une fois (QCM_LOG: 1 append, points:
+  domain.plan_points_bulk => 1 append LOG + 1 batch VIP):
+    * à la fin d'une session (5e réponse, bouton Fermer, timeout de la vue)
+    * toutes les QCM_FLUSH_S secondes pour le reste
+    * à l'arrêt du bot
+  Une session de 5 réponses coûte donc au plus 3 écritures.
+
+Config:
+- QCM_FLUSH_S=20
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import domain
+import qcm_daily
+from services import SheetsService, normalize_code, now_fr
+
+FLUSH_S = float(os.getenv("QCM_FLUSH_S", "20"))
+
+# le service, ou une fonction qui le rend (résolu à chaque appel: bot.sheets
+# peut être remplacé après l'import, ex. benchmarks/loadtest.py)
+ServiceRef = Union[SheetsService, Callable[[], SheetsService]]
+
+def _resolve(ref: ServiceRef) -> SheetsService:
+    return ref() if callable(ref) else ref
+
+
+class QcmWriter:
+    """Tampon des écritures QCM (lignes QCM_LOG + crédits VIP)."""
+
+    def __init__(self, s: ServiceRef):
+        self._s = s
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._rows: List[Dict[str, Any]] = []
+        self._grants: List[Dict[str, Any]] = []
+
+    @property
+    def s(self) -> SheetsService:
+        return _resolve(self._s)
+
+    def add(self, row: Dict[str, Any], grant: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self._rows.append(row)
+            if grant:
+                self._grants.append(grant)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows) + len(self._grants)
+
+    def pending_rows(self) -> List[Dict[str, Any]]:
+        """Lignes QCM_LOG pas encore écrites."""
+        with self._lock:
+            return list(self._rows)
+
+    def flush(self) -> int:
+        """Écrit le tampon (bloquant: à lancer dans un thread). Retour: lignes QCM_LOG écrites."""
+        with self._flush_lock:
+            with self._lock:
+                rows, grants = self._rows, self._grants
+                self._rows, self._grants = [], []
+            if rows:
+                try:
+                    self.s.append_rows_by_headers("QCM_LOG", rows)
+                except Exception:
+                    # rien d'écrit: on remet tout en tête pour le prochain flush
+                    with self._lock:
+                        self._rows[:0] = rows
+                        self._grants[:0] = grants
+                    raise
+            if grants:
+                # add_points_bulk en deux temps: jusqu'au LOG inclus, un échec
+                # n'a rien écrit => crédits remis en tête pour le prochain flush
+                try:
+                    _, log_rows, vip_updates = domain.plan_points_bulk(self.s, grants)
+                    if log_rows:
+                        self.s.append_rows_by_headers("LOG", log_rows)
+                except Exception as e:
+                    with self._lock:
+                        self._grants[:0] = grants
+                    print(f"QCM writer: {len(grants)} crédit(s) VIP reportés au prochain flush:", e)
+                    return len(rows)
+                # LOG écrit: pas de rejeu (points doublés), le LOG garde la trace
+                if vip_updates:
+                    try:
+                        self.s.batch_update_by_header("VIP", vip_updates)
+                    except Exception as e:
+                        print(f"QCM writer: {len(grants)} crédit(s) VIP non appliqué(s), à reporter depuis LOG:", e)
+            return len(rows)
+
+    async def flush_async(self) -> None:
+        if not self.pending():
+            return
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception as e:
+            print("QCM writer: flush échoué, nouvel essai au prochain passage:", e)
+
+    async def run(self, every: float = FLUSH_S) -> None:
+        """Boucle de fond: vide le tampon toutes les `every` secondes."""
+        while True:
+            await asyncio.sleep(every)
+            await self.flush_async()
+
+
+@dataclass
+class QcmSession:
+    discord_id: int
+    code_vip: str
+    date_key: str
+    week_key: str
+    questions: List[Dict[str, Any]]
+    answers: Dict[int, Dict[str, Any]] = field(default_factory=dict)   # q_index (1..5) -> ligne QCM_LOG
+    week_points: int = 0
+
+    @property
+    def next_index(self) -> int:
+        """Index (0-based) de la prochaine question (= réponses données, comme avant)."""
+        return len(self.answers)
+
+    @property
+    def done(self) -> bool:
+        return self.next_index >= len(self.questions)
+
+
+def _int(v: Any) -> int:
+    try:
+        return int(v or 0)
+    except Exception:
+        return 0
+
+
+class QcmSessions:
+    def __init__(self, s: ServiceRef):
+        self._s = s
+        self.writer = QcmWriter(s)
+        self._sessions: Dict[Tuple[int, str], QcmSession] = {}
+        self._loading: Dict[Tuple[int, str], threading.Lock] = {}   # un verrou par session en chargement
+        self._lock = threading.Lock()
+
+    @property
+    def s(self) -> SheetsService:
+        return _resolve(self._s)
+
+    def open(self, discord_id: int, code_vip: str, dt=None) -> QcmSession:
+        """Session du jour (créée au besoin). Bloquant au premier chargement: à lancer dans un thread."""
+        dt = dt or now_fr()
+        dk = domain.date_key_fr(dt)
+        key = (int(discord_id), dk)
+        # verrou global: juste le dict (les sessions en cache répondent tout de suite)
+        with self._lock:
+            sess = self._sessions.get(key)
+            if sess is not None:
+                return sess
+            # sessions des jours précédents: plus utiles
+            for k in [k for k in self._sessions if k[1] != dk]:
+                del self._sessions[k]
+            for k in [k for k in self._loading if k[1] != dk]:
+                del self._loading[k]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        # chargement à froid: ne bloque que les ouvertures du même joueur
+        with key_lock:
+            with self._lock:
+                sess = self._sessions.get(key)
+            if sess is not None:
+                return sess
+            sess = self._load(discord_id, code_vip, dt)
+            with self._lock:
+                self._sessions[key] = sess
+                self._loading.pop(key, None)
+            return sess
+
+    def _load(self, discord_id: int, code_vip: str, dt) -> QcmSession:
+        code = normalize_code(code_vip)
+        dk = domain.date_key_fr(dt)
+        wk = domain.week_key_fr(dt)
+        questions = qcm_daily.questions_for(self.s, discord_id, dt)
+        # pas de flush pendant la lecture: chaque réponse est soit dans
+        # QCM_LOG, soit dans le tampon, jamais dans les deux
+        with self.writer._flush_lock:
+            _, answers = domain.qcm_today_progress(self.s, code, discord_id, dt)
+            week_points = domain.qcm_week_points_awarded(self.s, code, dt)
+            pending = self.writer.pending_rows()
+        sess = QcmSession(
+            discord_id=int(discord_id),
+            code_vip=code,
+            date_key=dk,
+            week_key=wk,
+            questions=questions,
+            answers={qi: r for qi, r in answers},
+            week_points=week_points,
+        )
+        # réponses encore dans le tampon (session précédente pas encore écrite)
+        for r in pending:
+            if normalize_code(str(r.get("code_vip", ""))) != code:
+                continue
+            if r.get("week_key") == wk:
+                sess.week_points += _int(r.get("points_awarded"))
+            if r.get("date_key") == dk and str(r.get("discord_id")) == str(discord_id):
+                sess.answers.setdefault(_int(r.get("q_index")), r)
+        return sess
+
+    def submit(self, sess: QcmSession, q_index: int, choice: str, elapsed_sec: int, chrono_limit_sec: int):
+        """
+        Réponse à la question q_index (1-based), en mémoire: aucun appel Sheets.
+        Retourne: (ok, msg, points_awarded, is_correct)
+        """
+        if q_index in sess.answers:
+            return False, "Déjà répondu à cette question.", 0, False
+        if not (1 <= q_index <= len(sess.questions)):
+            return False, "Question inconnue.", 0, False
+
+        q = sess.questions[q_index - 1]
+        correct, pts, meta = domain.qcm_score_answer(q, choice, elapsed_sec, chrono_limit_sec, sess.week_points)
+        row = domain.qcm_answer_row(
+            discord_id=sess.discord_id,
+            code_vip=sess.code_vip,
+            qid=q["qid"],
+            q_index=q_index,
+            choice=choice.upper(),
+            is_correct=correct,
+            points_awarded=pts,
+            elapsed_sec=elapsed_sec,
+            meta=meta,
+        )
+        sess.answers[q_index] = row
+        sess.week_points += pts
+        grant = domain.qcm_answer_grant(sess.code_vip, sess.discord_id, q, q_index, sess.date_key) if pts > 0 else None
+        self.writer.add(row, grant)
+        return True, ("✅" if correct else "❌"), pts, correct
+
+    async def close(self, sess: Optional[QcmSession] = None) -> None:
+        """Fin de session (terminée, fermée ou expirée): écrit le tampon."""
+        await self.writer.flush_async()
@@ -3,23 +3,28 @@
 
 import os
 import io
+import asyncio
+import functools
+import hashlib
+import threading
 import time
 import random
 import string
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
-from typing import Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple
 
-import gspread
-from gspread.exceptions import APIError
-from google.oauth2.service_account import Credentials
+# gspread / google-auth / boto3 / Pillow: importés au premier usage
+# (startup.lazy_import), pas au chargement du module => démarrage rapide
+import metrics
+import startup
+import tabcache
 
-import boto3
-from botocore.client import Config
-from botocore.exceptions import ClientError
-
-from PIL import Image, ImageDraw, ImageFont
+if TYPE_CHECKING:
+    import gspread
 
 
 # ----------------------------
@@ -120,7 +125,27 @@ def challenge_week_window(now: Optional[datetime] = None) -> Tuple[datetime, dat
 # Google Sheets service
 # ----------------------------
 def _is_quota_429(e: Exception) -> bool:
-    return isinstance(e, APIError) and ("429" in str(e) or "Quota exceeded" in str(e))
+    # une APIError implique que gspread est déjà importé
+    exc = sys.modules.get("gspread.exceptions")
+    return exc is not None and isinstance(e, exc.APIError) and ("429" in str(e) or "Quota exceeded" in str(e))
+
+def _emulator_session(base_url: str):
+    """Session qui redirige les appels gspread vers l'émulateur local (benchmarks/sheets_emulator.py)."""
+    requests = startup.lazy_import("requests")
+
+    class _EmulatorSession(requests.Session):
+        GOOGLE_BASE = "https://sheets.googleapis.com"
+
+        def __init__(self, base_url: str):
+            super().__init__()
+            self.base_url = base_url.rstrip("/")
+
+        def request(self, method, url, *args, **kwargs):
+            if isinstance(url, str) and url.startswith(self.GOOGLE_BASE):
+                url = self.base_url + url[len(self.GOOGLE_BASE):]
+            return super().request(method, url, *args, **kwargs)
+
+    return _EmulatorSession(base_url)
 
 @dataclass
 class CacheItem:
@@ -133,15 +158,18 @@ class SheetsService:
     - Cache headers (TTL)
     - Retry 429
     - Header-safe append/update
+    - Copies en mémoire + snapshot disque des gros onglets (tabcache.py)
+    - SHEETS_EMULATOR_URL=http://127.0.0.1:8787 => émulateur local (pas d'auth)
     """
     def __init__(self, sheet_id: str, creds_path: str = "credentials.json"):
         self.sheet_id = sheet_id
         self.creds_path = creds_path
+        self.emulator_url = (os.getenv("SHEETS_EMULATOR_URL") or "").strip()
         self.scopes = [
             "https://www.googleapis.com/auth/spreadsheets",
             "https://www.googleapis.com/auth/drive.file",
         ]
-        self._gc: Optional[gspread.Client] = None
+        self._gc: Optional["gspread.Client"] = None
         self._sh = None
 
         self._ws_cache: Dict[str, CacheItem] = {}
@@ -150,22 +178,47 @@ class SheetsService:
         self.ws_ttl = 60
         self.hdr_ttl = 180
 
+        # onglets suivis (TAB_CACHE_TABS): lectures servies depuis la mémoire
+        self.tabs: Optional[tabcache.TabStore] = tabcache.store_from_env(self)
+
+    def _call(self, fn, *args, **kwargs):
+        # une tentative = une requête API (comptée pour /metrics)
+        op = getattr(fn, "__name__", "call")
+        tab = str(getattr(getattr(fn, "__self__", None), "title", "") or "")
+        t0 = time.perf_counter()
+        status = "ok"
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            status = "429" if _is_quota_429(e) else "error"
+            raise
+        finally:
+            metrics.SHEETS_REQUESTS.inc(op=op, tab=tab, status=status)
+            metrics.count_sheets_call(op)
+            metrics.SHEETS_LATENCY.observe(time.perf_counter() - t0, op=op)
+
     def _retry(self, fn, *args, **kwargs):
         delay = 1.0
         for _ in range(6):
             try:
-                return fn(*args, **kwargs)
+                return self._call(fn, *args, **kwargs)
             except Exception as e:
                 if _is_quota_429(e):
                     time.sleep(delay)
                     delay *= 2
                     continue
                 raise
-        return fn(*args, **kwargs)
+        return self._call(fn, *args, **kwargs)
 
-    def client(self) -> gspread.Client:
+    def client(self) -> "gspread.Client":
+        if self._gc is None and self.emulator_url:
+            print(f"Sheets: émulateur {self.emulator_url}")
+            gspread = startup.lazy_import("gspread")
+            self._gc = gspread.Client(None, session=_emulator_session(self.emulator_url))
         if self._gc is None:
-            creds = Credentials.from_service_account_file(self.creds_path, scopes=self.scopes)
+            gspread = startup.lazy_import("gspread")
+            sa = startup.lazy_import("google.oauth2.service_account")
+            creds = sa.Credentials.from_service_account_file(self.creds_path, scopes=self.scopes)
             self._gc = gspread.authorize(creds)
         return self._gc
 
@@ -179,8 +232,10 @@ class SheetsService:
         now = time.time()
         cached = self._ws_cache.get(title)
         if cached and now < cached.exp:
+            metrics.cache_hit("worksheet")
             return cached.value
 
+        metrics.cache_miss("worksheet")
         sh = self.sheet()
         w = self._retry(sh.worksheet, title)
         self._ws_cache[title] = CacheItem(exp=now + self.ws_ttl, value=w)
@@ -190,13 +245,40 @@ class SheetsService:
         now = time.time()
         cached = self._hdr_cache.get(title)
         if cached and now < cached.exp:
+            metrics.cache_hit("headers")
             return cached.value
 
+        metrics.cache_miss("headers")
         w = self.ws(title)
         hdr = [h.strip() for h in self._retry(w.row_values, 1)]
         self._hdr_cache[title] = CacheItem(exp=now + self.hdr_ttl, value=hdr)
         return hdr
 
+    def prefetch_worksheets(self) -> List[str]:
+        """
+        Tous les onglets en un seul appel (métadonnées du classeur):
+        remplit le cache worksheet, évite un appel par onglet ensuite.
+        """
+        now = time.time()
+        sh = self.sheet()
+        wss = self._retry(sh.worksheets)
+        for w in wss:
+            self._ws_cache[w.title] = CacheItem(exp=now + self.ws_ttl, value=w)
+        return [w.title for w in wss]
+
+    def prefetch_headers(self, titles: List[str]) -> None:
+        """En-têtes de plusieurs onglets en un seul values_batch_get."""
+        titles = [t for t in titles if t]
+        if not titles:
+            return
+        now = time.time()
+        sh = self.sheet()
+        ranges = [f"'{t}'!1:1" for t in titles]
+        res = self._retry(sh.values_batch_get, ranges)
+        for t, vr in zip(titles, res.get("valueRanges", [])):
+            row = (vr.get("values") or [[]])[0]
+            self._hdr_cache[t] = CacheItem(exp=now + self.hdr_ttl, value=[str(h).strip() for h in row])
+
     def append_by_headers(self, title: str, data: Dict[str, Any]):
         w = self.ws(title)
         hdr = self.headers(title)
@@ -205,6 +287,29 @@ class SheetsService:
             if k in hdr:
                 row[hdr.index(k)] = v
         self._retry(w.append_row, row, value_input_option="RAW")
+        if self.tabs:
+            self.tabs.on_append(title, row)
+
+    def append_rows_by_headers(self, title: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        rows = [{"header": value, ...}, ...] => un seul appel API.
+        """
+        if not rows:
+            return 0
+        w = self.ws(title)
+        hdr = self.headers(title)
+        values = []
+        for data in rows:
+            row = [""] * len(hdr)
+            for k, v in data.items():
+                if k in hdr:
+                    row[hdr.index(k)] = v
+            values.append(row)
+        self._retry(w.append_rows, values, value_input_option="RAW")
+        if self.tabs:
+            for row in values:
+                self.tabs.on_append(title, row)
+        return len(values)
 
     def update_cell_by_header(self, title: str, row_i: int, header: str, value: Any):
         w = self.ws(title)
@@ -213,6 +318,8 @@ class SheetsService:
             raise RuntimeError(f"Colonne `{header}` introuvable dans {title}")
         col = hdr.index(header) + 1
         self._retry(w.update_cell, row_i, col, value)
+        if self.tabs:
+            self.tabs.on_update(title, row_i, col, value)
 
     def batch_update(self, title: str, updates: List[Dict[str, Any]]):
         """
@@ -220,24 +327,89 @@ class SheetsService:
         """
         w = self.ws(title)
         self._retry(w.batch_update, updates)
+        if self.tabs:
+            self.tabs.on_batch(title, updates)
+
+    def batch_update_by_header(self, title: str, rows: Dict[int, Dict[str, Any]]):
+        """
+        rows = {row_i: {"header": value, ...}, ...} => un seul appel API.
+        """
+        hdr = self.headers(title)
+        rowcol_to_a1 = startup.lazy_import("gspread.utils").rowcol_to_a1
+        updates = []
+        for row_i, data in rows.items():
+            for k, v in data.items():
+                if k not in hdr:
+                    raise RuntimeError(f"Colonne `{k}` introuvable dans {title}")
+                a1 = rowcol_to_a1(int(row_i), hdr.index(k) + 1)
+                updates.append({"range": a1, "values": [[v]]})
+        if updates:
+            self.batch_update(title, updates)
+        return len(updates)
 
     def get_all_records(self, title: str) -> List[Dict[str, Any]]:
+        if self.tabs and self.tabs.is_tracked(title):
+            # copies: l'appelant peut modifier ses dicts sans toucher au cache
+            return [dict(r) for r in self.tabs.records(title)]
         w = self.ws(title)
         return self._retry(w.get_all_records)
 
+    def read_records(self, title: str) -> Sequence[Mapping[str, Any]]:
+        """
+        Comme get_all_records, en lecture seule: onglet suivi => lignes du
+        cache partagées, sans copie (parcours de LOG, index VIP...).
+        """
+        if self.tabs and self.tabs.is_tracked(title):
+            return self.tabs.records(title)
+        return self.get_all_records(title)
+
     def get_all_values(self, title: str) -> List[List[str]]:
+        if self.tabs and self.tabs.is_tracked(title):
+            return self.tabs.values(title)
         w = self.ws(title)
         return self._retry(w.get_all_values)
 
+    def records_where(self, title: str, col: str, value: Any, key=None) -> List[Dict[str, Any]]:
+        """
+        Lignes où key(r[col]) == value (key: normalisation optionnelle).
+        Onglet suivi: index en mémoire; sinon parcours de get_all_records.
+        """
+        if self.tabs and self.tabs.is_tracked(title):
+            return self.tabs.records_where(title, col, value, key)
+        out = []
+        for r in self.read_records(title):
+            v = r.get(col, "")
+            if (key(v) if key else v) == value:
+                out.append(r)
+        return out
+
     def delete_row(self, title: str, row_i: int):
         w = self.ws(title)
         self._retry(w.delete_rows, row_i)
+        if self.tabs:
+            self.tabs.on_delete(title, row_i)
 
 
 # ----------------------------
 # S3 service
 # ----------------------------
+def _client_error():
+    # évalué seulement quand une exception remonte: botocore est alors chargé
+    return startup.lazy_import("botocore.exceptions").ClientError
+
 class S3Service:
+    """
+    - un seul client boto3 (pool de connexions keep-alive, retries botocore)
+    - wrappers async (a*) exécutés dans un pool de threads dédié
+    - multipart au-delà de S3_MULTIPART_MB
+
+    - cache d'existence des objets (rempli par HEAD / upload) et des URLs
+      signées (réutilisées jusqu'à S3_PRESIGN_MARGIN s avant expiration)
+
+    Config: S3_MAX_POOL=16, S3_MAX_ATTEMPTS=4, S3_CONNECT_TIMEOUT=5,
+    S3_READ_TIMEOUT=20, S3_MULTIPART_MB=8, S3_EXISTS_TTL=900,
+    S3_MISSING_TTL=30, S3_PRESIGN_MARGIN=300
+    """
     def __init__(self):
         self.bucket = (os.getenv("AWS_S3_BUCKET_NAME") or "").strip()
         self.endpoint = (os.getenv("AWS_ENDPOINT_URL") or "").strip()
@@ -245,60 +417,386 @@ class S3Service:
         self.key = (os.getenv("AWS_ACCESS_KEY_ID") or "").strip()
         self.secret = (os.getenv("AWS_SECRET_ACCESS_KEY") or "").strip()
 
+        self.max_pool = int(os.getenv("S3_MAX_POOL", "16"))
+        self.max_attempts = int(os.getenv("S3_MAX_ATTEMPTS", "4"))
+        self.connect_timeout = float(os.getenv("S3_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(os.getenv("S3_READ_TIMEOUT", "20"))
+        self.multipart_threshold = int(float(os.getenv("S3_MULTIPART_MB", "8")) * 1024 * 1024)
+
+        self.exists_ttl = float(os.getenv("S3_EXISTS_TTL", "900"))
+        self.missing_ttl = float(os.getenv("S3_MISSING_TTL", "30"))
+        self.presign_margin = float(os.getenv("S3_PRESIGN_MARGIN", "300"))
+        self._exists_cache: Dict[str, CacheItem] = {}
+        self._presign_cache: Dict[str, CacheItem] = {}
+
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
     def enabled(self) -> bool:
         return bool(self.bucket and self.endpoint)
 
     def client(self):
-        return boto3.client(
-            "s3",
-            endpoint_url=self.endpoint if self.endpoint else None,
-            aws_access_key_id=self.key or None,
-            aws_secret_access_key=self.secret or None,
-            region_name=self.region or "auto",
-            config=Config(signature_version="s3v4"),
-        )
+        # boto3: un client est thread-safe, on le garde (TLS + pool réutilisés)
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    boto3 = startup.lazy_import("boto3")
+                    Config = startup.lazy_import("botocore.client").Config
+                    self._client = boto3.client(
+                        "s3",
+                        endpoint_url=self.endpoint if self.endpoint else None,
+                        aws_access_key_id=self.key or None,
+                        aws_secret_access_key=self.secret or None,
+                        region_name=self.region or "auto",
+                        config=Config(
+                            signature_version="s3v4",
+                            max_pool_connections=self.max_pool,
+                            tcp_keepalive=True,
+                            connect_timeout=self.connect_timeout,
+                            read_timeout=self.read_timeout,
+                            retries={"max_attempts": self.max_attempts, "mode": "standard"},
+                        ),
+                    )
+        return self._client
+
+    def _remember_exists(self, key: str, exists: bool) -> None:
+        ttl = self.exists_ttl if exists else self.missing_ttl
+        self._exists_cache[key] = CacheItem(exp=time.time() + ttl, value=exists)
+
+    def invalidate(self, key: str) -> None:
+        """Objet réécrit / supprimé: on oublie existence et URL signée."""
+        self._exists_cache.pop(key, None)
+        self._presign_cache.pop(key, None)
 
     def object_exists(self, key: str) -> bool:
+        cached = self._exists_cache.get(key)
+        if cached and time.time() < cached.exp:
+            metrics.cache_hit("s3:exists")
+            return cached.value
+        metrics.cache_miss("s3:exists")
+        return self.head_metadata(key) is not None
+
+    def head_metadata(self, key: str) -> Optional[Dict[str, str]]:
+        """Métadonnées x-amz-meta-* de l'objet, None s'il n'existe pas."""
         if not self.bucket:
-            return False
+            return None
         try:
-            self.client().head_object(Bucket=self.bucket, Key=key)
-            return True
-        except ClientError:
-            return False
+            with metrics.S3_LATENCY.time(op="head_object"):
+                r = self.client().head_object(Bucket=self.bucket, Key=key)
+        except _client_error():
+            self._remember_exists(key, False)
+            return None
+        self._remember_exists(key, True)
+        return dict(r.get("Metadata") or {})
+
+    def public_url(self, object_key: str) -> str:
+        base = (self.endpoint or "").rstrip("/")
+        return f"{base}/{self.bucket}/{object_key}"
+
+    def upload_png(self, png_bytes: bytes, object_key: str, metadata: Optional[Dict[str, str]] = None) -> str:
+        return self.upload_bytes(png_bytes, object_key, "image/png", metadata)
 
-    def upload_png(self, png_bytes: bytes, object_key: str) -> str:
+    def _put(self, data: bytes, object_key: str, extra: Dict[str, Any]) -> None:
+        s3 = self.client()
+        if len(data) >= self.multipart_threshold:
+            cfg = startup.lazy_import("boto3.s3.transfer").TransferConfig(multipart_threshold=self.multipart_threshold, max_concurrency=4)
+            s3.upload_fileobj(io.BytesIO(data), self.bucket, object_key, ExtraArgs=extra, Config=cfg)
+        else:
+            s3.put_object(Bucket=self.bucket, Key=object_key, Body=data, **extra)
+
+    def upload_bytes(
+        self, data: bytes, object_key: str, content_type: str,
+        metadata: Optional[Dict[str, str]] = None, cache_control: str = "",
+    ) -> str:
         if not self.bucket:
             raise RuntimeError("AWS_S3_BUCKET_NAME manquant")
-        s3 = self.client()
-        extra = {"ContentType": "image/png"}
+        extra: Dict[str, Any] = {"ContentType": content_type}
+        if metadata:
+            extra["Metadata"] = dict(metadata)
+        if cache_control:
+            extra["CacheControl"] = cache_control
         extra_try_acl = dict(extra)
         extra_try_acl["ACL"] = "public-read"
 
-        try:
-            s3.put_object(Bucket=self.bucket, Key=object_key, Body=png_bytes, **extra_try_acl)
-        except ClientError:
-            s3.put_object(Bucket=self.bucket, Key=object_key, Body=png_bytes, **extra)
+        op = "upload_multipart" if len(data) >= self.multipart_threshold else "upload"
+        with metrics.S3_LATENCY.time(op=op):
+            try:
+                self._put(data, object_key, extra_try_acl)
+            except _client_error():
+                self._put(data, object_key, extra)
 
-        base = (self.endpoint or "").rstrip("/")
-        return f"{base}/{self.bucket}/{object_key}"
+        # contenu neuf: une ancienne URL signée resterait en cache côté Discord
+        self.invalidate(object_key)
+        self._remember_exists(object_key, True)
+        return self.public_url(object_key)
 
     def signed_url(self, object_key: str, expires_seconds: int = 3600) -> Optional[str]:
         if not object_key or not self.bucket:
             return None
+        now = time.time()
+        cached = self._presign_cache.get(object_key)
+        if cached and now < cached.exp:
+            metrics.cache_hit("s3:presign")
+            return cached.value
+        metrics.cache_miss("s3:presign")
         if not self.object_exists(object_key):
             return None
-        s3 = self.client()
-        return s3.generate_presigned_url(
+        url = self.client().generate_presigned_url(
             ClientMethod="get_object",
             Params={"Bucket": self.bucket, "Key": object_key},
             ExpiresIn=int(expires_seconds),
         )
+        # réutilisable tant qu'il reste au moins `presign_margin` secondes
+        reuse_for = int(expires_seconds) - self.presign_margin
+        if reuse_for > 0:
+            self._presign_cache[object_key] = CacheItem(exp=now + reuse_for, value=url)
+        return url
+
+    def cached_signed_url(self, object_key: str) -> Optional[str]:
+        """URL signée encore valable en cache, sans aucun appel S3."""
+        cached = self._presign_cache.get(object_key)
+        if cached and time.time() < cached.exp:
+            return cached.value
+        return None
+
+    # ----------------------------
+    # Async (pool de threads dédié, la boucle reste libre)
+    # ----------------------------
+    def _run(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_pool, thread_name_prefix="s3")
+        return asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def ahead_metadata(self, key: str) -> Optional[Dict[str, str]]:
+        return await self._run(self.head_metadata, key)
+
+    async def aobject_exists(self, key: str) -> bool:
+        return await self._run(self.object_exists, key)
+
+    async def aupload_bytes(self, data: bytes, object_key: str, content_type: str, metadata: Optional[Dict[str, str]] = None) -> str:
+        return await self._run(self.upload_bytes, data, object_key, content_type, metadata)
+
+    async def asigned_url(self, object_key: str, expires_seconds: int = 3600) -> Optional[str]:
+        # hit cache: pas de détour par le pool de threads
+        hit = self.cached_signed_url(object_key)
+        if hit:
+            metrics.cache_hit("s3:presign")
+            return hit
+        return await self._run(self.signed_url, object_key, expires_seconds)
 
 
 # ----------------------------
 # VIP card image
 # ----------------------------
+@dataclass(frozen=True)
+class CardEncoding:
+    """
+    Encodage des cartes (env):
+    - VIP_CARD_FORMAT=png | png8 (palette 256 couleurs) | webp | jpeg
+    - VIP_CARD_QUALITY=85        (webp / jpeg)
+    - VIP_CARD_PNG_LEVEL=6       (zlib 0-9, png / png8)
+    - VIP_CARD_PNG_OPTIMIZE=0    (passe d'optimisation Pillow, plus lent)
+    - VIP_CARD_PREVIEW_WIDTH=0   (ex: 525 => aperçu réduit pour /vip card_show)
+    """
+    fmt: str = "png"
+    quality: int = 85
+    png_level: int = 6
+    png_optimize: bool = False
+    preview_width: int = 0
+
+    @property
+    def ext(self) -> str:
+        return {"png8": "png", "jpeg": "jpg"}.get(self.fmt, self.fmt)
+
+    @property
+    def content_type(self) -> str:
+        return {"png": "image/png", "webp": "image/webp", "jpg": "image/jpeg"}[self.ext]
+
+    def tag(self) -> str:
+        """Identifiant stable de l'encodage (entre dans la clé de rendu)."""
+        if self.fmt in ("png", "png8"):
+            main = f"{self.fmt}:{self.png_level}:{int(self.png_optimize)}"
+        else:
+            main = f"{self.fmt}:{self.quality}"
+        return f"{main}|preview:{self.preview_width}"
+
+    def encode(self, img) -> bytes:
+        Image = startup.lazy_import("PIL.Image")
+        out = io.BytesIO()
+        if self.fmt == "png8":
+            img.quantize(256, method=Image.Quantize.FASTOCTREE).save(
+                out, format="PNG", compress_level=self.png_level, optimize=self.png_optimize)
+        elif self.fmt == "webp":
+            img.save(out, format="WEBP", quality=self.quality, method=4)
+        elif self.fmt == "jpeg":
+            # pas d'alpha en JPEG: fond noir sous les zones translucides
+            bg = Image.new("RGB", img.size, (0, 0, 0))
+            bg.paste(img, mask=img.getchannel("A"))
+            bg.save(out, format="JPEG", quality=self.quality, optimize=True)
+        elif self.png_level == 6 and not self.png_optimize:
+            img.save(out, format="PNG")
+        else:
+            img.save(out, format="PNG", compress_level=self.png_level, optimize=self.png_optimize)
+        return out.getvalue()
+
+    def preview(self, img) -> Optional[bytes]:
+        w, h = img.size
+        if self.preview_width <= 0 or self.preview_width >= w:
+            return None
+        Image = startup.lazy_import("PIL.Image")
+        small = img.resize((self.preview_width, max(1, round(h * self.preview_width / w))), Image.LANCZOS)
+        return self.encode(small)
+
+
+def card_encoding_from_env() -> CardEncoding:
+    fmt = (os.getenv("VIP_CARD_FORMAT") or "png").strip().lower()
+    fmt = {"jpg": "jpeg"}.get(fmt, fmt)
+    if fmt not in ("png", "png8", "webp", "jpeg"):
+        print(f"VIP_CARD_FORMAT inconnu ({fmt}), PNG utilisé.")
+        fmt = "png"
+    return CardEncoding(
+        fmt=fmt,
+        quality=max(1, min(100, int(os.getenv("VIP_CARD_QUALITY", "85")))),
+        png_level=max(0, min(9, int(os.getenv("VIP_CARD_PNG_LEVEL", "6")))),
+        png_optimize=(os.getenv("VIP_CARD_PNG_OPTIMIZE", "0").strip() == "1"),
+        preview_width=max(0, int(os.getenv("VIP_CARD_PREVIEW_WIDTH", "0"))),
+    )
+
+
+class CardRenderer:
+    """
+    Rendu des cartes VIP avec les assets chargés une seule fois:
+    - template décodé en RGBA, titre "VIP WINTER EDITION" déjà dessiné dessus
+    - polices PaybAck pré-chargées par taille
+    Chaque rendu part d'une copie de la base: seul le texte du VIP est dessiné.
+    """
+    WHITE  = (245, 245, 245, 255)
+    RED    = (220, 30, 30, 255)
+    SHADOW = (0, 0, 0, 160)
+
+    TITLE_SIZE = 56
+    NAME_SIZE = 56
+    LINE_SIZE = 38
+    ID_SIZE = 46
+
+    def __init__(self, template_path: str, font_path: str):
+        self.template_path = template_path
+        self.font_path = font_path
+        self._fonts: Dict[int, Any] = {}
+
+        img = startup.lazy_import("PIL.Image").open(template_path).convert("RGBA")
+        self._draw_title(img)
+        self.base = img
+        self.size = img.size
+
+    def font(self, size: int):
+        f = self._fonts.get(size)
+        if f is None:
+            f = startup.lazy_import("PIL.ImageFont").truetype(self.font_path, size)
+            self._fonts[size] = f
+        return f
+
+    def _shadow_text(self, draw, x, y, text, font, fill):
+        draw.text((x+2, y+2), text, font=font, fill=self.SHADOW)
+        draw.text((x, y), text, font=font, fill=fill)
+
+    def _draw_title(self, img) -> None:
+        draw = startup.lazy_import("PIL.ImageDraw").Draw(img)
+        title_font = self.font(self.TITLE_SIZE)
+        w, _ = img.size
+        vip_txt = "VIP"
+        winter_txt = " WINTER EDITION"
+        vip_w = draw.textlength(vip_txt, font=title_font)
+        winter_w = draw.textlength(winter_txt, font=title_font)
+        x0 = int((w - (vip_w + winter_w)) / 2)
+        y0 = 35
+        self._shadow_text(draw, x0, y0, vip_txt, title_font, self.RED)
+        self._shadow_text(draw, x0 + vip_w, y0, winter_txt, title_font, self.WHITE)
+
+    def render(self, code_vip: str, full_name: str, dob: str, phone: str, bleeter: str):
+        img = self.base.copy()
+        draw = startup.lazy_import("PIL.ImageDraw").Draw(img)
+        font_name = self.font(self.NAME_SIZE)
+        font_line = self.font(self.LINE_SIZE)
+        font_id = self.font(self.ID_SIZE)
+        white, red = self.WHITE, self.RED
+
+        full_name = display_name(full_name).upper()
+        dob = (dob or "").strip()
+        phone = (phone or "").strip()
+        bleeter = (bleeter or "").strip()
+        if bleeter and not bleeter.startswith("@"):
+            bleeter = "@" + bleeter
+
+        x = 70
+        y = 140
+        gap = 70
+
+        self._shadow_text(draw, x, y, full_name, font_name, white)
+        self._shadow_text(draw, x, y + gap*1, f"DN : {dob}", font_line, white)
+        self._shadow_text(draw, x, y + gap*2, f"TELEPHONE : {phone}", font_line, white)
+        self._shadow_text(draw, x, y + gap*3, f"BLEETER : {bleeter if bleeter else 'NON RENSEIGNE'}", font_line, white)
+
+        w, h = self.size
+        card_text = f"CARD ID : {code_vip}"
+        tw = draw.textlength(card_text, font=font_id)
+        self._shadow_text(draw, int((w - tw)/2), h - 95, card_text, font_id, red)
+        return img
+
+    def render_png(self, code_vip: str, full_name: str, dob: str, phone: str, bleeter: str) -> bytes:
+        img = self.render(code_vip, full_name, dob, phone, bleeter)
+        out = io.BytesIO()
+        img.save(out, format="PNG")
+        return out.getvalue()
+
+    def render_encoded(
+        self, enc: CardEncoding, code_vip: str, full_name: str, dob: str, phone: str, bleeter: str,
+    ) -> Tuple[bytes, Optional[bytes]]:
+        """(carte, aperçu ou None) dans l'encodage demandé."""
+        img = self.render(code_vip, full_name, dob, phone, bleeter)
+        return enc.encode(img), enc.preview(img)
+
+
+# à incrémenter quand le dessin (positions, couleurs, textes) change
+CARD_LAYOUT_REV = "1"
+
+_CARD_VERSIONS: Dict[Tuple[str, str], Tuple[Tuple[float, float], str]] = {}
+
+def card_assets_version(template_path: str, font_path: str) -> str:
+    """Hash (template + police + CARD_LAYOUT_REV), recalculé si un fichier change."""
+    key = (template_path, font_path)
+    stamp = (_mtime(template_path), _mtime(font_path))
+    hit = _CARD_VERSIONS.get(key)
+    if hit and hit[0] == stamp:
+        return hit[1]
+    h = hashlib.sha256(CARD_LAYOUT_REV.encode())
+    for p in (template_path, font_path):
+        with open(p, "rb") as f:
+            h.update(f.read())
+    v = h.hexdigest()[:16]
+    _CARD_VERSIONS[key] = (stamp, v)
+    return v
+
+_CARD_RENDERERS: Dict[Tuple[str, str], Tuple[Tuple[float, float], CardRenderer]] = {}
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+def get_card_renderer(template_path: str, font_path: str) -> CardRenderer:
+    """Renderer mis en cache par (template, police); rechargé si un fichier change sur disque."""
+    key = (template_path, font_path)
+    stamp = (_mtime(template_path), _mtime(font_path))
+    hit = _CARD_RENDERERS.get(key)
+    if hit and hit[0] == stamp:
+        return hit[1]
+    r = CardRenderer(template_path, font_path)
+    _CARD_RENDERERS[key] = (stamp, r)
+    return r
+
 def generate_vip_card_image(
     template_path: str,
     font_path: str,
@@ -308,53 +806,4 @@ def generate_vip_card_image(
     phone: str,
     bleeter: str,
 ) -> bytes:
-    img = Image.open(template_path).convert("RGBA")
-    draw = ImageDraw.Draw(img)
-
-    title_font = ImageFont.truetype(font_path, 56)
-    font_name  = ImageFont.truetype(font_path, 56)
-    font_line  = ImageFont.truetype(font_path, 38)
-    font_id    = ImageFont.truetype(font_path, 46)
-
-    white  = (245, 245, 245, 255)
-    red    = (220, 30, 30, 255)
-    shadow = (0, 0, 0, 160)
-
-    def shadow_text(x, y, text, font, fill):
-        draw.text((x+2, y+2), text, font=font, fill=shadow)
-        draw.text((x, y), text, font=font, fill=fill)
-
-    w, h = img.size
-    vip_txt = "VIP"
-    winter_txt = " WINTER EDITION"
-    vip_w = draw.textlength(vip_txt, font=title_font)
-    winter_w = draw.textlength(winter_txt, font=title_font)
-    total_w = vip_w + winter_w
-    x0 = int((w - total_w) / 2)
-    y0 = 35
-    shadow_text(x0, y0, vip_txt, title_font, red)
-    shadow_text(x0 + vip_w, y0, winter_txt, title_font, white)
-
-    full_name = display_name(full_name).upper()
-    dob = (dob or "").strip()
-    phone = (phone or "").strip()
-    bleeter = (bleeter or "").strip()
-    if bleeter and not bleeter.startswith("@"):
-        bleeter = "@" + bleeter
-
-    x = 70
-    y = 140
-    gap = 70
-
-    shadow_text(x, y, full_name, font_name, white)
-    shadow_text(x, y + gap*1, f"DN : {dob}", font_line, white)
-    shadow_text(x, y + gap*2, f"TELEPHONE : {phone}", font_line, white)
-    shadow_text(x, y + gap*3, f"BLEETER : {bleeter if bleeter else 'NON RENSEIGNE'}", font_line, white)
-
-    card_text = f"CARD ID : {code_vip}"
-    tw = draw.textlength(card_text, font=font_id)
-    shadow_text(int((w - tw)/2), h - 95, card_text, font_id, red)
-
-    out = io.BytesIO()
-    img.save(out, format="PNG")
-    return out.getvalue()
+    return get_card_renderer(template_path, font_path).render_png(code_vip, full_name, dob, phone, bleeter)
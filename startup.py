@@ -0,0 +1,85 @@
+# startup.py
+# -*- coding: utf-8 -*-
+"""
+Chronométrage du démarrage (cold start des conteneurs).
+
+- importé en premier par bot.py: T0 = début des imports
+- mark(étape): secondes depuis T0 (1re occurrence seulement)
+- lazy_import(module): import différé (gspread, boto3, Pillow...) chronométré
+- report(): résumé imprimé une fois prêt; étapes exportées dans /metrics
+  (mikasa_startup_seconds{phase=...})
+
+Config:
+- STARTUP_BUDGET_S=0   (> 0: avertit si le bot est prêt après ce délai)
+"""
+from __future__ import annotations
+
+import importlib
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import metrics
+
+T0 = time.perf_counter()
+BUDGET_S = float(os.getenv("STARTUP_BUDGET_S", "0") or 0)
+
+_LOCK = threading.Lock()
+_MARKS: List[Tuple[str, float]] = []
+_SEEN: set = set()
+_IMPORTS: Dict[str, float] = {}
+_REPORTED = False
+
+
+def elapsed() -> float:
+    return time.perf_counter() - T0
+
+def mark(phase: str) -> float:
+    t = elapsed()
+    with _LOCK:
+        if phase in _SEEN:
+            return t
+        _SEEN.add(phase)
+        _MARKS.append((phase, t))
+    metrics.STARTUP_PHASE.set(t, phase=phase)
+    return t
+
+def lazy_import(name: str):
+    """importlib.import_module, avec la durée du premier import."""
+    mod = sys.modules.get(name)
+    if mod is not None:
+        return mod
+    t0 = time.perf_counter()
+    mod = importlib.import_module(name)
+    with _LOCK:
+        _IMPORTS.setdefault(name, time.perf_counter() - t0)
+    return mod
+
+def marks() -> List[Tuple[str, float]]:
+    with _LOCK:
+        return list(_MARKS)
+
+def report(final: str = "ready") -> str:
+    """Résumé des étapes (delta + cumul) et des imports différés déjà faits."""
+    prev = 0.0
+    lines = ["⏱️ Démarrage:"]
+    for phase, t in marks():
+        lines.append(f"  {phase:<24} +{t - prev:6.2f}s  ({t:6.2f}s)")
+        prev = t
+    with _LOCK:
+        lazy = sorted(_IMPORTS.items(), key=lambda x: -x[1])
+    if lazy:
+        lines.append("  imports différés: " + ", ".join(f"{n} {d * 1000:.0f}ms" for n, d in lazy))
+    done = dict(marks()).get(final)
+    if BUDGET_S > 0 and done is not None and done > BUDGET_S:
+        lines.append(f"  ⚠️ budget dépassé: {final} à {done:.2f}s > {BUDGET_S:.2f}s")
+    return "\n".join(lines)
+
+def print_report_once(final: str = "ready") -> None:
+    global _REPORTED
+    if _REPORTED:
+        return
+    _REPORTED = True
+    print(report(final))
@@ -0,0 +1,475 @@
+# tabcache.py
+# -*- coding: utf-8 -*-
+"""
+Copies en mémoire des gros onglets (VIP, LOG, QCM_LOG, HUNT_PLAYERS,
+HUNT_ITEMS) + snapshot disque pour redémarrer à chaud.
+
+Lecture (SheetsService.get_all_records / get_all_values sur un onglet suivi):
+- onglets "journal" (LOG, QCM_LOG: on ne fait qu'y ajouter des lignes):
+  rafraîchis par la fin (tail) toutes les TAB_TAIL_TTL s: une seule petite
+  requête qui relit la dernière ligne connue (contrôle) + les nouvelles
+- autres onglets: relus en entier toutes les TAB_CACHE_TTL s
+- les écritures du bot (append / update_cell / batch_update / delete_row)
+  sont appliquées à la copie au moment où elles partent vers Sheets
+
+Index: records_where(titre, colonne, valeur) sur une copie en mémoire
+(ex: LOG par code_vip, QCM_LOG par week_key) sans reparcourir l'onglet.
+
+Snapshot (TAB_SNAPSHOT_PATH, défaut .cache/tabs.snap):
+    b"MKTABS\\n" | u32 taille de l'en-tête | en-tête JSON | blocs JSON par onglet
+L'en-tête (version, sheet_id, offset/longueur de chaque bloc) est lu seul;
+les blocs sont décodés à la demande depuis un mmap. Au démarrage:
+- journaux: snapshot + tail => à jour en une requête chacun
+- autres: servis depuis le snapshot aux caches qui tolèrent un retard
+  (autocomplete...), relus en entier avant toute lecture "officielle"
+
+Config:
+- TAB_CACHE_TABS=VIP,LOG,QCM_LOG,HUNT_PLAYERS,HUNT_ITEMS  (vide => désactivé)
+- TAB_CACHE_TTL=15   TAB_TAIL_TTL=5
+- TAB_SNAPSHOT_PATH=.cache/tabs.snap   TAB_SNAPSHOT_EVERY=300
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import metrics
+import startup
+
+DEFAULT_TABS = "VIP,LOG,QCM_LOG,HUNT_PLAYERS,HUNT_ITEMS"
+APPEND_ONLY = {"LOG", "QCM_LOG"}
+
+TABS = [t.strip() for t in os.getenv("TAB_CACHE_TABS", DEFAULT_TABS).split(",") if t.strip()]
+TTL = float(os.getenv("TAB_CACHE_TTL", "15"))
+TAIL_TTL = float(os.getenv("TAB_TAIL_TTL", "5"))
+SNAPSHOT_PATH = os.getenv("TAB_SNAPSHOT_PATH", os.path.join(".cache", "tabs.snap")).strip()
+SNAPSHOT_EVERY = float(os.getenv("TAB_SNAPSHOT_EVERY", "300"))
+
+SNAPSHOT_MAGIC = b"MKTABS\n"
+SNAPSHOT_VERSION = 1
+
+
+def cell(v: Any) -> str:
+    """Valeur écrite -> texte tel que relu depuis Sheets (RAW)."""
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    return str(v)
+
+def _col_letter(n: int) -> str:
+    s = ""
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s or "A"
+
+
+class Tab:
+    """Valeurs d'un onglet (ligne 1 = en-têtes), + records / index mémoïsés."""
+
+    def __init__(self, title: str, values: List[List[str]], *, source: str, synced_at: float):
+        self.title = title
+        self.values = values
+        self.width = len(values[0]) if values else 0
+        for r in values:
+            self._pad(r)
+        self.confirmed = len(values)    # lignes lues depuis Sheets (le reste: écrit par nous)
+        self.synced_at = synced_at
+        self.source = source            # "sheets" | "snapshot"
+        self.version = 0
+        self._records: Optional[List[Dict[str, Any]]] = None
+        self._views: Optional[Tuple[int, Tuple[Mapping[str, Any], ...]]] = None   # (version, lignes en lecture seule)
+        self._indexes: Dict[Tuple[str, Any], Dict[Any, List[int]]] = {}
+
+    @property
+    def live(self) -> bool:
+        """Relu depuis Sheets dans ce process (sinon: données du snapshot)."""
+        return self.source == "sheets"
+
+    def _pad(self, row: List[str]) -> List[str]:
+        if len(row) < self.width:
+            row.extend([""] * (self.width - len(row)))
+        return row
+
+    def _record(self, row: List[str]) -> Dict[str, Any]:
+        utils = startup.lazy_import("gspread.utils")
+        return utils.to_records(self.values[0], [utils.numericise_all(row[:self.width])])[0]
+
+    def records(self) -> List[Dict[str, Any]]:
+        if self._records is None:
+            if not self.values:
+                self._records = []
+            else:
+                utils = startup.lazy_import("gspread.utils")
+                w = self.width
+                self._records = utils.to_records(self.values[0], [utils.numericise_all(r[:w]) for r in self.values[1:]])
+        return self._records
+
+    def views(self) -> Tuple[Mapping[str, Any], ...]:
+        """records() partagés en lecture seule (même tuple tant que l'onglet ne change pas)."""
+        if self._views is None or self._views[0] != self.version or self._records is None:
+            self._views = (self.version, tuple(MappingProxyType(r) for r in self.records()))
+        return self._views[1]
+
+    def index(self, col: str, key: Optional[Callable[[Any], Any]] = None) -> Dict[Any, List[int]]:
+        """{valeur (ou key(valeur)): [positions dans records()]}"""
+        k = (col, key)
+        idx = self._indexes.get(k)
+        if idx is None:
+            idx = {}
+            for i, r in enumerate(self.records()):
+                v = r.get(col, "")
+                idx.setdefault(key(v) if key else v, []).append(i)
+            self._indexes[k] = idx
+        return idx
+
+    # ---- modifications (écritures du bot) ----
+    def _changed(self) -> None:
+        self.version += 1
+        self._records = None
+        self._indexes = {}
+
+    def append(self, row: List[Any]) -> None:
+        r = self._pad([cell(v) for v in row])
+        self.values.append(r)
+        self.version += 1
+        # ajout en fin: records / index prolongés sans tout recalculer
+        if self._records is not None:
+            rec = self._record(r)
+            pos = len(self._records)
+            self._records.append(rec)
+            for (col, key), idx in self._indexes.items():
+                v = rec.get(col, "")
+                idx.setdefault(key(v) if key else v, []).append(pos)
+
+    def set_cell(self, row_i: int, col: int, value: Any) -> None:
+        while len(self.values) < row_i:
+            self.values.append(self._pad([]))
+        r = self.values[row_i - 1]
+        if len(r) < col:
+            r.extend([""] * (col - len(r)))
+        r[col - 1] = cell(value)
+        if row_i >= 2 and col <= self.width and self._records is not None and row_i - 2 < len(self._records):
+            # une cellule de données: record mis à jour en place, seuls les index de la colonne tombent
+            name = self.values[0][col - 1]
+            self._records[row_i - 2][name] = startup.lazy_import("gspread.utils").numericise(r[col - 1])
+            self._indexes = {k: v for k, v in self._indexes.items() if k[0] != name}
+            self.version += 1
+        else:
+            if row_i == 1:
+                self.width = max(self.width, col)
+            self._changed()
+
+    def delete_row(self, row_i: int) -> None:
+        if 1 <= row_i <= len(self.values):
+            del self.values[row_i - 1]
+            if row_i <= self.confirmed:
+                self.confirmed -= 1
+            self._changed()
+
+
+class TabStore:
+    def __init__(self, service, tabs: Optional[List[str]] = None, *, ttl: float = TTL, tail_ttl: float = TAIL_TTL):
+        self.s = service
+        self.tracked = set(TABS if tabs is None else tabs)
+        self.ttl = ttl
+        self.tail_ttl = tail_ttl
+        self._tabs: Dict[str, Tab] = {}
+        self._locks: Dict[str, threading.RLock] = {t: threading.RLock() for t in self.tracked}
+        # blocs du snapshot pas encore décodés: titre -> (mmap, offset, longueur, méta)
+        self._pending: Dict[str, Tuple[Any, int, int, Dict[str, Any]]] = {}
+        self._saved_versions: Dict[str, Tuple[int, int]] = {}
+
+    def is_tracked(self, title: str) -> bool:
+        return title in self.tracked
+
+    # ----------------------------
+    # chargement / rafraîchissement
+    # ----------------------------
+    def _full(self, title: str) -> Tab:
+        w = self.s.ws(title)
+        values = self.s._retry(w.get_all_values)
+        metrics.cache_miss(f"tabcache:{title}")
+        return Tab(title, [list(map(str, r)) for r in values], source="sheets", synced_at=time.time())
+
+    def _tail(self, tab: Tab) -> Tab:
+        """Nouvelles lignes depuis la dernière ligne confirmée (relue pour contrôle)."""
+        start = max(1, tab.confirmed)
+        w = self.s.ws(tab.title)
+        got = self.s._retry(w.get_values, f"A{start}:{_col_letter(max(1, tab.width))}")
+        got = [tab._pad([str(c) for c in r]) for r in (got or [])]
+        known = tab.values[start - 1] if tab.values else None
+        if not got or known is None or got[0] != known:
+            # ligne de contrôle différente: lignes supprimées / éditées => relecture complète
+            print(f"Tab cache: {tab.title} modifié hors journal, relecture complète.")
+            return self._full(tab.title)
+        new = got[1:]
+        # nos ajouts non confirmés sont remplacés par ce que Sheets a vraiment enregistré
+        tab.values = tab.values[:start] + new
+        tab.confirmed = len(tab.values)
+        tab.synced_at = time.time()
+        tab.source = "sheets"
+        tab._changed()
+        metrics.cache_hit(f"tabcache:{tab.title}")
+        return tab
+
+    def _decode_pending(self, title: str) -> Optional[Tab]:
+        p = self._pending.pop(title, None)
+        if p is None:
+            return None
+        mm, off, length, meta = p
+        try:
+            values = json.loads(bytes(mm[off:off + length]).decode("utf-8"))
+        except Exception as e:
+            print(f"Tab cache: bloc {title} du snapshot illisible:", e)
+            return None
+        finally:
+            self._release(mm)
+        tab = Tab(title, values, source="snapshot", synced_at=float(meta.get("synced_at", 0)))
+        tab.confirmed = min(int(meta.get("confirmed", len(values))), len(values))
+        self._tabs[title] = tab
+        return tab
+
+    def _release(self, mm) -> None:
+        """Ferme le mmap du snapshot quand plus aucun bloc en attente ne l'utilise."""
+        if not any(p[0] is mm for p in list(self._pending.values())):
+            mm.close()
+
+    def _get(self, title: str, *, allow_stale: bool = False) -> Tab:
+        with self._locks[title]:
+            tab = self._tabs.get(title) or self._decode_pending(title)
+            now = time.time()
+            if tab is not None and allow_stale:
+                metrics.cache_hit(f"tabcache:{title}")
+                return tab
+            if tab is None:
+                tab = self._full(title)
+            elif title in APPEND_ONLY:
+                if not tab.live or (now - tab.synced_at) > self.tail_ttl:
+                    tab = self._tail(tab)
+                else:
+                    metrics.cache_hit(f"tabcache:{title}")
+            elif not tab.live or (now - tab.synced_at) > self.ttl:
+                tab = self._full(title)
+            else:
+                metrics.cache_hit(f"tabcache:{title}")
+            self._tabs[title] = tab
+            return tab
+
+    def refresh(self, title: str) -> Tab:
+        """Mise à jour immédiate (tail pour un journal, sinon relecture complète)."""
+        with self._locks[title]:
+            tab = self._tabs.get(title) or self._decode_pending(title)
+            if tab is not None and title in APPEND_ONLY:
+                tab = self._tail(tab)
+            else:
+                tab = self._full(title)
+            self._tabs[title] = tab
+            return tab
+
+    def invalidate(self, title: str = "") -> None:
+        for t in ([title] if title else list(self.tracked)):
+            if t in self._locks:
+                with self._locks[t]:
+                    self._tabs.pop(t, None)
+                    p = self._pending.pop(t, None)
+                    if p is not None:
+                        self._release(p[0])
+
+    # ----------------------------
+    # lectures
+    # ----------------------------
+    def values(self, title: str) -> List[List[str]]:
+        tab = self._get(title)
+        with self._locks[title]:
+            return [list(r) for r in tab.values]
+
+    def records(self, title: str, *, allow_stale: bool = False) -> Tuple[Mapping[str, Any], ...]:
+        """Lignes partagées, en lecture seule (pas de copie: LOG peut faire 100k lignes)."""
+        tab = self._get(title, allow_stale=allow_stale)
+        with self._locks[title]:
+            return tab.views()
+
+    def records_where(self, title: str, col: str, value: Any, key: Optional[Callable[[Any], Any]] = None) -> List[Dict[str, Any]]:
+        tab = self._get(title)
+        with self._locks[title]:
+            recs = tab.records()
+            return [dict(recs[i]) for i in tab.index(col, key).get(value, ())]
+
+    # ----------------------------
+    # écritures (appelées par SheetsService après succès)
+    # ----------------------------
+    def _loaded(self, title: str) -> Optional[Tab]:
+        if title not in self.tracked:
+            return None
+        tab = self._tabs.get(title)
+        if tab is None and title in self._pending:
+            tab = self._decode_pending(title)
+        return tab
+
+    def on_append(self, title: str, row: List[Any]) -> None:
+        if title not in self.tracked:
+            return
+        with self._locks[title]:
+            tab = self._loaded(title)
+            if tab is not None:
+                tab.append(row)
+
+    def on_update(self, title: str, row_i: int, col: int, value: Any) -> None:
+        if title not in self.tracked:
+            return
+        with self._locks[title]:
+            tab = self._loaded(title)
+            if tab is not None:
+                tab.set_cell(int(row_i), int(col), value)
+
+    def on_batch(self, title: str, updates: List[Dict[str, Any]]) -> None:
+        if title not in self.tracked:
+            return
+        a1_to_rowcol = startup.lazy_import("gspread.utils").a1_to_rowcol
+        with self._locks[title]:
+            tab = self._loaded(title)
+            if tab is None:
+                return
+            try:
+                for u in updates:
+                    r0, c0 = a1_to_rowcol(str(u["range"]).split(":")[0].split("!")[-1])
+                    for i, row in enumerate(u.get("values") or []):
+                        for j, v in enumerate(row):
+                            tab.set_cell(r0 + i, c0 + j, v)
+            except Exception:
+                # plage non reconnue: relecture complète au prochain accès
+                self._tabs.pop(title, None)
+
+    def on_delete(self, title: str, row_i: int) -> None:
+        if title not in self.tracked:
+            return
+        with self._locks[title]:
+            tab = self._loaded(title)
+            if tab is not None:
+                tab.delete_row(int(row_i))
+
+    # ----------------------------
+    # snapshot disque
+    # ----------------------------
+    def _sheet_id(self) -> str:
+        return str(getattr(self.s, "sheet_id", "") or "")
+
+    def dirty(self) -> bool:
+        return any(self._saved_versions.get(t) != (id(tab), tab.version) for t, tab in self._tabs.items())
+
+    def save(self, path: str = "") -> int:
+        """Écrit le snapshot (atomique). Retourne la taille en octets."""
+        path = path or SNAPSHOT_PATH
+        blobs: List[Tuple[str, bytes, Dict[str, Any]]] = []
+        versions: Dict[str, Tuple[int, int]] = {}
+        for title in sorted(self.tracked):
+            with self._locks[title]:
+                tab = self._tabs.get(title)
+                if tab is None:
+                    continue
+                raw = json.dumps(tab.values, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                meta = {"rows": len(tab.values), "confirmed": tab.confirmed, "synced_at": tab.synced_at}
+                versions[title] = (id(tab), tab.version)
+            blobs.append((title, raw, meta))
+
+        off = 0
+        entries = {}
+        for title, raw, meta in blobs:
+            entries[title] = dict(meta, offset=off, length=len(raw))
+            off += len(raw)
+        header = json.dumps({
+            "version": SNAPSHOT_VERSION,
+            "sheet_id": self._sheet_id(),
+            "created_at": time.time(),
+            "tabs": entries,
+        }, separators=(",", ":")).encode("utf-8")
+
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for _, raw, _ in blobs:
+                f.write(raw)
+        os.replace(tmp, path)
+        self._saved_versions = versions
+        return len(SNAPSHOT_MAGIC) + 4 + len(header) + off
+
+    def load(self, path: str = "") -> List[str]:
+        """Référence les blocs du snapshot (décodés au premier accès). Retourne les onglets."""
+        path = path or SNAPSHOT_PATH
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return []   # fichier vide
+        try:
+            if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise ValueError("magic")
+            pos = len(SNAPSHOT_MAGIC)
+            (hlen,) = struct.unpack("<I", mm[pos:pos + 4])
+            header = json.loads(bytes(mm[pos + 4:pos + 4 + hlen]).decode("utf-8"))
+            base = pos + 4 + hlen
+        except Exception as e:
+            print("Tab cache: snapshot illisible, ignoré:", e)
+            mm.close()
+            return []
+        if int(header.get("version", 0)) != SNAPSHOT_VERSION:
+            print(f"Tab cache: snapshot version {header.get('version')} != {SNAPSHOT_VERSION}, ignoré.")
+            mm.close()
+            return []
+        if header.get("sheet_id") != self._sheet_id():
+            print("Tab cache: snapshot d'un autre classeur, ignoré.")
+            mm.close()
+            return []
+        loaded = []
+        for title, meta in (header.get("tabs") or {}).items():
+            if title not in self.tracked or title in self._tabs:
+                continue
+            off, length = int(meta["offset"]), int(meta["length"])
+            if base + off + length > len(mm):
+                print(f"Tab cache: bloc {title} tronqué, ignoré.")
+                continue
+            self._pending[title] = (mm, base + off, length, meta)
+            loaded.append(title)
+        if not loaded:
+            mm.close()
+        return loaded
+
+    def has(self, title: str) -> bool:
+        """Copie disponible (lue ou reprise du snapshot), fraîche ou non."""
+        return title in self._tabs or title in self._pending
+
+    def stale(self) -> List[str]:
+        """Onglets repris du snapshot et pas encore relus depuis Sheets."""
+        out = [t for t, tab in self._tabs.items() if not tab.live]
+        return sorted(set(out) | set(self._pending))
+
+    def stats(self) -> Dict[str, Any]:
+        out = {}
+        for t in sorted(self.tracked):
+            tab = self._tabs.get(t)
+            if tab is not None:
+                out[t] = {"rows": len(tab.values) - 1, "source": tab.source, "age_s": round(time.time() - tab.synced_at, 1)}
+            elif t in self._pending:
+                out[t] = {"source": "snapshot (non décodé)"}
+        return out
+
+
+def store_from_env(service) -> Optional[TabStore]:
+    return TabStore(service) if TABS else None
@@ -8,6 +8,7 @@ import discord
 from discord import ui
 
 import domain
+import vip_search
 from services import (
     catify,
     now_fr,
@@ -480,6 +481,7 @@ class VipPickView(discord.ui.View):
     """
     View HG: choisir un VIP après recherche floue
     matches = List[(pseudo, code)]
+    query: terme tapé => classement (exact, préfixe, contient, fautes de frappe)
     """
     def __init__(
         self,
@@ -487,16 +489,22 @@ class VipPickView(discord.ui.View):
         services,
         author_id: int,
         matches: List[Tuple[str, str]],
+        query: str = "",
     ):
         super().__init__(timeout=5 * 60)
         self.s = services
         self.author_id = int(author_id)
-        self.matches = matches
+        ranked = vip_search.rank_pairs(query, matches) if query else [(p, c, 0) for p, c in matches]
+        self.matches = [(p, c) for p, c, _ in ranked]
         self.selected_code: Optional[str] = None
 
         options = [
-            discord.SelectOption(label=pseudo, value=code, description=code)
-            for pseudo, code in matches[:25]
+            discord.SelectOption(
+                label=pseudo,
+                value=code,
+                description=code + (f" • ≈ {typos} faute(s)" if typos > 0 else ""),
+            )
+            for pseudo, code, typos in ranked[:25]
         ]
 
         self.add_item(VipPickSelect(self, options))
@@ -907,27 +915,31 @@ class QcmDailyView(discord.ui.View):
     def __init__(
         self,
         *,
-        services,
-        discord_id: int,
-        code_vip: str,
+        sessions,
+        session,
         vip_pseudo: str,
         chrono_limit_sec: int = 12
     ):
         super().__init__(timeout=6 * 60)
-        self.s = services
-        self.discord_id = int(discord_id)
-        self.code_vip = normalize_code(code_vip)
+        # session chargée par l'appelant (qcm_session.QcmSessions.open, hors boucle)
+        self.sessions = sessions
+        self.session = session
+        self.discord_id = session.discord_id
+        self.code_vip = session.code_vip
         self.vip_pseudo = display_name(vip_pseudo or self.code_vip)
         self.chrono_limit_sec = int(chrono_limit_sec)
 
-        self.questions = domain.qcm_pick_daily_set(self.s)
-        self.date_key, self.answers = domain.qcm_today_progress(self.s, self.code_vip, self.discord_id)
+        self.questions = session.questions
+        self.date_key = session.date_key
 
-        self.current_index = len(self.answers)  # 0..4
+        self.current_index = session.next_index  # 0..4
         self.sent_at = now_fr()
 
         self._rebuild_items()
 
+    async def on_timeout(self) -> None:
+        await self.sessions.close(self.session)
+
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.discord_id:
             await interaction.response.send_message(catify("😾 Pas touche. Lance ton propre QCM."), ephemeral=True)
@@ -983,15 +995,13 @@ class QcmDailyView(discord.ui.View):
         self.sent_at = now_fr()
         await message.edit(embed=self.build_embed(), view=self)
 
-    async def submit_choice(self, interaction: discord.Interaction, choice: str):
-        elapsed = int((now_fr() - self.sent_at).total_seconds())
-        q = self.questions[self.current_index]
+    async def submit_choice(self, interaction: discord.Interaction, choice: str, clicked_at=None):
+        # chrono mesuré au clic (render_from_response remet sent_at à zéro)
+        elapsed = int(((clicked_at or now_fr()) - self.sent_at).total_seconds())
 
-        ok, mark, pts, is_correct = domain.qcm_submit_answer(
-            self.s,
-            discord_id=self.discord_id,
-            code_vip=self.code_vip,
-            q=q,
+        # en mémoire: la ligne QCM_LOG et les points partent par le writer
+        ok, mark, pts, is_correct = self.sessions.submit(
+            self.session,
             q_index=self.current_index + 1,
             choice=choice,
             elapsed_sec=elapsed,
@@ -999,6 +1009,12 @@ class QcmDailyView(discord.ui.View):
         )
 
         if not ok:
+            # autre vue sur la même session: on se recale sur la progression
+            self.current_index = self.session.next_index
+            try:
+                await self.render_from_message_edit(interaction.message)
+            except Exception:
+                pass
             return await interaction.followup.send(catify(str(mark)), ephemeral=True)
 
         note = f"{mark} Réponse enregistrée."
@@ -1011,7 +1027,9 @@ class QcmDailyView(discord.ui.View):
         else:
             note += " 0 point."
 
-        self.current_index += 1
+        self.current_index = self.session.next_index
+        if self.session.done:
+            await self.sessions.close(self.session)
 
         try:
             await self.render_from_message_edit(interaction.message)
@@ -1028,6 +1046,7 @@ class QcmAnswerButton(discord.ui.Button):
 
     async def callback(self, interaction: discord.Interaction):
         view: QcmDailyView = self.view  # type: ignore
+        clicked_at = now_fr()
 
         # lock visuel immédiat
         for item in view.children:
@@ -1038,7 +1057,7 @@ class QcmAnswerButton(discord.ui.Button):
         await view.render_from_response(interaction)
 
         # puis logique: followup + message.edit
-        await view.submit_choice(interaction, self.choice)
+        await view.submit_choice(interaction, self.choice, clicked_at)
 
 
 class QcmCloseButton(discord.ui.Button):
@@ -1049,3 +1068,4 @@ class QcmCloseButton(discord.ui.Button):
         for item in self.view.children:
             item.disabled = True
         await interaction.response.edit_message(content="✅ QCM fermé.", embed=None, view=self.view)
+        await self.view.sessions.close(self.view.session)
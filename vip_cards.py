@@ -0,0 +1,378 @@
+# vip_cards.py
+# -*- coding: utf-8 -*-
+"""
+Cartes VIP: rendu, caches (disque / S3) et régénération en masse.
+
+- rendu en parallèle dans le pool de cartes (card_pool)
+- uploads S3 concurrents
+- card_url / card_generated_at / card_generated_by écrits en UN batch Sheets
+- clé de rendu (hash des champs + version template/police): une carte
+  inchangée est resservie depuis le disque local ou l'objet S3 existant
+  (métadonnée render-key), sans re-rendu ni re-upload
+- encodage configurable (services.CardEncoding: png, png8, webp, jpeg)
+  + aperçu réduit optionnel; l'extension fait partie de la clé S3
+
+Config:
+- VIP_CARD_CACHE_DIR=.cache/vip_cards  (vide => pas de cache disque)
+- VIP_CARD_CACHE_MB=200                (taille max, éviction LRU)
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import card_pool
+import metrics
+from services import (
+    SheetsService, S3Service, CardEncoding,
+    normalize_code, now_iso, card_assets_version, card_encoding_from_env,
+)
+
+CARD_CACHE_DIR = os.getenv("VIP_CARD_CACHE_DIR", os.path.join(".cache", "vip_cards")).strip()
+RENDER_KEY_META = "render-key"
+CARD_ENCODING = card_encoding_from_env()
+
+
+def card_fields(vip: Dict[str, Any]) -> Tuple[str, str, str, str, str]:
+    """(code, pseudo, dob, phone, bleeter) tels qu'imprimés sur la carte."""
+    return (
+        normalize_code(str(vip.get("code_vip", ""))),
+        str(vip.get("pseudo", "")).strip(),
+        str(vip.get("dob", "")).strip(),
+        str(vip.get("phone", "")).strip(),
+        str(vip.get("bleeter", "")).strip(),
+    )
+
+def card_object_key(code_vip: str, ext: str = "png") -> str:
+    # le format est dans la clé: vip_cards/SUB-XXXX-XXXX.png reste valide si on passe en webp
+    return f"vip_cards/{normalize_code(code_vip)}.{ext}"
+
+def preview_object_key(code_vip: str, ext: str = "png") -> str:
+    return f"vip_cards/preview/{normalize_code(code_vip)}.{ext}"
+
+def card_show_keys(code_vip: str, enc: Optional[CardEncoding] = None) -> List[str]:
+    """Objets à essayer pour /vip card_show: aperçu, carte au format courant, ancienne carte PNG."""
+    enc = enc or CARD_ENCODING
+    keys = []
+    if enc.preview_width > 0:
+        keys.append(preview_object_key(code_vip, enc.ext))
+    keys.append(card_object_key(code_vip, enc.ext))
+    legacy = card_object_key(code_vip, "png")
+    if legacy not in keys:
+        keys.append(legacy)
+    return keys
+
+def render_key(template_path: str, font_path: str, fields: Tuple[str, str, str, str, str], enc: Optional[CardEncoding] = None) -> str:
+    h = hashlib.sha256(card_assets_version(template_path, font_path).encode())
+    h.update(b"\x1e" + (enc or CARD_ENCODING).tag().encode())
+    for v in fields:
+        h.update(b"\x1f" + str(v).encode("utf-8"))
+    return h.hexdigest()[:24]
+
+# ----------------------------
+# Cache disque LRU (code + clé de rendu)
+# ----------------------------
+class CardDiskCache:
+    """
+    Cartes rendues sur disque, taille bornée (éviction LRU).
+    Fichiers: <code>_<clé>.<ext> et <code>_<clé>.preview.<ext>;
+    une seule version par VIP (les anciennes clés sont supprimées).
+    """
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[str, int]"] = None  # nom -> taille, du plus ancien au plus récent
+        self._total = 0
+
+    def enabled(self) -> bool:
+        return bool(self.root) and self.max_bytes > 0
+
+    def _name(self, code_vip: str, key: str, ext: str, preview: bool = False) -> str:
+        suffix = ".preview" if preview else ""
+        return f"{normalize_code(code_vip)}_{key}{suffix}.{ext}"
+
+    def _load(self) -> "OrderedDict[str, int]":
+        if self._index is None:
+            entries = []
+            try:
+                for e in os.scandir(self.root):
+                    if e.is_file() and not e.name.endswith(".tmp"):
+                        st = e.stat()
+                        entries.append((st.st_mtime, e.name, st.st_size))
+            except FileNotFoundError:
+                pass
+            entries.sort()
+            self._index = OrderedDict((name, size) for _, name, size in entries)
+            self._total = sum(self._index.values())
+        return self._index
+
+    def _drop(self, name: str) -> None:
+        size = self._load().pop(name, None)
+        if size is not None:
+            self._total -= size
+        try:
+            os.remove(os.path.join(self.root, name))
+        except OSError:
+            pass
+
+    def get(self, code_vip: str, key: str, ext: str = "png", preview: bool = False) -> Optional[bytes]:
+        if not self.enabled():
+            return None
+        name = self._name(code_vip, key, ext, preview)
+        path = os.path.join(self.root, name)
+        with self._lock:
+            idx = self._load()
+            if name not in idx:
+                metrics.cache_miss("card_disk")
+                return None
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                self._drop(name)
+                metrics.cache_miss("card_disk")
+                return None
+            idx.move_to_end(name)
+            try:
+                os.utime(path)  # ordre LRU conservé au redémarrage
+            except OSError:
+                pass
+        metrics.cache_hit("card_disk")
+        return data
+
+    def put(self, code_vip: str, key: str, ext: str, data: bytes, preview: Optional[bytes] = None) -> None:
+        if not self.enabled():
+            return
+        prefix = f"{normalize_code(code_vip)}_"
+        files = [(self._name(code_vip, key, ext), data)]
+        if preview is not None:
+            files.append((self._name(code_vip, key, ext, preview=True), preview))
+        with self._lock:
+            try:
+                os.makedirs(self.root, exist_ok=True)
+                idx = self._load()
+                # une seule version par VIP
+                for name in [n for n in idx if n.startswith(prefix) and not n.startswith(prefix + key)]:
+                    self._drop(name)
+                for name, blob in files:
+                    path = os.path.join(self.root, name)
+                    tmp = path + ".tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(blob)
+                    os.replace(tmp, path)
+                    self._total += len(blob) - idx.pop(name, 0)
+                    idx[name] = len(blob)
+                while self._total > self.max_bytes and len(idx) > len(files):
+                    self._drop(next(iter(idx)))
+            except OSError as e:
+                print("Card cache disque: écriture échouée:", e)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            idx = self._load()
+            return {"files": len(idx), "bytes": self._total, "max_bytes": self.max_bytes}
+
+
+DISK_CACHE = CardDiskCache(CARD_CACHE_DIR, int(float(os.getenv("VIP_CARD_CACHE_MB", "200")) * 1024 * 1024))
+
+def disk_get(code_vip: str, key: str, ext: str = "png", preview: bool = False) -> Optional[bytes]:
+    return DISK_CACHE.get(code_vip, key, ext, preview)
+
+def disk_put(code_vip: str, key: str, ext: str, data: bytes, preview: Optional[bytes] = None) -> None:
+    DISK_CACHE.put(code_vip, key, ext, data, preview)
+
+
+def cached_card_file(template_path: str, font_path: str, vip: Dict[str, Any], *, enc: Optional[CardEncoding] = None) -> Optional[Tuple[str, bytes]]:
+    """
+    (nom de fichier, octets) de la carte à jour de ce VIP si elle est sur
+    disque (aperçu si configuré) — aucun appel S3.
+    """
+    enc = enc or CARD_ENCODING
+    fields = card_fields(vip)
+    code = fields[0]
+    try:
+        key = render_key(template_path, font_path, fields, enc)
+    except OSError:
+        return None
+    if enc.preview_width > 0:
+        data = DISK_CACHE.get(code, key, enc.ext, preview=True)
+        if data is not None:
+            return f"VIP_{code}_preview.{enc.ext}", data
+    data = DISK_CACHE.get(code, key, enc.ext)
+    if data is not None:
+        return f"VIP_{code}.{enc.ext}", data
+    return None
+
+
+@dataclass
+class CardResult:
+    code: str
+    key: str
+    url: str
+    object_key: str
+    ext: str = "png"
+    data: Optional[bytes] = None        # None si servi depuis S3 sans copie locale
+    preview_key: Optional[str] = None
+    source: str = "render"              # render | disk | s3
+
+
+async def ensure_card(
+    s3: S3Service,
+    template_path: str,
+    font_path: str,
+    vip: Dict[str, Any],
+    *,
+    enc: Optional[CardEncoding] = None,
+    force: bool = False,
+    render_limit: Optional[asyncio.Semaphore] = None,
+    upload_limit: Optional[asyncio.Semaphore] = None,
+) -> CardResult:
+    """
+    Carte à jour sur S3 pour ce VIP (+ aperçu si VIP_CARD_PREVIEW_WIDTH).
+    Rendu + upload seulement si la clé de rendu a changé (ou force=True).
+    render_limit / upload_limit: sémaphores optionnels (régénération en masse).
+    """
+    enc = enc or CARD_ENCODING
+    render_limit = render_limit or asyncio.Semaphore(1)
+    upload_limit = upload_limit or asyncio.Semaphore(1)
+    fields = card_fields(vip)
+    code = fields[0]
+    key = render_key(template_path, font_path, fields, enc)
+    object_key = card_object_key(code, enc.ext)
+    preview_key = preview_object_key(code, enc.ext) if enc.preview_width > 0 else None
+
+    data = None if force else disk_get(code, key, enc.ext)
+    if not force:
+        async with upload_limit:
+            meta = await s3.ahead_metadata(object_key)
+        if meta is not None and meta.get(RENDER_KEY_META) == key:
+            return CardResult(code, key, s3.public_url(object_key), object_key, enc.ext, data, preview_key, "disk" if data else "s3")
+
+    source = "disk"
+    preview = disk_get(code, key, enc.ext, preview=True) if data is not None else None
+    if data is None or (preview_key and preview is None):
+        async with render_limit:
+            data, preview = await card_pool.render_card_encoded(template_path, font_path, enc, *fields)
+        await asyncio.to_thread(disk_put, code, key, enc.ext, data, preview)
+        source = "render"
+
+    meta = {RENDER_KEY_META: key}
+    async with upload_limit:
+        if preview_key and preview is not None:
+            await s3.aupload_bytes(preview, preview_key, enc.content_type, meta)
+        url = await s3.aupload_bytes(data, object_key, enc.content_type, meta)
+    return CardResult(code, key, url, object_key, enc.ext, data, preview_key, source)
+
+
+def select_vips(
+    rows: List[Dict[str, Any]],
+    *,
+    codes: Optional[List[str]] = None,
+    status: str = "ACTIVE",
+    only_existing: bool = False,
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    rows = get_all_records("VIP") -> [(row_i, vip)] imprimables.
+    status: ACTIVE | ALL ; only_existing: seulement ceux qui ont déjà une carte.
+    """
+    wanted = {normalize_code(c) for c in (codes or []) if str(c).strip()}
+    status = (status or "ACTIVE").strip().upper()
+    out = []
+    for idx, r in enumerate(rows, start=2):
+        code, _, dob, phone, _ = card_fields(r)
+        if not code or not dob or not phone:
+            continue
+        if wanted and code not in wanted:
+            continue
+        if status != "ALL" and str(r.get("status", "ACTIVE")).strip().upper() != status:
+            continue
+        if only_existing and not str(r.get("card_url", "")).strip():
+            continue
+        out.append((idx, r))
+    return out
+
+
+@dataclass
+class RegenReport:
+    total: int = 0
+    done: int = 0
+    reused: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+    cells: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def line(self) -> str:
+        return (
+            f"{self.done + self.failed}/{self.total} cartes"
+            f" ({self.reused} inchangée(s), {self.failed} erreur(s)) en {self.elapsed:.1f}s — {self.throughput:.1f} cartes/s"
+        )
+
+
+ProgressFn = Callable[[RegenReport], Awaitable[None]]
+
+async def regenerate_cards(
+    s: SheetsService,
+    s3: S3Service,
+    template_path: str,
+    font_path: str,
+    targets: List[Tuple[int, Dict[str, Any]]],
+    *,
+    by: str,
+    upload_concurrency: int = 8,
+    force: bool = False,
+    progress: Optional[ProgressFn] = None,
+    progress_every: float = 2.0,
+) -> RegenReport:
+    rep = RegenReport(total=len(targets))
+    render_sem = asyncio.Semaphore(max(1, card_pool.capacity()))
+    upload_sem = asyncio.Semaphore(max(1, int(upload_concurrency)))
+    updates: Dict[int, Dict[str, Any]] = {}
+    last = [0.0]
+
+    async def tick(final: bool = False):
+        rep.elapsed = time.perf_counter() - rep.started
+        if progress is None or (not final and rep.elapsed - last[0] < progress_every):
+            return
+        last[0] = rep.elapsed
+        try:
+            await progress(rep)
+        except Exception as e:
+            print("Card regen progress failed:", e)
+
+    async def one(row_i: int, vip: Dict[str, Any]):
+        code = card_fields(vip)[0]
+        try:
+            res = await ensure_card(
+                s3, template_path, font_path, vip,
+                force=force, render_limit=render_sem, upload_limit=upload_sem,
+            )
+            if res.source == "render" or str(vip.get("card_url", "")).strip() != res.url:
+                updates[row_i] = {"card_url": res.url, "card_generated_at": now_iso(), "card_generated_by": by}
+            if res.source != "render":
+                rep.reused += 1
+            rep.done += 1
+        except Exception as e:
+            rep.failed += 1
+            rep.errors.append(f"{code}: {e}")
+        await tick()
+
+    await asyncio.gather(*[one(row_i, vip) for row_i, vip in targets])
+
+    if updates:
+        rep.cells = await asyncio.to_thread(s.batch_update_by_header, "VIP", updates)
+    await tick(final=True)
+    print(f"Card regen: {rep.line()} | {rep.cells} cellules VIP mises à jour")
+    return rep
@@ -0,0 +1,416 @@
+# vip_search.py
+# -*- coding: utf-8 -*-
+"""
+Index de recherche VIP, construit une fois par snapshot de l'onglet VIP
+(cache 60s de bot.py) et partagé par l'autocomplete, /vipsearch et
+/vip edit.
+
+- haystacks normalisés pré-calculés ("code pseudo", pseudo, code)
+- tableau trié de clés pour les recherches par préfixe (bisect)
+- index de trigrammes pour les recherches "contient" (intersection
+  des listes, puis vérification sur les seuls candidats)
+- recherche floue: accents / underscores / casse ignorés (fold), puis
+  candidats par trigrammes communs (pseudo) et distance d'édition
+  bornée (1 faute jusqu'à 4 lettres, 2 jusqu'à 8, 3 au-delà)
+"""
+from __future__ import annotations
+
+import bisect
+import functools
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from services import normalize_code, display_name
+
+SCORE_EXACT = 200
+SCORE_PREFIX = 100
+SCORE_INFIX = 50
+SCORE_FUZZY = 40   # - 10 par faute
+
+# au-delà: trop de candidats pour rester rapide, on garde les meilleurs
+FUZZY_MAX_CANDIDATES = 300
+# propositions "proches" renvoyées par lookup() (menus Discord: 25 max)
+FUZZY_MAX_RESULTS = 25
+
+_SPACES = re.compile(r"[\s_]+")
+_PUNCT = re.compile(r"[.'’`´\"]")
+
+
+def fold(text: str) -> str:
+    """
+    Forme de recherche: sans accents, minuscules, "_" = espace, espaces
+    compactés, apostrophes / points retirés. "Élodie_D'Arc" -> "elodie darc"
+    """
+    s = unicodedata.normalize("NFKD", str(text or ""))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    s = _PUNCT.sub("", s.casefold())
+    return _SPACES.sub(" ", s).strip()
+
+# pseudos du tableau VIP: repliés une fois, réutilisés d'un appel à l'autre
+fold_cached = functools.lru_cache(maxsize=1 << 16)(fold)
+
+
+def max_typos(q: str) -> int:
+    n = len(q)
+    if n <= 2:
+        return 0
+    if n <= 4:
+        return 1
+    if n <= 8:
+        return 2
+    return 3
+
+
+def bounded_distance(a: str, b: str, bound: int) -> int:
+    """
+    Distance de Damerau-Levenshtein (transpositions adjacentes),
+    bound + 1 dès qu'elle dépasse `bound` (sortie anticipée). Seule la
+    bande |i - j| <= bound de la matrice est calculée.
+    """
+    if a == b:
+        return 0
+    la, lb = len(a), len(b)
+    if abs(la - lb) > bound:
+        return bound + 1
+    big = bound + 1
+    prev2: List[int] = []
+    prev = [j if j <= bound else big for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        lo = max(1, i - bound)
+        hi = min(lb, i + bound)
+        cur = [big] * (lb + 1)
+        if i <= bound:
+            cur[0] = i
+        ca = a[i - 1]
+        row_min = cur[0] if lo == 1 else big
+        for j in range(lo, hi + 1):
+            cb = b[j - 1]
+            v = prev[j - 1] if ca == cb else prev[j - 1] + 1
+            if prev[j] + 1 < v:
+                v = prev[j] + 1
+            if cur[j - 1] + 1 < v:
+                v = cur[j - 1] + 1
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and prev2[j - 2] + 1 < v:
+                v = prev2[j - 2] + 1
+            cur[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > bound:
+            return big
+        prev2, prev = prev, cur
+    return prev[lb] if prev[lb] <= bound else big
+
+
+@dataclass
+class VipEntry:
+    row_i: int
+    row: Dict[str, Any]
+    code: str
+    pseudo: str
+    discord_id: str
+    status: str
+    hay: str        # "code pseudo" normalisé
+    pseudo_key: str
+    code_key: str
+
+    @property
+    def active(self) -> bool:
+        return self.status == "ACTIVE"
+
+    def points(self) -> int:
+        try:
+            return int(self.row.get("points", 0) or 0)
+        except Exception:
+            return 0
+
+
+def _trigrams(s: str) -> Set[str]:
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+def _padded_trigrams(s: str) -> Set[str]:
+    # bords marqués: une faute en début/fin de mot garde des trigrammes communs
+    return _trigrams(f"  {s} ")
+
+
+class VipSearchIndex:
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.entries: List[VipEntry] = []
+        self.by_discord_id: Dict[str, int] = {}
+        self.by_code: Dict[str, int] = {}
+        self.by_pseudo: Dict[str, List[int]] = {}
+        keys: List[Tuple[str, int]] = []
+        grams: Dict[str, List[int]] = {}
+        # recherche floue sur les termes distincts (pseudo entier + mots):
+        # une distance par terme, partagée par tous les VIP qui le portent
+        terms: Dict[str, List[int]] = {}
+
+        for row_i, r in enumerate(rows, start=2):
+            code = normalize_code(str(r.get("code_vip", "")))
+            pseudo = display_name(r.get("pseudo", code))
+            e = VipEntry(
+                row_i=row_i,
+                row=r,
+                code=code,
+                pseudo=pseudo,
+                discord_id=str(r.get("discord_id", "")).strip(),
+                status=str(r.get("status", "ACTIVE")).strip().upper(),
+                hay=fold(f"{code} {pseudo}"),
+                pseudo_key=fold(pseudo),
+                code_key=fold(code),
+            )
+            i = len(self.entries)
+            self.entries.append(e)
+            if e.discord_id:
+                self.by_discord_id.setdefault(e.discord_id, i)
+            if code:
+                self.by_code.setdefault(code, i)
+            keys.append((e.hay, i))
+            if e.pseudo_key and e.pseudo_key != e.hay:
+                keys.append((e.pseudo_key, i))
+            for g in _trigrams(e.hay):
+                grams.setdefault(g, []).append(i)
+            if e.pseudo_key:
+                self.by_pseudo.setdefault(e.pseudo_key, []).append(i)
+                for t in {e.pseudo_key, *e.pseudo_key.split(" ")}:
+                    if t:
+                        terms.setdefault(t, []).append(i)
+
+        # ordre d'affichage (pseudo, code) pré-calculé pour la requête vide
+        self._alpha = sorted(range(len(self.entries)), key=lambda i: self._order(self.entries[i]))
+        keys.sort()
+        self._keys = [k for k, _ in keys]
+        self._key_ids = [i for _, i in keys]
+        self._grams = grams
+        self._terms = list(terms)
+        self._term_ids = [terms[t] for t in self._terms]
+        fgrams: Dict[str, List[int]] = {}
+        for ti, t in enumerate(self._terms):
+            for g in _padded_trigrams(t):
+                fgrams.setdefault(g, []).append(ti)
+        self._fgrams = fgrams
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def _order(e: VipEntry) -> Tuple[str, str]:
+        return (e.pseudo.lower(), e.code)
+
+    # ----------------------------
+    # primitives
+    # ----------------------------
+    def prefix_ids(self, q: str) -> Set[int]:
+        lo = bisect.bisect_left(self._keys, q)
+        hi = bisect.bisect_left(self._keys, q + "\uffff")
+        return set(self._key_ids[lo:hi])
+
+    def contains_ids(self, q: str) -> Iterable[int]:
+        """Entrées dont le haystack contient q."""
+        if len(q) < 3:
+            return (i for i, e in enumerate(self.entries) if q in e.hay)
+        lists = []
+        for g in _trigrams(q):
+            ids = self._grams.get(g)
+            if not ids:
+                return ()
+            lists.append(ids)
+        lists.sort(key=len)
+        cand = set(lists[0])
+        for ids in lists[1:]:
+            cand.intersection_update(ids)
+            if not cand:
+                return ()
+        hay = self.entries
+        return (i for i in sorted(cand) if q in hay[i].hay)
+
+    def fuzzy_ids(self, q: str, exclude: Optional[Set[int]] = None, limit: int = 0) -> List[Tuple[int, int, int]]:
+        """
+        [(fautes, -trigrammes communs, id)] des pseudos à distance <= max_typos(q)
+        du pseudo entier ou d'un de ses mots (les `limit` meilleurs si limit).
+        """
+        bound = max_typos(q)
+        if bound == 0:
+            return []
+        qg = _padded_trigrams(q)
+        counts = Counter(chain.from_iterable(self._fgrams.get(g, ()) for g in qg))
+        # une faute détruit au plus 3 trigrammes
+        need = max(1, len(qg) - 3 * bound)
+        cand = [(n, ti) for ti, n in counts.items() if n >= need]
+        if len(cand) > FUZZY_MAX_CANDIDATES:
+            cand = heapq.nlargest(FUZZY_MAX_CANDIDATES, cand)
+        near = []
+        for n, ti in cand:
+            d = bounded_distance(q, self._terms[ti], bound)
+            if d <= bound:
+                near.append((d, -n, ti))
+        near.sort()
+        # termes du plus proche au moins proche: le premier vu est le meilleur du VIP
+        out: List[Tuple[int, int, int]] = []
+        seen: Set[int] = set()
+        for d, m, ti in near:
+            for i in self._term_ids[ti]:
+                if i in seen or (exclude and i in exclude):
+                    continue
+                seen.add(i)
+                out.append((d, m, i))
+            if limit and len(out) >= limit:
+                break
+        out.sort()
+        return out[:limit] if limit else out
+
+    # ----------------------------
+    # recherches
+    # ----------------------------
+    def search(self, query: str, limit: int = 25, *, fuzzy: bool = True) -> List[Tuple[int, VipEntry]]:
+        """
+        [(score, entrée)] : pseudo exact > préfixe (code ou pseudo) > contient
+        > proche (fautes de frappe); puis alpha.
+        """
+        q = fold(query)
+        if not q:
+            ids = self._alpha[:limit] if limit else self._alpha
+            return [(1, self.entries[i]) for i in ids]
+        exact = set(self.by_pseudo.get(q, ()))
+        pre = self.prefix_ids(q) - exact
+        scored = [(SCORE_EXACT, self.entries[i]) for i in exact]
+        scored += [(SCORE_PREFIX, self.entries[i]) for i in pre]
+        seen = exact | pre
+        scored += [(SCORE_INFIX, self.entries[i]) for i in self.contains_ids(q) if i not in seen]
+        key = lambda x: (-x[0],) + self._order(x[1])
+        if limit:
+            scored = heapq.nsmallest(limit, scored, key=key)
+        else:
+            scored.sort(key=key)
+        # fautes de frappe seulement pour compléter la liste
+        if fuzzy and (not limit or len(scored) < limit):
+            have = {id(e) for _, e in scored}
+            for d, _, i in self.fuzzy_ids(q, limit=limit + len(have) if limit else 0):
+                e = self.entries[i]
+                if id(e) in have:
+                    continue
+                scored.append((SCORE_FUZZY - 10 * d, e))
+                if limit and len(scored) >= limit:
+                    break
+        return scored
+
+    def lookup(self, term: str, *, fuzzy: bool = True) -> List[VipEntry]:
+        """
+        /vipsearch, /vip edit: discord_id exact, ou pseudo / code partiel
+        (classés); à défaut, pseudos proches.
+        """
+        t = (term or "").strip()
+        out: Dict[int, VipEntry] = {}
+        if t.isdigit() and t in self.by_discord_id:
+            i = self.by_discord_id[t]
+            out[i] = self.entries[i]
+        q = fold(t)
+        if q:
+            for i in self.contains_ids(q):
+                e = self.entries[i]
+                if q in e.pseudo_key or q in e.code_key:
+                    out[i] = e
+            if fuzzy and not out:
+                for _, _, i in self.fuzzy_ids(q, limit=FUZZY_MAX_RESULTS):
+                    out[i] = self.entries[i]
+                return list(out.values())
+
+        def rank(e: VipEntry):
+            if e.pseudo_key == q:
+                return (0,) + self._order(e)
+            if e.pseudo_key.startswith(q) or e.code_key.startswith(q):
+                return (1,) + self._order(e)
+            return (2,) + self._order(e)
+        return sorted(out.values(), key=rank)
+
+    def best(self, term: str) -> Optional[VipEntry]:
+        """
+        Un seul VIP pour un terme libre: pseudo exact (accents ignorés),
+        sinon le plus proche s'il n'y a pas d'ex-aequo.
+        """
+        q = fold(term)
+        if not q:
+            return None
+        exact = self.by_pseudo.get(q)
+        if exact:
+            return self.entries[exact[0]]
+        near = self.fuzzy_ids(q, limit=2)
+        if not near:
+            return None
+        if len(near) > 1 and near[1][0] == near[0][0]:
+            return None
+        return self.entries[near[0][2]]
+
+    def get_code(self, code: str) -> Optional[VipEntry]:
+        i = self.by_code.get(normalize_code(code))
+        return self.entries[i] if i is not None else None
+
+
+def rank_pairs(query: str, pairs: List[Tuple[str, str]]) -> List[Tuple[str, str, int]]:
+    """
+    Petite liste [(pseudo, code)] -> [(pseudo, code, fautes)] classée
+    comme search() (pour les menus de sélection). fautes = -1: pas proche.
+    """
+    q = fold(query)
+    ranked = []
+    for pseudo, code in pairs:
+        p, c = fold(pseudo), fold(code)
+        if not q:
+            tier, d = 3, 0
+        elif p == q:
+            tier, d = 0, 0
+        elif p.startswith(q) or c.startswith(q):
+            tier, d = 1, 0
+        elif q in p or q in c:
+            tier, d = 2, 0
+        else:
+            bound = max_typos(q)
+            d = min([bounded_distance(q, p, bound)] + [bounded_distance(q, w, bound) for w in p.split(" ") if w])
+            tier, d = (3, d) if d <= bound else (4, -1)
+        ranked.append(((tier, max(d, 0), p, c), (pseudo, code, d)))
+    ranked.sort(key=lambda x: x[0])
+    return [r for _, r in ranked]
+
+
+# ==========================================================
+# Cache d'index par snapshot
+# ==========================================================
+_CACHED: Dict[str, Dict[str, Any]] = {}   # source -> {"sig", "index"}
+_CACHED_LOCK = threading.Lock()
+
+def _signature(rows: List[Dict[str, Any]]) -> tuple:
+    return tuple((r.get("code_vip"), r.get("pseudo"), r.get("discord_id"), r.get("status")) for r in rows)
+
+def index_for(rows: List[Dict[str, Any]], source: str = "VIP") -> VipSearchIndex:
+    """
+    Index pour ces lignes VIP, un cache par source (un seul snapshot par
+    source, sinon chaque alternance reconstruit tout). Si code/pseudo/
+    discord_id/status n'ont pas changé depuis le dernier appel, l'index est
+    réutilisé (lignes rafraîchies). Bloquant à la construction (~1 s à 20k
+    VIP): depuis la boucle asyncio, passer par un thread.
+    """
+    with _CACHED_LOCK:
+        slot = _CACHED.setdefault(source, {"sig": None, "index": None})
+        idx = slot["index"]
+        if idx is not None and idx.rows is rows:
+            return idx
+        sig = _signature(rows)
+        if idx is not None and slot["sig"] == sig:
+            for e in idx.entries:
+                e.row = rows[e.row_i - 2]
+            idx.rows = rows
+            return idx
+        idx = VipSearchIndex(rows)
+        slot.update({"sig": sig, "index": idx})
+        return idx
+
+def cached_index(rows: List[Dict[str, Any]], source: str = "VIP") -> Optional[VipSearchIndex]:
+    """Index déjà construit pour exactement ces lignes (sinon None), sans rien calculer."""
+    idx = _CACHED.get(source, {}).get("index")
+    return idx if idx is not None and idx.rows is rows else None
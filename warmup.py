@@ -0,0 +1,108 @@
+# warmup.py
+# -*- coding: utf-8 -*-
+"""
+Préchauffage au démarrage (setup_hook, avant la connexion au gateway).
+
+Les étapes sont des fonctions (sync => thread, ou coroutines) avec des
+dépendances: chaque étape démarre dès que ses dépendances sont finies,
+les autres tournent en parallèle. Une étape qui échoue est signalée mais
+ne bloque pas le démarrage (les dépendantes sont sautées); le cache
+correspondant se remplira au premier usage comme avant.
+
+Config:
+- WARMUP_TIMEOUT_S=90   (au-delà: on démarre quand même)
+- WARMUP=0              (désactive le préchauffage)
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import startup
+
+TIMEOUT_S = float(os.getenv("WARMUP_TIMEOUT_S", "90"))
+ENABLED = (os.getenv("WARMUP", "1").strip().lower() not in ("0", "false", "no", "off"))
+
+
+@dataclass
+class Step:
+    name: str
+    fn: Callable[[], Any]
+    after: List[str] = field(default_factory=list)
+    status: str = "pending"   # ok | error | skipped | timeout
+    seconds: float = 0.0
+    error: str = ""
+    detail: str = ""
+
+
+class Warmup:
+    def __init__(self):
+        self.steps: Dict[str, Step] = {}
+        self.elapsed = 0.0
+
+    def add(self, name: str, fn: Callable[[], Any], *, after: Optional[List[str]] = None) -> None:
+        self.steps[name] = Step(name=name, fn=fn, after=list(after or []))
+
+    async def _run_step(self, step: Step, tasks: Dict[str, "asyncio.Task"]) -> None:
+        for dep in step.after:
+            await tasks[dep]
+            if self.steps[dep].status != "ok":
+                step.status = "skipped"
+                step.error = f"{dep} en échec"
+                return
+        t0 = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(step.fn):
+                res = await step.fn()
+            else:
+                res = await asyncio.to_thread(step.fn)
+            step.status = "ok"
+            if res is not None:
+                step.detail = str(res)
+        except Exception as e:
+            step.status = "error"
+            step.error = repr(e)
+        finally:
+            step.seconds = time.perf_counter() - t0
+
+    async def run(self, timeout: float = TIMEOUT_S) -> bool:
+        """True si toutes les étapes ont réussi dans le délai."""
+        for s in self.steps.values():
+            unknown = [d for d in s.after if d not in self.steps]
+            if unknown:
+                raise ValueError(f"warmup: {s.name} dépend de {unknown}")
+        t0 = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        for s in self.steps.values():
+            tasks[s.name] = asyncio.ensure_future(self._run_step(s, tasks))
+        done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for t in pending:
+            t.cancel()
+        for s in self.steps.values():
+            if s.status == "pending":
+                s.status = "timeout"
+        self.elapsed = time.perf_counter() - t0
+        return all(s.status == "ok" for s in self.steps.values())
+
+    def report(self) -> str:
+        icons = {"ok": "✅", "error": "❌", "skipped": "⏭️", "timeout": "⌛", "pending": "…"}
+        lines = [f"🔥 Warm-up: {self.elapsed:.2f}s"]
+        for s in self.steps.values():
+            extra = s.detail if s.status == "ok" else s.error
+            lines.append(f"  {icons.get(s.status, '?')} {s.name:<16} {s.seconds:6.2f}s" + (f"  {extra}" if extra else ""))
+        return "\n".join(lines)
+
+
+async def run(warm: Warmup) -> bool:
+    """Lance le warm-up (si activé), imprime le rapport et marque l'étape 'warm'."""
+    if not ENABLED:
+        print("Warm-up désactivé (WARMUP=0).")
+        return False
+    ok = await warm.run()
+    print(warm.report())
+    startup.mark("warm")
+    return ok